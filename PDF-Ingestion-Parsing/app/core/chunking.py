@@ -0,0 +1,321 @@
+# app/core/chunking.py
+
+import os
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_SECTION_MAX_TOKENS, CHUNK_TOKENIZER
+
+# A finished chunk: (text, page number of its first text, start offset, end offset)
+ChunkSpan = Tuple[str, int, int, int]
+
+# Sentence ends: terminal punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'[.!?]["\'”’)\]]*(\s+)')
+SENTENCE_END_PATTERN = re.compile(r'[.!?]["\'”’)\]]*$')
+WORD_PATTERN = re.compile(r'\S+')
+# Rough stand-in for a BPE vocabulary: letters in pieces of up to 8, digits in groups of
+# 3 and every punctuation mark on its own
+REGEX_TOKEN_PATTERN = re.compile(r'[^\W\d_]{1,8}|\d{1,3}|[^\w\s]|_')
+# A budget cut is moved back to a sentence end if the chunk stays at least this full
+MIN_SENTENCE_FILL = 0.5
+
+
+class WordTokenizer:
+    """Counts whitespace-separated words, like the original chunker."""
+    name = "words"
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+class RegexTokenizer:
+    """
+    Fast local approximation of subword tokenizers such as cl100k: usually within a
+    few percent of the real count on English prose, with no model files to load.
+    """
+    name = "regex"
+
+    def count(self, text: str) -> int:
+        return len(REGEX_TOKEN_PATTERN.findall(text))
+
+
+class TiktokenTokenizer:
+    """Exact counts for OpenAI encodings; needs the optional 'tiktoken' package."""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        try:
+            import tiktoken
+        except ImportError:
+            raise ImportError("CHUNK_TOKENIZER=tiktoken:... requires the 'tiktoken' package") from None
+        self.name = f"tiktoken:{encoding}"
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode_ordinary(text))
+
+
+class HFTokenizer:
+    """Exact counts for a Hugging Face tokenizer; needs the optional 'tokenizers' package."""
+
+    def __init__(self, name_or_path: str):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("CHUNK_TOKENIZER=hf:... requires the 'tokenizers' package") from None
+        self.name = f"hf:{name_or_path}"
+        if os.path.isfile(name_or_path):
+            self._tokenizer = Tokenizer.from_file(name_or_path)
+        else:
+            self._tokenizer = Tokenizer.from_pretrained(name_or_path)
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+_tokenizers: Dict[str, Any] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(spec: str = CHUNK_TOKENIZER):
+    """
+    Returns the process-wide tokenizer for a spec: "regex", "words",
+    "tiktoken:<encoding>" or "hf:<tokenizer name or tokenizer.json path>".
+    Any object with a `name` and a `count(text)` method can be used instead.
+    """
+    tokenizer = _tokenizers.get(spec)
+    if tokenizer is None:
+        with _tokenizers_lock:
+            tokenizer = _tokenizers.get(spec)
+            if tokenizer is None:
+                kind, _, argument = spec.partition(":")
+                if kind == "regex":
+                    tokenizer = RegexTokenizer()
+                elif kind == "words":
+                    tokenizer = WordTokenizer()
+                elif kind == "tiktoken":
+                    tokenizer = TiktokenTokenizer(argument or "cl100k_base")
+                elif kind == "hf" and argument:
+                    tokenizer = HFTokenizer(argument)
+                else:
+                    raise ValueError(f"Unknown tokenizer: {spec}")
+                _tokenizers[spec] = tokenizer
+    return tokenizer
+
+
+def parse_section_budgets(items: Sequence[str]) -> Dict[str, int]:
+    """Parses "section:tokens" items, e.g. from CHUNK_SECTION_MAX_TOKENS."""
+    budgets = {}
+    for item in items:
+        section, _, tokens = item.partition(":")
+        try:
+            budgets[section.strip()] = int(tokens)
+        except ValueError:
+            raise ValueError(f"Invalid section budget: {item!r}") from None
+    return budgets
+
+
+def chunking_settings() -> Dict[str, Any]:
+    """The chunking settings that change the produced chunks, for cache keys."""
+    return {
+        "tokenizer": CHUNK_TOKENIZER,
+        "max_tokens": CHUNK_MAX_TOKENS,
+        "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+        "section_max_tokens": parse_section_budgets(CHUNK_SECTION_MAX_TOKENS),
+    }
+
+
+class _Unit:
+    """A sentence, or a piece of one, as the chunk builder buffers it."""
+    __slots__ = ("text", "tokens", "start", "end", "page", "sentence_end")
+
+    def __init__(self, text: str, tokens: int, start: int, end: int, page: int, sentence_end: bool):
+        self.text = text
+        self.tokens = tokens
+        self.start = start
+        self.end = end
+        self.page = page
+        self.sentence_end = sentence_end
+
+
+class Chunker:
+    """
+    Chunking policy: a tokenizer, the token budget of a chunk (optionally per section)
+    and the overlap between consecutive chunks of a section. Stateless and shareable;
+    every document gets its own ChunkBuilder.
+    """
+
+    def __init__(self, tokenizer=None, max_tokens: int = CHUNK_MAX_TOKENS,
+                 overlap_tokens: int = CHUNK_OVERLAP_TOKENS, section_max_tokens: Optional[Dict[str, int]] = None):
+        if max_tokens < 1 or not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("Chunk budgets need max_tokens >= 1 and 0 <= overlap_tokens < max_tokens")
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.section_max_tokens = section_max_tokens or {}
+
+    def budget(self, section: str) -> int:
+        return self.section_max_tokens.get(section, self.max_tokens)
+
+    def builder(self, section: str = "unknown") -> "ChunkBuilder":
+        return ChunkBuilder(self, section)
+
+
+_chunker: Optional[Chunker] = None
+_chunker_lock = threading.Lock()
+
+
+def get_chunker() -> Chunker:
+    """Returns the chunker configured by the CHUNK_* settings."""
+    global _chunker
+    if _chunker is None:
+        with _chunker_lock:
+            if _chunker is None:
+                _chunker = Chunker(section_max_tokens=parse_section_budgets(CHUNK_SECTION_MAX_TOKENS))
+    return _chunker
+
+
+class ChunkBuilder:
+    """
+    Builds the chunks of one document incrementally. Text is fed line by line with
+    its offset in the document; each sentence is tokenized once, and a chunk is
+    emitted as soon as the budget is exceeded, cut at the last sentence end that
+    keeps it at least half full (otherwise at the last piece that fits). Sentences
+    longer than the budget are split between words.
+    """
+
+    def __init__(self, chunker: Chunker, section: str = "unknown"):
+        self.chunker = chunker
+        self._count = chunker.tokenizer.count
+        self.budget = chunker.budget(section)
+        self._units: List[_Unit] = []
+        self._tokens = 0
+        # Leading units repeated from the previous chunk
+        self._overlap = 0
+
+    def start_section(self, section: str) -> Iterator[ChunkSpan]:
+        """Closes the current chunk; chunks never span sections, nor overlap across them."""
+        yield from self.flush()
+        self.budget = self.chunker.budget(section)
+
+    def add(self, text: str, start: int, page: int) -> Iterator[ChunkSpan]:
+        """Adds a line of text starting at document offset `start`."""
+        position = 0
+        for match in SENTENCE_BOUNDARY_PATTERN.finditer(text):
+            yield from self._add_sentence(text[position:match.start(1)], start + position, page, True)
+            position = match.end()
+        if position < len(text):
+            tail = text[position:]
+            yield from self._add_sentence(tail, start + position, page, SENTENCE_END_PATTERN.search(tail) is not None)
+
+    def flush(self) -> Iterator[ChunkSpan]:
+        """Emits whatever is buffered beyond the overlap, and resets the builder."""
+        if len(self._units) > self._overlap:
+            yield self._span(self._units)
+        self._units, self._tokens, self._overlap = [], 0, 0
+
+    def _add_sentence(self, text: str, start: int, page: int, sentence_end: bool) -> Iterator[ChunkSpan]:
+        tokens = self._count(text)
+        if tokens <= self.budget:
+            units = [_Unit(text, tokens, start, start + len(text), page, sentence_end)]
+        else:
+            units = self._split_words(text, start, page, sentence_end)
+        for unit in units:
+            self._units.append(unit)
+            self._tokens += unit.tokens
+            while self._tokens > self.budget:
+                yield self._emit()
+
+    def _split_words(self, text: str, start: int, page: int, sentence_end: bool) -> List[_Unit]:
+        """
+        Cuts an over-long sentence into pieces of at most one budget, between words.
+        Words over the budget on their own (URLs, base64, leader dots) are cut inside.
+        """
+        units: List[_Unit] = []
+        piece_start = piece_end = None
+        tokens = 0
+        for match in WORD_PATTERN.finditer(text):
+            word_tokens = self._count(match.group())
+            if word_tokens > self.budget:
+                if piece_start is not None:
+                    units.append(_Unit(text[piece_start:piece_end], tokens, start + piece_start, start + piece_end,
+                                       page, False))
+                    piece_start, tokens = None, 0
+                units.extend(self._split_word(match.group(), start + match.start(), page))
+                continue
+            if piece_start is not None and tokens + word_tokens > self.budget:
+                units.append(_Unit(text[piece_start:piece_end], tokens, start + piece_start, start + piece_end,
+                                   page, False))
+                piece_start, tokens = None, 0
+            if piece_start is None:
+                piece_start = match.start()
+            piece_end = match.end()
+            tokens += word_tokens
+        if piece_start is not None:
+            units.append(_Unit(text[piece_start:piece_end], tokens, start + piece_start, start + piece_end,
+                               page, sentence_end))
+        return units
+
+    def _split_word(self, word: str, start: int, page: int) -> List[_Unit]:
+        """Cuts a word into the longest runs of characters that fit the budget."""
+        units: List[_Unit] = []
+        position = 0
+        while position < len(word):
+            # Binary search for the longest run that fits; at least one character
+            low, high = position + 1, len(word)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self._count(word[position:middle]) <= self.budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            units.append(_Unit(word[position:low], self._count(word[position:low]), start + position, start + low,
+                               page, False))
+            position = low
+        return units
+
+    def _emit(self) -> ChunkSpan:
+        """Emits the longest prefix of the buffer that fits the budget, snapped to a sentence end."""
+        units = self._units
+        # Repeated text must not crowd out new text; drop overlap until a new unit fits
+        while self._overlap and sum(unit.tokens for unit in units[:self._overlap + 1]) > self.budget:
+            self._tokens -= units.pop(0).tokens
+            self._overlap -= 1
+
+        total = 0
+        fits = sentence_cut = 0
+        for index, unit in enumerate(units):
+            total += unit.tokens
+            if total > self.budget:
+                break
+            fits = index + 1
+            if unit.sentence_end and fits > self._overlap and total >= self.budget * MIN_SENTENCE_FILL:
+                sentence_cut = fits
+        # A unit over the budget on its own (a character worth several tokens) still goes out
+        cut = sentence_cut or fits or 1
+        emitted, rest = units[:cut], units[cut:]
+
+        overlap: List[_Unit] = []
+        overlap_tokens = 0
+        if self.chunker.overlap_tokens:
+            for unit in reversed(emitted[1:]):
+                if overlap_tokens + unit.tokens > self.chunker.overlap_tokens:
+                    break
+                overlap.insert(0, unit)
+                overlap_tokens += unit.tokens
+            # Start the repeated text at a sentence start when there is one
+            first = len(emitted) - len(overlap)
+            for index in range(len(overlap)):
+                if emitted[first + index - 1].sentence_end:
+                    overlap = overlap[index:]
+                    break
+            overlap_tokens = sum(unit.tokens for unit in overlap)
+
+        self._units = overlap + rest
+        self._tokens = overlap_tokens + sum(unit.tokens for unit in rest)
+        self._overlap = len(overlap)
+        return self._span(emitted)
+
+    @staticmethod
+    def _span(units: List[_Unit]) -> ChunkSpan:
+        return " ".join(unit.text for unit in units), units[0].page, units[0].start, units[-1].end
@@ -0,0 +1,174 @@
+# app/core/config.py
+
+import os
+import tempfile
+
+
+def _env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment, falling back to a default."""
+    value = os.getenv(name)
+    try:
+        return int(value) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Reads an on/off setting from the environment ("1", "true", "yes" and "on" mean on)."""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name: str, default: str) -> list:
+    """Reads a comma-separated setting from the environment."""
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+# Default OCR language used when the caller does not ask for one
+OCR_DEFAULT_LANG = os.getenv("OCR_DEFAULT_LANG", "en")
+# Maximum number of PaddleOCR engines kept alive per language in one process
+OCR_POOL_SIZE = _env_int("OCR_POOL_SIZE", 1)
+# Languages to load at API startup ("" disables the warm-up)
+OCR_WARMUP_LANGS = _env_list("OCR_WARMUP_LANGS", OCR_DEFAULT_LANG)
+
+# Per-page OCR routing: pages with fewer meaningful characters than this are OCR candidates
+OCR_MIN_PAGE_CHARS = _env_int("OCR_MIN_PAGE_CHARS", 50)
+# Pages whose text layer covers less than this many characters per square inch are sparse
+OCR_MIN_CHARS_PER_SQ_INCH = float(os.getenv("OCR_MIN_CHARS_PER_SQ_INCH", "2.0"))
+# Fraction of the page covered by images above which a sparse page is treated as scanned
+OCR_MIN_IMAGE_COVERAGE = float(os.getenv("OCR_MIN_IMAGE_COVERAGE", "0.5"))
+# Fraction of unreadable glyphs (replacement/control/private-use characters) that forces OCR
+OCR_MAX_BAD_GLYPH_RATIO = float(os.getenv("OCR_MAX_BAD_GLYPH_RATIO", "0.2"))
+
+# Worker processes used for page-parallel extraction and OCR (0 = one per CPU, 1 = serial)
+PARSER_WORKERS = _env_int("PARSER_WORKERS", 0) or (os.cpu_count() or 1)
+# Documents with fewer pages than this are extracted serially; pool overhead dominates
+PARALLEL_MIN_PAGES = _env_int("PARALLEL_MIN_PAGES", 64)
+# Same for in-memory uploads, which workers can only read from a temporary copy written first
+PARALLEL_MIN_BUFFER_PAGES = _env_int("PARALLEL_MIN_BUFFER_PAGES", 256)
+# Minimum number of OCR pages before OCR is spread across worker processes
+PARALLEL_MIN_OCR_PAGES = _env_int("PARALLEL_MIN_OCR_PAGES", 4)
+
+# Upload jobs parsed concurrently by the API process
+JOB_WORKERS = _env_int("JOB_WORKERS", 2)
+# Uploads waiting for a worker before new ones are rejected with 503
+JOB_QUEUE_SIZE = _env_int("JOB_QUEUE_SIZE", 32)
+# Finished jobs (and their results) kept around for the status/result endpoints
+JOB_HISTORY = _env_int("JOB_HISTORY", 200)
+
+# Directory of the content-hash parse cache
+PARSE_CACHE_DIR = os.getenv(
+    "PARSE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pdf-ingestion", "parse")
+)
+# Upper bound of the parse cache on disk in megabytes (0 disables the cache)
+PARSE_CACHE_MAX_MB = _env_int("PARSE_CACHE_MAX_MB", 1024)
+# Directory of the page-level OCR cache, keyed by the hash of the rendered page
+OCR_CACHE_DIR = os.getenv(
+    "OCR_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pdf-ingestion", "ocr")
+)
+# Upper bound of the OCR page cache on disk in megabytes (0 disables the cache)
+OCR_CACHE_MAX_MB = _env_int("OCR_CACHE_MAX_MB", 256)
+# Directory where job results are spooled as JSONL while and after they are produced
+JOB_RESULTS_DIR = os.getenv(
+    "JOB_RESULTS_DIR", os.path.join(tempfile.gettempdir(), "pdf-ingestion-jobs")
+)
+
+# Uploads up to this size are kept in RAM; larger ones are memory-mapped from a spooled file
+UPLOAD_MEMORY_LIMIT_MB = _env_int("UPLOAD_MEMORY_LIMIT_MB", 16)
+
+# Fixed resolution pages are rasterised at for OCR (0 = pick per page from size and text height)
+OCR_DPI = _env_int("OCR_DPI", 0)
+# Pages (from one or several documents) grouped into one OCR batch
+OCR_PAGE_BATCH_SIZE = _env_int("OCR_PAGE_BATCH_SIZE", 8)
+# Text line crops per recognition forward pass
+OCR_REC_BATCH_SIZE = _env_int("OCR_REC_BATCH_SIZE", 16)
+# How long a partial batch waits for pages from other documents before running
+OCR_BATCH_MAX_WAIT_MS = _env_int("OCR_BATCH_MAX_WAIT_MS", 20)
+
+# Bounds of the per-page OCR resolution
+OCR_MIN_DPI = _env_int("OCR_MIN_DPI", 100)
+OCR_MAX_DPI = _env_int("OCR_MAX_DPI", 300)
+# Glyph height in pixels the adaptive resolution aims for
+OCR_TARGET_TEXT_PX = _env_int("OCR_TARGET_TEXT_PX", 24)
+# Upper bound on the pixels rendered for one page, whatever the resolution
+OCR_MAX_MEGAPIXELS = float(os.getenv("OCR_MAX_MEGAPIXELS", "6.0"))
+# Render only the part of the page inside its blank margins
+OCR_CROP_MARGINS = _env_bool("OCR_CROP_MARGINS", True)
+# Render pages in grayscale, and optionally binarise them, before OCR
+OCR_GRAYSCALE = _env_bool("OCR_GRAYSCALE", True)
+OCR_BINARIZE = _env_bool("OCR_BINARIZE", False)
+
+# Language detection: number and size (characters) of the text windows sampled per document
+LANG_SAMPLE_WINDOWS = _env_int("LANG_SAMPLE_WINDOWS", 8)
+LANG_WINDOW_CHARS = _env_int("LANG_WINDOW_CHARS", 600)
+# Seed of langdetect's sampling, so the same text always gets the same answer
+LANG_DETECT_SEED = _env_int("LANG_DETECT_SEED", 0)
+# Windows detected with less confidence than this are ignored
+LANG_MIN_CONFIDENCE = float(os.getenv("LANG_MIN_CONFIDENCE", "0.5"))
+# Share of windows a second language must win for chunks to be detected one by one
+LANG_MULTILINGUAL_MIN_SHARE = float(os.getenv("LANG_MULTILINGUAL_MIN_SHARE", "0.2"))
+
+# Batch uploads: most PDFs accepted in one request (archives included), and how many
+# of its documents are queued or parsing at the same time
+BATCH_MAX_FILES = _env_int("BATCH_MAX_FILES", 1000)
+BATCH_IN_FLIGHT = _env_int("BATCH_IN_FLIGHT", 8)
+
+# Layout mode: read PyMuPDF blocks and fonts for column order, running headers and headings
+PARSER_LAYOUT = _env_bool("PARSER_LAYOUT", False)
+# Lines at least this much larger than the body font are headings
+LAYOUT_HEADING_SIZE_RATIO = float(os.getenv("LAYOUT_HEADING_SIZE_RATIO", "1.15"))
+# Top and bottom share of the page searched for running headers and footers
+LAYOUT_MARGIN_RATIO = float(os.getenv("LAYOUT_MARGIN_RATIO", "0.08"))
+# Share of pages a margin line must repeat on to be dropped as a header or footer
+LAYOUT_REPEAT_RATIO = float(os.getenv("LAYOUT_REPEAT_RATIO", "0.5"))
+
+# Chunking: tokenizer used to measure chunks ("regex", "words", "tiktoken:<encoding>" or
+# "hf:<tokenizer name or tokenizer.json path>"), the token budget per chunk, and how many
+# tokens of the previous chunk each chunk repeats
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "regex")
+CHUNK_MAX_TOKENS = _env_int("CHUNK_MAX_TOKENS", 512)
+CHUNK_OVERLAP_TOKENS = _env_int("CHUNK_OVERLAP_TOKENS", 0)
+# Per-section budgets overriding CHUNK_MAX_TOKENS, e.g. "abstract:384,references:256"
+CHUNK_SECTION_MAX_TOKENS = _env_list("CHUNK_SECTION_MAX_TOKENS", "")
+
+# Near-duplicate detection: "off", "flag" (mark duplicates with duplicate_of) or "drop"
+DEDUP_MODE = os.getenv("DEDUP_MODE", "off").strip().lower()
+# SQLite index of the documents and chunks seen so far, shared by every run
+DEDUP_INDEX_PATH = os.getenv(
+    "DEDUP_INDEX_PATH", os.path.join(os.path.expanduser("~"), ".cache", "pdf-ingestion", "dedup.sqlite")
+)
+# Estimated Jaccard similarity (of word shingles) at which text counts as a duplicate
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# MinHash permutations, split into LSH bands; both are fixed once an index exists
+DEDUP_NUM_PERM = _env_int("DEDUP_NUM_PERM", 128)
+DEDUP_BANDS = _env_int("DEDUP_BANDS", 16)
+# Words per shingle
+DEDUP_SHINGLE_WORDS = _env_int("DEDUP_SHINGLE_WORDS", 5)
+
+# Parsing limits. PARSE_ISOLATED=true runs jobs in sandbox processes (one per job worker)
+# that are killed when a document overruns its time or memory. Sandboxes parse each
+# document serially with their own OCR engines, so in-process parsing is the default
+PARSE_ISOLATED = _env_bool("PARSE_ISOLATED", False)
+# Wall-clock budget of one document; when it runs out the pages processed so far are kept
+PARSE_TIMEOUT_SECONDS = _env_int("PARSE_TIMEOUT_SECONDS", 300)
+# Extra time a sandbox gets to wrap up after the budget before it is killed
+PARSE_KILL_GRACE_SECONDS = _env_int("PARSE_KILL_GRACE_SECONDS", 15)
+# Pages parsed per document at most; later pages are left out (0 = no limit)
+PARSE_MAX_PAGES = _env_int("PARSE_MAX_PAGES", 5000)
+# Pixels rendered for OCR per document at most, in megapixels (0 = no limit)
+PARSE_MAX_OCR_MEGAPIXELS = float(os.getenv("PARSE_MAX_OCR_MEGAPIXELS", "1500"))
+# Resident memory of a sandbox process above which it is killed (0 = no limit)
+PARSE_MAX_MEMORY_MB = _env_int("PARSE_MAX_MEMORY_MB", 4096)
+# Uploads larger than this are rejected outright (0 = no limit)
+PARSE_MAX_FILE_MB = _env_int("PARSE_MAX_FILE_MB", 512)
+
+# Full-text search over ingested chunks: when enabled, every parsed document is added to
+# an on-disk BM25 index that /api/chunks/search queries
+SEARCH_INDEX = _env_bool("SEARCH_INDEX", False)
+SEARCH_INDEX_PATH = os.getenv(
+    "SEARCH_INDEX_PATH", os.path.join(os.path.expanduser("~"), ".cache", "pdf-ingestion", "search.sqlite")
+)
+# Bytes of the index file searches read through a memory map, in MB (0 = regular reads)
+SEARCH_MMAP_MB = _env_int("SEARCH_MMAP_MB", 256)
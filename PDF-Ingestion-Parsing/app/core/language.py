@@ -0,0 +1,124 @@
+# app/core/language.py
+
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+
+from app.core.config import (
+    LANG_SAMPLE_WINDOWS,
+    LANG_WINDOW_CHARS,
+    LANG_DETECT_SEED,
+    LANG_MIN_CONFIDENCE,
+    LANG_MULTILINGUAL_MIN_SHARE,
+)
+
+
+def language_settings() -> Dict[str, Any]:
+    """The detection settings that change the detected languages, for cache keys."""
+    return {
+        "windows": LANG_SAMPLE_WINDOWS,
+        "window_chars": LANG_WINDOW_CHARS,
+        "seed": LANG_DETECT_SEED,
+        "min_confidence": LANG_MIN_CONFIDENCE,
+        "multilingual_min_share": LANG_MULTILINGUAL_MIN_SHARE,
+    }
+
+
+def sample_windows(text: str, windows: int = LANG_SAMPLE_WINDOWS, window_chars: int = LANG_WINDOW_CHARS) -> List[str]:
+    """
+    Cuts up to `windows` evenly spaced slices of `window_chars` characters out of the
+    text, starting each at a word boundary. Short texts are returned whole.
+    """
+    if len(text) <= 2 * window_chars or windows <= 1:
+        return [text[:window_chars * max(windows, 1)]]
+    samples = []
+    last_start = len(text) - window_chars
+    for index in range(windows):
+        start = last_start * index // (windows - 1)
+        if start:
+            space = text.find(" ", start, start + window_chars // 4)
+            start = space + 1 if space != -1 else start
+        samples.append(text[start:start + window_chars])
+    return samples
+
+
+class LanguageDetector:
+    """
+    langdetect with the language profiles loaded once per process and a fixed seed.
+    Documents are judged from a few sampled windows instead of their full text.
+    """
+
+    def __init__(self, seed: int = LANG_DETECT_SEED):
+        self.seed = seed
+        self._factory: Optional[DetectorFactory] = None
+        self._lock = threading.Lock()
+
+    def _get_factory(self) -> DetectorFactory:
+        if self._factory is None:
+            with self._lock:
+                if self._factory is None:
+                    factory = DetectorFactory()
+                    factory.load_profile(PROFILES_DIRECTORY)
+                    factory.set_seed(self.seed)
+                    self._factory = factory
+        return self._factory
+
+    def detect(self, text: str) -> Tuple[Optional[str], float]:
+        """Returns the most likely language of a short text and its probability."""
+        detector = self._get_factory().create()
+        detector.set_max_text_length(LANG_WINDOW_CHARS)
+        try:
+            detector.append(text[:LANG_WINDOW_CHARS])
+            best = detector.get_probabilities()[0]
+        except (LangDetectException, IndexError):
+            return None, 0.0
+        return best.lang, best.prob
+
+    def detect_many(self, texts: List[str]) -> List[Tuple[Optional[str], float]]:
+        """Detects the language of each text, e.g. every chunk of a multilingual document."""
+        return [self.detect(text) for text in texts]
+
+    def detect_document(self, text: str) -> Dict[str, Any]:
+        """
+        Detects a document's language from sampled windows. Returns the winning
+        language, its mean probability across the windows, the share of windows each
+        language won, and whether the document looks multilingual.
+        """
+        votes: Counter = Counter()
+        confidence: Dict[str, float] = {}
+        for window in sample_windows(text):
+            lang, prob = self.detect(window)
+            if lang is None or prob < LANG_MIN_CONFIDENCE:
+                continue
+            votes[lang] += 1
+            confidence[lang] = confidence.get(lang, 0.0) + prob
+        if not votes:
+            return {"language": None, "confidence": 0.0, "languages": {}, "multilingual": False}
+
+        total = sum(votes.values())
+        language, wins = votes.most_common(1)[0]
+        shares = {lang: round(count / total, 3) for lang, count in votes.most_common()}
+        return {
+            "language": language,
+            "confidence": round(confidence[language] / wins, 3),
+            "languages": shares,
+            "multilingual": any(share >= LANG_MULTILINGUAL_MIN_SHARE
+                                for lang, share in shares.items() if lang != language),
+        }
+
+
+_detector: Optional[LanguageDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_language_detector() -> LanguageDetector:
+    """Returns the process-wide language detector."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = LanguageDetector()
+    return _detector
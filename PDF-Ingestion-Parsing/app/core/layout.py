@@ -0,0 +1,181 @@
+# app/core/layout.py
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+import fitz  # PyMuPDF
+
+from app.core.config import LAYOUT_HEADING_SIZE_RATIO, LAYOUT_MARGIN_RATIO, LAYOUT_REPEAT_RATIO
+
+# A text line: (text, font size, bold)
+Line = Tuple[str, float, bool]
+# A text block: (x0, y0, x1, y1, lines)
+Block = Tuple[float, float, float, float, List[Line]]
+# What layout extraction keeps of a page: (width, height, blocks)
+PageLayout = Tuple[float, float, List[Block]]
+
+# PyMuPDF span flag for bold fonts
+BOLD_FLAG = 16
+# Blocks may overhang the page middle by this many points and still count as one column
+GUTTER_TOLERANCE_PT = 5
+# Documents shorter than this are too short to tell running headers from content
+MIN_PAGES_FOR_REPEATS = 3
+MAX_HEADING_WORDS = 12
+
+DIGITS_PATTERN = re.compile(r'\d+')
+PAGE_NUMBER_KEY_PATTERN = re.compile(r'^(page\s*)?#(\s*(/|of)\s*#)?$|^-\s*#\s*-$')
+HEADING_NUMBER_PATTERN = re.compile(r'^([\dIVX]+(\.\d+)*\.?|[A-Z]\.)\s+')
+NON_WORD_PATTERN = re.compile(r'[^a-z0-9]+')
+
+
+def page_blocks(page: fitz.Page) -> PageLayout:
+    """Reads a page's text blocks with the font size and weight of every line."""
+    blocks = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        if block["type"] != 0:
+            continue
+        lines = []
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            size = round(max(span["size"] for span in spans), 1)
+            bold = all(span["flags"] & BOLD_FLAG for span in spans)
+            lines.append((text, size, bold))
+        if lines:
+            blocks.append((*block["bbox"], lines))
+    return page.rect.width, page.rect.height, blocks
+
+
+def reading_order(blocks: List[Block], page_width: float) -> List[Block]:
+    """
+    Sorts blocks into reading order. On two-column pages each column is read top to
+    bottom before the next; blocks spanning both columns (titles, wide figures) start
+    a new band.
+    """
+    middle = page_width / 2
+
+    def column(block: Block) -> Optional[int]:
+        if block[2] <= middle + GUTTER_TOLERANCE_PT:
+            return 0
+        if block[0] >= middle - GUTTER_TOLERANCE_PT:
+            return 1
+        return None
+
+    by_top = sorted(blocks, key=lambda block: (block[1], block[0]))
+    columns = [column(block) for block in by_top]
+    if 0 not in columns or 1 not in columns:
+        return by_top
+
+    # A narrow block between two bands (e.g. a short caption) has nothing beside it in the
+    # other column but text above and below there; it is read as spanning both columns
+    for index, (block, block_column) in enumerate(zip(by_top, columns)):
+        if block_column is None:
+            continue
+        other = [other_block for other_block, other_column in zip(by_top, columns)
+                 if other_column is not None and other_column != block_column]
+        beside = any(other_block[1] < block[3] and other_block[3] > block[1] for other_block in other)
+        above = any(other_block[3] <= block[1] for other_block in other)
+        below = any(other_block[1] >= block[3] for other_block in other)
+        if not beside and above and below:
+            columns[index] = None
+
+    ordered: List[Block] = []
+    band: List[Tuple[int, Block]] = []
+    for block, block_column in zip(by_top, columns):
+        if block_column is None:
+            ordered.extend(block for _, block in sorted(band, key=lambda item: item[0]))
+            band = []
+            ordered.append(block)
+        else:
+            band.append((block_column, block))
+    ordered.extend(block for _, block in sorted(band, key=lambda item: item[0]))
+    return ordered
+
+
+def _margin_key(text: str) -> str:
+    """Normalises a margin line so running headers match across pages despite page numbers."""
+    return DIGITS_PATTERN.sub('#', text.lower()).strip()
+
+
+def _margin_lines(layout: PageLayout) -> List[str]:
+    width, height, blocks = layout
+    margin = height * LAYOUT_MARGIN_RATIO
+    return [
+        _margin_key(text)
+        for x0, y0, x1, y1, lines in blocks if y1 <= margin or y0 >= height - margin
+        for text, _, _ in lines
+    ]
+
+
+def repeated_margin_lines(layouts: Sequence[PageLayout]) -> set:
+    """Finds running headers and footers: margin lines that recur on many pages."""
+    if len(layouts) < MIN_PAGES_FOR_REPEATS:
+        return set()
+    counts = Counter(key for layout in layouts for key in set(_margin_lines(layout)))
+    threshold = max(2, LAYOUT_REPEAT_RATIO * len(layouts))
+    return {key for key, count in counts.items() if count >= threshold}
+
+
+def body_font_size(layouts: Sequence[PageLayout]) -> float:
+    """The font size carrying the most characters in the document."""
+    sizes: Counter = Counter()
+    for _, _, blocks in layouts:
+        for *_, lines in blocks:
+            for text, size, _ in lines:
+                sizes[size] += len(text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def heading_key(text: str) -> str:
+    """Turns a heading into a section type, e.g. "3.2 Experimental Setup" -> "experimental_setup"."""
+    text = HEADING_NUMBER_PATTERN.sub('', text.strip())
+    return NON_WORD_PATTERN.sub('_', text.lower()).strip('_')[:48] or "unknown"
+
+
+def _is_heading(text: str, size: float, bold: bool, body_size: float, max_length: int) -> bool:
+    if len(text) > max_length or len(text.split()) > MAX_HEADING_WORDS or text.endswith(('.', ',', ';')):
+        return False
+    if not any(char.isalpha() for char in text):
+        return False
+    return size >= body_size * LAYOUT_HEADING_SIZE_RATIO or (bold and size >= body_size)
+
+
+def assemble_pages(page_numbers: Sequence[int], layouts: Sequence[PageLayout],
+                   heading_pattern: Pattern, max_heading_length: int) -> List[Dict]:
+    """
+    Builds page entries from the layouts of a whole document in one pass: blocks in
+    reading order, running headers/footers and margin page numbers dropped, and the
+    indices of heading lines in `headings`. A line is a heading when its font is
+    larger (or bolder) than the body text, or when it opens a block and matches
+    `heading_pattern`.
+    """
+    repeated = repeated_margin_lines(layouts)
+    body_size = body_font_size(layouts)
+    pages = []
+    for page_number, (width, height, blocks) in zip(page_numbers, layouts):
+        margin = height * LAYOUT_MARGIN_RATIO
+        lines: List[str] = []
+        headings: List[int] = []
+        for x0, y0, x1, y1, block_lines in reading_order(blocks, width):
+            in_margin = y1 <= margin or y0 >= height - margin
+            for position, (text, size, bold) in enumerate(block_lines):
+                if in_margin:
+                    key = _margin_key(text)
+                    if key in repeated or PAGE_NUMBER_KEY_PATTERN.match(key):
+                        continue
+                heading = _is_heading(text, size, bold, body_size, max_heading_length) or (
+                    position == 0 and len(text) <= max_heading_length and heading_pattern.match(text) is not None
+                )
+                # A heading wrapped over several lines of one block is kept as one line
+                if heading and position and headings and headings[-1] == len(lines) - 1:
+                    lines[-1] += " " + text
+                    continue
+                if heading:
+                    headings.append(len(lines))
+                lines.append(text)
+        pages.append({"page_number": page_number, "text": "\n".join(lines), "source": "layout",
+                      "headings": headings})
+    return pages
@@ -0,0 +1,44 @@
+# app/core/limits.py
+
+import copy
+import time
+from typing import Optional
+
+from app.core.config import PARSE_MAX_OCR_MEGAPIXELS, PARSE_MAX_PAGES, PARSE_TIMEOUT_SECONDS
+
+
+class ParseLimits:
+    """
+    Budgets of one parse: wall-clock time, pages and OCR pixels. Running out does not
+    fail the document; the parser keeps the pages processed so far and records why it
+    stopped in `PDFParser.partial`. Picklable, so page workers check the same deadline.
+    """
+
+    def __init__(self, timeout: float = PARSE_TIMEOUT_SECONDS, max_pages: int = PARSE_MAX_PAGES,
+                 max_ocr_megapixels: float = PARSE_MAX_OCR_MEGAPIXELS):
+        # Wall-clock rather than monotonic time, so it means the same in every process
+        self.deadline = time.time() + timeout if timeout > 0 else None
+        self.max_pages = max_pages
+        self.max_ocr_pixels = int(max_ocr_megapixels * 1_000_000)
+        self.ocr_pixels = 0
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def add_ocr_pixels(self, pixels: int) -> None:
+        self.ocr_pixels += pixels
+
+    def ocr_stop_reason(self) -> Optional[str]:
+        """Why no further page may be rendered for OCR, or None while budget is left."""
+        if self.expired():
+            return "timeout"
+        if self.max_ocr_pixels and self.ocr_pixels >= self.max_ocr_pixels:
+            return "pixel_limit"
+        return None
+
+    def with_ocr_budget(self, pixels: int) -> "ParseLimits":
+        """A copy with the same deadline and `pixels` of OCR budget, for one part of the pages."""
+        part = copy.copy(self)
+        part.max_ocr_pixels = pixels
+        part.ocr_pixels = 0
+        return part
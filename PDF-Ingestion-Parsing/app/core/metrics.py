@@ -0,0 +1,173 @@
+# app/core/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Histogram buckets in seconds, from a fast text-layer page up to a long OCR job
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+class ParseStats:
+    """
+    Per-document timings of each pipeline stage plus simple counters.
+    A stage may be entered several times; its durations are summed.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """Adds the stages and counters of stats reported by another process, e.g. a sandbox."""
+        for name, seconds in data.get("stages", {}).items():
+            self.add_time(name, seconds)
+        for name, value in data.get("counters", {}).items():
+            self.count(name, value)
+
+    @property
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(self.total_seconds, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """A Prometheus-style cumulative histogram, one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        # Per-bucket counts, then sum and count
+        series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            for index, bound in enumerate(self.buckets):
+                labels = _format_labels(key + (("le", f"{bound:g}"),))
+                lines.append(f"{self.name}_bucket{labels} {series[index]:g}")
+            labels = _format_labels(key + (("le", "+Inf"),))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    """A Prometheus-style monotonically increasing counter, one series per label set."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._series[key] = self._series.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Aggregates ParseStats of every processed document for the /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = Histogram(
+            "pdf_parse_stage_seconds", "Time spent in each parser stage per document.", TIME_BUCKETS)
+        self.document_seconds = Histogram(
+            "pdf_parse_document_seconds", "End-to-end parse time per document.", TIME_BUCKETS)
+        self.document_pages = Histogram(
+            "pdf_parse_document_pages", "Pages per parsed document.", PAGE_BUCKETS)
+        self.documents = Counter("pdf_documents_total", "Documents parsed, by outcome.")
+        self.limited = Counter("pdf_documents_limited_total",
+                               "Documents cut short or rejected by a parsing limit, by reason.")
+        self.counters: Dict[str, Counter] = {}
+
+    def record_document(self, stats: ParseStats, status: str = "completed") -> None:
+        with self._lock:
+            self.documents.inc(status=status)
+            self.document_seconds.observe(stats.total_seconds)
+            if "pages" in stats.counters:
+                self.document_pages.observe(stats.counters["pages"])
+            for stage, seconds in stats.stages.items():
+                self.stage_seconds.observe(seconds, stage=stage)
+            for name, value in stats.counters.items():
+                if name not in self.counters:
+                    self.counters[name] = Counter(f"pdf_{name}_total", f"Total {name.replace('_', ' ')} processed.")
+                self.counters[name].inc(value)
+
+    def record_unparsed(self, status: str = "failed") -> None:
+        """Counts a document that failed before a parser existed (e.g. it could not be opened)."""
+        with self._lock:
+            self.documents.inc(status=status)
+
+    def record_limit(self, reason: str) -> None:
+        with self._lock:
+            self.limited.inc(reason=reason)
+
+    def render(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            for metric in (self.documents, self.limited, self.document_seconds, self.document_pages, self.stage_seconds):
+                lines.extend(metric.render())
+            for name in sorted(self.counters):
+                lines.extend(self.counters[name].render())
+        for name, value in sorted((extra_gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Returns the process-wide metrics registry."""
+    return _registry
@@ -1,5 +1,12 @@
+import json
+from array import array
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from typing import Iterable, Iterator, List, Dict, Optional, Any
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder writes the same bytes, only slower
+    orjson = None
 
 class DocumentChunkMetadata(BaseModel):
     """
@@ -13,6 +20,7 @@ class DocumentChunkMetadata(BaseModel):
     section_type: str
     page_number: int
     source_reference: Optional[str] = None
+    # Character span of the chunk's source text in the document text (pages joined by newlines)
     start_offset: Optional[int] = None
     end_offset: Optional[int] = None
 
@@ -37,25 +45,216 @@ class ParsedDocument(BaseModel):
     chunks: List[DocumentChunk]
     metadata: Dict[str, Any] # For any additional, top-level document metadata
     
+    @classmethod
+    def trusted(cls, document_id: str, doc_title: str, authors: List[str], language: str,
+                chunks: List[DocumentChunk], metadata: Dict[str, Any]) -> "ParsedDocument":
+        """
+        Builds a document from fields the parser produced itself, skipping validation
+        (chunks included, which would otherwise all be validated again).
+        """
+        return cls.model_construct(document_id=document_id, doc_title=doc_title, authors=authors,
+                                   language=language, chunks=chunks, metadata=metadata)
+
     # We'll use this to ensure the final output format is consistent
+    def iter_jsonl_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the parsed document as JSONL-ready dictionaries, one chunk at a time.
+        """
+        doi = self.metadata.get("doi")
+        for chunk in self.chunks:
+            # Chunks carry the language of their own pages; the document's is the fallback
+            yield chunk_to_record(chunk, self.doc_title, self.authors, chunk.metadata.language or self.language, doi)
+
     def to_jsonl_records(self) -> List[Dict[str, Any]]:
         """
         Converts the parsed document into a list of JSONL-ready dictionaries.
         """
-        records = []
-        for chunk in self.chunks:
-            record = {
-                "id": chunk.chunk_id,
-                "text": chunk.text,
-                "metadata": {
-                    "doc_title": self.doc_title,
-                    "authors": self.authors,
-                    "doi": self.metadata.get("doi"),
-                    "section_type": chunk.metadata.section_type,
-                    "page_number": chunk.metadata.page_number,
-                    "language": self.language
-                },
-                "source_reference": chunk.metadata.source_reference
-            }
-            records.append(record)
-        return records
\ No newline at end of file
+        return list(self.iter_jsonl_records())
+
+    def to_jsonl_bytes(self) -> bytes:
+        """
+        Serialises the document straight to JSONL bytes.
+        """
+        return dumps_jsonl_records(self.iter_jsonl_records())
+
+def trusted_chunk(chunk_id: str, text: str, document_id: str, doc_title: str, authors: List[str],
+                  language: str, section_type: str, page_number: int, start_offset: Optional[int] = None,
+                  end_offset: Optional[int] = None) -> DocumentChunk:
+    """
+    Builds a DocumentChunk from values the parser produced itself, without running
+    pydantic validation; the models behave the same, they are just not re-checked.
+    """
+    metadata = DocumentChunkMetadata.model_construct(
+        document_id=document_id, doc_title=doc_title, authors=authors, language=language,
+        section_type=section_type, page_number=page_number, start_offset=start_offset, end_offset=end_offset
+    )
+    return DocumentChunk.model_construct(chunk_id=chunk_id, text=text, metadata=metadata)
+
+def dumps_jsonl(record: Dict[str, Any]) -> bytes:
+    """
+    Serialises one record as a JSONL line (UTF-8, newline included), with orjson when
+    it is installed. Both encoders write compact separators and unescaped non-ASCII
+    text, and decode to the same JSON; the bytes can differ in places, e.g. in how a
+    float is spelled, so do not compare encoded lines across the two.
+    """
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+def dumps_jsonl_records(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Serialises records into one JSONL buffer."""
+    return b"".join(dumps_jsonl(record) for record in records)
+
+def make_record(chunk_id: str, text: str, section_type: str, page_number: int, doc_title: str,
+                authors: List[str], language: Optional[str], doi: Optional[str],
+                source_reference: Optional[str] = None, start_offset: Optional[int] = None,
+                end_offset: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Builds the JSONL record for one chunk from its own and the document-level fields.
+    """
+    return {
+        "id": chunk_id,
+        "text": text,
+        "metadata": {
+            "doc_title": doc_title,
+            "authors": authors,
+            "doi": doi,
+            "section_type": section_type,
+            "page_number": page_number,
+            "language": language,
+            "start_offset": start_offset,
+            "end_offset": end_offset
+        },
+        "source_reference": source_reference
+    }
+
+def chunk_to_record(chunk: DocumentChunk, doc_title: str, authors: List[str],
+                    language: Optional[str], doi: Optional[str]) -> Dict[str, Any]:
+    """
+    Builds the JSONL record for one chunk from the document-level fields.
+    """
+    return make_record(chunk.chunk_id, chunk.text, chunk.metadata.section_type, chunk.metadata.page_number,
+                       doc_title, authors, language, doi, chunk.metadata.source_reference,
+                       chunk.metadata.start_offset, chunk.metadata.end_offset)
+
+class ChunkRow:
+    """
+    One chunk of a CompactDocument: only the fields that differ between chunks.
+    """
+    __slots__ = ("index", "text", "section_type", "page_number", "language", "start_offset", "end_offset")
+
+    def __init__(self, index: int, text: str, section_type: str, page_number: int, language: Optional[str],
+                 start_offset: Optional[int] = None, end_offset: Optional[int] = None):
+        self.index = index
+        self.text = text
+        self.section_type = section_type
+        self.page_number = page_number
+        self.language = language
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+    def __repr__(self) -> str:
+        return (f"ChunkRow(index={self.index}, section_type={self.section_type!r}, "
+                f"page_number={self.page_number}, language={self.language!r})")
+
+class CompactDocument:
+    """
+    Memory-lean form of a parsed document for corpus-scale runs. Document-level fields
+    are stored once; chunks are kept as columns (texts, section codes, page numbers)
+    instead of one pydantic model per chunk.
+    """
+    __slots__ = ("document_id", "doc_title", "authors", "language", "metadata", "texts", "section_names",
+                 "section_codes", "page_numbers", "start_offsets", "end_offsets", "chunk_languages",
+                 "duplicates", "_section_index")
+
+    def __init__(self, document_id: str, doc_title: str, authors: List[str], language: Optional[str],
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.document_id = document_id
+        self.doc_title = doc_title
+        self.authors = authors
+        self.language = language
+        self.metadata = metadata or {}
+        self.texts: List[str] = []
+        # Section types are few, so each chunk stores a small code into section_names
+        self.section_names: List[str] = []
+        self.section_codes = array("H")
+        self.page_numbers = array("I")
+        # Character spans in the document text; -1 where a chunk has none
+        self.start_offsets = array("q")
+        self.end_offsets = array("q")
+        # Languages of the chunks that differ from the document language, by chunk index
+        self.chunk_languages: Dict[int, str] = {}
+        # Chunks found to duplicate earlier text: chunk index -> id of the earlier chunk or document
+        self.duplicates: Dict[int, str] = {}
+        self._section_index: Dict[str, int] = {}
+
+    def append(self, text: str, section_type: str, page_number: int, language: Optional[str] = None,
+               start_offset: Optional[int] = None, end_offset: Optional[int] = None) -> None:
+        code = self._section_index.get(section_type)
+        if code is None:
+            code = self._section_index[section_type] = len(self.section_names)
+            self.section_names.append(section_type)
+        if language and language != self.language:
+            self.chunk_languages[len(self.texts)] = language
+        self.texts.append(text)
+        self.section_codes.append(code)
+        self.page_numbers.append(page_number)
+        self.start_offsets.append(-1 if start_offset is None else start_offset)
+        self.end_offsets.append(-1 if end_offset is None else end_offset)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> ChunkRow:
+        start, end = self.start_offsets[index], self.end_offsets[index]
+        return ChunkRow(index, self.texts[index], self.section_names[self.section_codes[index]],
+                        self.page_numbers[index], self.chunk_languages.get(index, self.language),
+                        start if start >= 0 else None, end if end >= 0 else None)
+
+    def __iter__(self) -> Iterator[ChunkRow]:
+        for index in range(len(self.texts)):
+            yield self[index]
+
+    def chunk_id(self, index: int) -> str:
+        return f"{self.document_id}_chunk{index}"
+
+    @property
+    def section_types(self) -> List[str]:
+        """The section type of every chunk, decoded."""
+        return [self.section_names[code] for code in self.section_codes]
+
+    @property
+    def languages(self) -> List[Optional[str]]:
+        """The language of every chunk."""
+        return [self.chunk_languages.get(index, self.language) for index in range(len(self.texts))]
+
+    def iter_jsonl_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the same JSONL records as ParsedDocument, one chunk at a time.
+        """
+        doi = self.metadata.get("doi")
+        for row in self:
+            record = make_record(self.chunk_id(row.index), row.text, row.section_type, row.page_number,
+                                 self.doc_title, self.authors, row.language, doi,
+                                 start_offset=row.start_offset, end_offset=row.end_offset)
+            if row.index in self.duplicates:
+                record["metadata"]["duplicate_of"] = self.duplicates[row.index]
+            yield record
+
+    def to_jsonl_bytes(self) -> bytes:
+        """
+        Serialises the document straight to JSONL bytes.
+        """
+        return dumps_jsonl_records(self.iter_jsonl_records())
+
+    def to_parsed_document(self) -> ParsedDocument:
+        """
+        Expands the document into the pydantic models used by the API.
+        """
+        chunks = [
+            trusted_chunk(self.chunk_id(row.index), row.text, self.document_id, self.doc_title, self.authors,
+                          row.language, row.section_type, row.page_number, row.start_offset, row.end_offset)
+            for row in self
+        ]
+        return ParsedDocument.trusted(self.document_id, self.doc_title, self.authors, self.language, chunks,
+                                      self.metadata)
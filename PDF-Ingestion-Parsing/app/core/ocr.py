@@ -0,0 +1,62 @@
+# app/core/ocr.py
+
+from typing import List
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.core.config import OCR_DPI
+from app.core.ocr_preprocess import prepare_page
+
+
+def _sort_boxes(boxes: List) -> List:
+    """Orders detected text boxes top-to-bottom, then left-to-right within a line."""
+    return sorted(boxes, key=lambda box: (round(box[0][1] / 10), box[0][0]))
+
+
+def _crop_box(image: np.ndarray, box: List) -> np.ndarray:
+    """Cuts a (possibly rotated) quadrilateral text region out of the page image."""
+    points = np.array(box, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    if width < 1 or height < 1:
+        return None
+    target = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, matrix, (width, height),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    # Vertical text lines are recognised after rotating them upright
+    if height / width >= 1.5:
+        crop = np.ascontiguousarray(np.rot90(crop))
+    return crop
+
+
+def ocr_images(ocr_engine, images: List[np.ndarray]) -> List[str]:
+    """
+    OCRs a batch of page images. Detection runs per page; the text lines of all pages
+    are then recognised together, so recognition batches stay full across pages.
+    """
+    crops, owners = [], []
+    for index, image in enumerate(images):
+        boxes = ocr_engine.ocr(image, rec=False)[0] or []
+        for box in _sort_boxes(boxes):
+            crop = _crop_box(image, box)
+            if crop is not None:
+                crops.append(crop)
+                owners.append(index)
+
+    texts: List[List[str]] = [[] for _ in images]
+    if crops:
+        recognised = ocr_engine.ocr(crops, det=False, cls=True)[0]
+        drop_score = getattr(ocr_engine, "drop_score", 0.5)
+        for owner, (text, score) in zip(owners, recognised):
+            if score >= drop_score:
+                texts[owner].append(text)
+    return [" ".join(page_texts) for page_texts in texts]
+
+
+def ocr_page_text(page: fitz.Page, ocr_engine, dpi: int = OCR_DPI) -> str:
+    """Rasterises a single page and returns the text PaddleOCR finds on it."""
+    image, _ = prepare_page(page, dpi)
+    return ocr_images(ocr_engine, [image])[0] if image is not None else ""
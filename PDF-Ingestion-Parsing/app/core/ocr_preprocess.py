@@ -0,0 +1,169 @@
+# app/core/ocr_preprocess.py
+
+import math
+from typing import Any, Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.core.config import (
+    OCR_MIN_DPI,
+    OCR_MAX_DPI,
+    OCR_TARGET_TEXT_PX,
+    OCR_MAX_MEGAPIXELS,
+    OCR_CROP_MARGINS,
+    OCR_GRAYSCALE,
+    OCR_BINARIZE,
+)
+
+# Resolution of the cheap preview used to find margins and measure text height
+PREVIEW_DPI = 72
+# Preview pixels darker than this count as content
+INK_THRESHOLD = 200
+# Padding kept around the content when cropping margins, in points
+MARGIN_PAD_PT = 6
+# Glyphs are roughly this fraction of the nominal font size tall
+GLYPH_HEIGHT_RATIO = 0.7
+
+# OpenCV is imported by the functions that use it, so that importing the parser (which
+# only needs preprocess_settings from here) does not load it
+
+
+def preprocess_settings() -> Dict[str, Any]:
+    """The preprocessing settings that change OCR output, for cache keys."""
+    return {
+        "min_dpi": OCR_MIN_DPI,
+        "max_dpi": OCR_MAX_DPI,
+        "target_text_px": OCR_TARGET_TEXT_PX,
+        "max_megapixels": OCR_MAX_MEGAPIXELS,
+        "crop_margins": OCR_CROP_MARGINS,
+        "grayscale": OCR_GRAYSCALE,
+        "binarize": OCR_BINARIZE,
+    }
+
+
+def _pixmap_to_array(pix: fitz.Pixmap) -> np.ndarray:
+    """Views a pixmap's samples as an (height, width, channels) array without padding."""
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride // pix.n, pix.n)
+    return samples[:, :pix.width]
+
+
+def render_preview(page: fitz.Page) -> np.ndarray:
+    """Renders a small grayscale copy of the page."""
+    pix = page.get_pixmap(dpi=PREVIEW_DPI, colorspace=fitz.csGRAY, alpha=False)
+    return np.array(_pixmap_to_array(pix)[:, :, 0])
+
+
+def content_rect(page: fitz.Page, preview: np.ndarray) -> Optional[fitz.Rect]:
+    """Returns the page area inside its blank margins, or None for a blank page."""
+    ink = preview < INK_THRESHOLD
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if not len(rows):
+        return None
+    scale = 72 / PREVIEW_DPI
+    rect = fitz.Rect(cols[0] * scale, rows[0] * scale, (cols[-1] + 1) * scale, (rows[-1] + 1) * scale)
+    # The preview is rendered from the page's top-left corner, which may not be (0, 0)
+    rect = rect + (page.rect.x0, page.rect.y0, page.rect.x0, page.rect.y0)
+    rect = rect + (-MARGIN_PAD_PT, -MARGIN_PAD_PT, MARGIN_PAD_PT, MARGIN_PAD_PT)
+    return rect & page.rect
+
+
+def text_height_pt(page: fitz.Page, preview: np.ndarray) -> Tuple[Optional[float], bool]:
+    """
+    Estimates the typical glyph height on the page in points: from the font sizes of
+    the text layer when there is one, otherwise from the ink blobs of the preview.
+    Also returns whether the estimate came from the text layer.
+    """
+    sizes = [
+        span["size"]
+        for block in page.get_text("dict")["blocks"] if block["type"] == 0
+        for line in block["lines"]
+        for span in line["spans"] if span["text"].strip()
+    ]
+    if sizes:
+        return float(np.median(sizes)) * GLYPH_HEIGHT_RATIO, True
+
+    import cv2
+
+    _, ink = cv2.threshold(preview, INK_THRESHOLD, 255, cv2.THRESH_BINARY_INV)
+    count, _, blobs, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = blobs[1:count, cv2.CC_STAT_HEIGHT]
+    widths = blobs[1:count, cv2.CC_STAT_WIDTH]
+    # Ignore specks, rules and pictures; what is left is mostly characters
+    glyphs = heights[(heights >= 2) & (heights <= preview.shape[0] / 20) & (widths <= preview.shape[1] / 10)]
+    if len(glyphs) < 10:
+        return None, False
+    return float(np.median(glyphs)) * 72 / PREVIEW_DPI, False
+
+
+def native_image_dpi(page: fitz.Page) -> Optional[float]:
+    """The resolution of the largest image on the page; rendering finer adds no detail."""
+    best_area, best_dpi = 0.0, None
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        if bbox.is_empty or not info.get("width"):
+            continue
+        if abs(bbox) > best_area:
+            best_area = abs(bbox)
+            best_dpi = info["width"] / (bbox.width / 72)
+    return best_dpi
+
+
+def choose_dpi(page: fitz.Page, preview: np.ndarray, clip: fitz.Rect) -> int:
+    """Picks the rendering resolution for one page from its text height, images and size."""
+    height, from_text_layer = text_height_pt(page, preview)
+    dpi = OCR_TARGET_TEXT_PX * 72 / height if height else (OCR_MIN_DPI + OCR_MAX_DPI) / 2
+    # Scanned pages hold no more detail than their image; text layers render sharply at any size
+    if not from_text_layer:
+        image_dpi = native_image_dpi(page)
+        if image_dpi:
+            dpi = min(dpi, image_dpi)
+    dpi = min(max(dpi, OCR_MIN_DPI), OCR_MAX_DPI)
+    # Cap the pixel count of very large pages
+    area_sq_in = abs(clip) / (72 * 72)
+    if area_sq_in:
+        dpi = min(dpi, math.sqrt(OCR_MAX_MEGAPIXELS * 1e6 / area_sq_in))
+    return max(int(dpi), 1)
+
+
+def prepare_page(page: fitz.Page, dpi: Optional[int] = None) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+    """
+    Renders a page for OCR as a BGR array: margins cropped, resolution chosen per page
+    (unless `dpi` is given), optionally grayscale and binarised. Returns (None, info) for
+    blank pages. `info` records the resolution and the pixels handed to OCR.
+    """
+    clip = page.rect
+    preview = None
+    if OCR_CROP_MARGINS or not dpi:
+        preview = render_preview(page)
+    if OCR_CROP_MARGINS:
+        clip = content_rect(page, preview)
+        if clip is None or clip.is_empty:
+            return None, {"dpi": 0, "width": 0, "height": 0, "pixels": 0, "cropped": True}
+    if not dpi:
+        dpi = choose_dpi(page, preview, clip)
+
+    colorspace = fitz.csGRAY if OCR_GRAYSCALE or OCR_BINARIZE else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=colorspace, alpha=False)
+    samples = _pixmap_to_array(pix)
+    if pix.n == 1:
+        import cv2
+
+        gray = samples[:, :, 0]
+        if OCR_BINARIZE:
+            gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+        # PaddleOCR expects three channels
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+    else:
+        # Reversing the channels copies the pixels once, after which the pixmap can be freed
+        image = np.ascontiguousarray(samples[:, :, ::-1])
+
+    info = {
+        "dpi": dpi,
+        "width": pix.width,
+        "height": pix.height,
+        "pixels": pix.width * pix.height,
+        "cropped": clip != page.rect,
+    }
+    return image, info
@@ -0,0 +1,74 @@
+# app/core/page_analysis.py
+
+from typing import Dict, Any
+
+import fitz  # PyMuPDF
+
+from app.core.config import (
+    OCR_MIN_PAGE_CHARS,
+    OCR_MIN_CHARS_PER_SQ_INCH,
+    OCR_MIN_IMAGE_COVERAGE,
+    OCR_MAX_BAD_GLYPH_RATIO,
+)
+
+
+def _is_bad_glyph(char: str) -> bool:
+    """True for characters a broken font mapping typically produces."""
+    code = ord(char)
+    if char == "\ufffd":
+        return True
+    # Private use area, where unmapped glyphs of embedded fonts often land
+    if 0xE000 <= code <= 0xF8FF:
+        return True
+    # Control characters other than ordinary whitespace
+    return code < 32 and char not in "\t\n\r\f"
+
+
+def image_coverage(page: fitz.Page) -> float:
+    """Returns the fraction of the page area covered by images (capped at 1.0)."""
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page.rect
+        covered += abs(bbox)
+    return min(covered / page_area, 1.0)
+
+
+def analyze_page(page: fitz.Page, text: str) -> Dict[str, Any]:
+    """
+    Decides whether a page's text layer is usable or whether it must be OCR'd.
+    Returns the measurements alongside the decision so callers can log them.
+    """
+    visible = [c for c in text if not c.isspace()]
+    char_count = len(visible)
+    bad_glyphs = sum(1 for c in visible if _is_bad_glyph(c))
+    bad_ratio = bad_glyphs / char_count if char_count else 0.0
+
+    # Page area in square inches (PDF units are 1/72 inch)
+    area_sq_in = abs(page.rect) / (72 * 72) or 1.0
+    density = char_count / area_sq_in
+
+    coverage = 0.0
+    needs_ocr = False
+    reason = "text_layer"
+
+    if char_count and bad_ratio > OCR_MAX_BAD_GLYPH_RATIO:
+        needs_ocr, reason = True, "bad_glyphs"
+    elif char_count < OCR_MIN_PAGE_CHARS or density < OCR_MIN_CHARS_PER_SQ_INCH:
+        # Only inspect images for sparse pages; text-heavy pages never need it
+        coverage = image_coverage(page)
+        if coverage >= OCR_MIN_IMAGE_COVERAGE or (char_count < OCR_MIN_PAGE_CHARS and coverage > 0):
+            needs_ocr, reason = True, "scanned"
+        else:
+            reason = "sparse"
+
+    return {
+        "needs_ocr": needs_ocr,
+        "reason": reason,
+        "chars": char_count,
+        "chars_per_sq_inch": round(density, 2),
+        "image_coverage": round(coverage, 3),
+        "bad_glyph_ratio": round(bad_ratio, 3),
+    }
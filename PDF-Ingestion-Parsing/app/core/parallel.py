@@ -0,0 +1,174 @@
+# app/core/parallel.py
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Tuple, Optional
+
+import fitz  # PyMuPDF
+
+from app.core.config import OCR_DPI
+from app.core.layout import PageLayout, page_blocks
+from app.core.limits import ParseLimits
+from app.services.ocr_batcher import ocr_document_pages
+
+# Pages are split into more parts than workers so slow pages don't stall one worker
+PARTS_PER_WORKER = 4
+
+# One pool per worker count; a pool other jobs may still be using is never shut down
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+# Worker-side state: each worker keeps the last document it opened
+_worker_key: Optional[Tuple[str, int, int]] = None
+_worker_doc: Optional[fitz.Document] = None
+
+
+def get_page_executor(workers: int) -> ProcessPoolExecutor:
+    """Returns the process-wide page executor with `workers` processes, creating it on first use."""
+    with _executor_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            # Spawned workers don't inherit OCR threads or open documents from the parent
+            executor = _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return executor
+
+
+def shutdown_page_executor() -> None:
+    with _executor_lock:
+        for executor in _executors.values():
+            executor.shutdown()
+        _executors.clear()
+
+
+def partition(indices: List[int], workers: int) -> List[List[int]]:
+    """Splits page indices into contiguous, roughly equal parts."""
+    parts = max(1, min(len(indices), workers * PARTS_PER_WORKER))
+    size, extra = divmod(len(indices), parts)
+    result, start = [], 0
+    for part in range(parts):
+        stop = start + size + (1 if part < extra else 0)
+        result.append(indices[start:stop])
+        start = stop
+    return result
+
+
+def _open_worker_doc(file_path: str) -> fitz.Document:
+    """Opens the document once per worker and reuses the handle for later parts."""
+    global _worker_key, _worker_doc
+    # Temporary paths get reused, so the file's identity includes its mtime and size
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    if _worker_key != key:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(file_path)
+        _worker_key = key
+    return _worker_doc
+
+
+def _extract_text_part(file_path: str, page_indices: List[int]) -> List[Tuple[int, str]]:
+    doc = _open_worker_doc(file_path)
+    return [(index, doc[index].get_text("text")) for index in page_indices]
+
+
+def _extract_layout_part(file_path: str, page_indices: List[int]) -> List[Tuple[int, PageLayout]]:
+    doc = _open_worker_doc(file_path)
+    return [(index, page_blocks(doc[index])) for index in page_indices]
+
+
+def _ocr_part(file_path: str, page_indices: List[int], lang: str, dpi: int,
+              limits: Optional[ParseLimits]) -> List[Tuple[int, Tuple[str, dict]]]:
+    doc = _open_worker_doc(file_path)
+    return list(zip(page_indices, ocr_document_pages(doc, page_indices, lang, dpi, limits=limits)))
+
+
+def _run(func, file_path: str, page_indices: List[int], workers: int, *args,
+         on_pages_done: Optional[Callable[[int], None]] = None,
+         limits: Optional[ParseLimits] = None) -> List[Optional[str]]:
+    """
+    Fans parts out to the executor, `workers` at a time, and returns texts in the order
+    of `page_indices`. With `limits`, no part is started after the deadline; the pages
+    left out come back as None, always a tail of `page_indices`.
+    """
+    executor = get_page_executor(workers)
+    parts = deque(partition(page_indices, workers))
+    running = set()
+    texts = {}
+    while parts or running:
+        while parts and len(running) < workers and not (limits is not None and limits.expired()):
+            running.add(executor.submit(func, file_path, parts.popleft(), *args))
+        if not running:
+            break
+        done, running = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            part_texts = future.result()
+            texts.update(part_texts)
+            if on_pages_done:
+                on_pages_done(len(part_texts))
+    return [texts.get(index) for index in page_indices]
+
+
+def extract_text_parallel(file_path: str, page_indices: List[int], workers: int,
+                          limits: Optional[ParseLimits] = None) -> List[Optional[str]]:
+    """
+    Extracts the text layer of the given pages across worker processes; None for the
+    pages not reached before the deadline of `limits`.
+    """
+    return _run(_extract_text_part, file_path, list(page_indices), workers, limits=limits)
+
+
+def extract_layout_parallel(file_path: str, page_indices: List[int], workers: int,
+                            limits: Optional[ParseLimits] = None) -> List[Optional[PageLayout]]:
+    """Reads the text blocks and fonts of the given pages across worker processes, like extract_text_parallel."""
+    return _run(_extract_layout_part, file_path, list(page_indices), workers, limits=limits)
+
+
+def ocr_pages_parallel(file_path: str, page_indices: List[int], lang: str, workers: int, dpi: int = OCR_DPI,
+                       on_pages_done: Optional[Callable[[int], None]] = None,
+                       limits: Optional[ParseLimits] = None) -> List[Optional[Tuple[str, dict]]]:
+    """
+    OCRs the given pages across worker processes, each batching pages through its own OCR
+    engine. Returns (text, render info) pairs, or None for pages skipped because the
+    budget ran out. The pixel budget of `limits` is shared out by the parent: each part
+    starts with an even share of what is neither spent nor held by running parts, pages
+    a part's share did not reach are queued again, and the pixels spent are added to
+    `limits` so it reports why OCR stopped.
+    """
+    executor = get_page_executor(workers)
+    parts = deque(partition(list(page_indices), workers))
+    budget = limits.max_ocr_pixels if limits is not None else 0
+    # future -> (its pages, pixels held for it)
+    running: Dict = {}
+    held = 0
+    results = {}
+    while parts or running:
+        while parts and len(running) < workers and not (limits is not None and limits.ocr_stop_reason()):
+            part_limits, share = limits, 0
+            if budget:
+                share = (budget - limits.ocr_pixels - held) // (workers - len(running))
+                if share <= 0:
+                    break
+                part_limits = limits.with_ocr_budget(share)
+            part = parts.popleft()
+            running[executor.submit(_ocr_part, file_path, part, lang, dpi, part_limits)] = (part, share)
+            held += share
+        if not running:
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            part, share = running.pop(future)
+            held -= share
+            part_results = future.result()
+            results.update(part_results)
+            if limits is not None:
+                limits.add_ocr_pixels(sum(info["pixels"] for _, (_, info) in part_results))
+            if len(part_results) < len(part):
+                parts.appendleft(part[len(part_results):])
+            if on_pages_done:
+                on_pages_done(len(part_results))
+    return [results.get(index) for index in page_indices]
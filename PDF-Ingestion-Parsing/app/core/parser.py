@@ -3,210 +3,644 @@
 import fitz  # PyMuPDF
 import re
 import os
+import mmap
+import tempfile
+import json
 import uuid
-from typing import List, Dict, Any
+import hashlib
+from itertools import chain, islice, zip_longest
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple, Union
 
-# Corrected import from paddleocr
-from paddleocr import PaddleOCR
-from PIL import Image
-from io import BytesIO
-
-from app.core.models import ParsedDocument, DocumentChunk, DocumentChunkMetadata
-from app.core.utils import detect_language
+from app.core import config
+from app.core.config import (OCR_DEFAULT_LANG, OCR_DPI, PARSER_LAYOUT, PARSER_WORKERS, PARALLEL_MIN_PAGES,
+                             PARALLEL_MIN_BUFFER_PAGES, PARALLEL_MIN_OCR_PAGES)
+from app.core.metrics import ParseStats
+from app.core.models import ParsedDocument, DocumentChunk, CompactDocument, make_record, trusted_chunk
+from app.core.ocr_preprocess import preprocess_settings
+from app.core.page_analysis import analyze_page
+from app.core.parallel import extract_layout_parallel, extract_text_parallel, ocr_pages_parallel
+from app.core.language import get_language_detector, language_settings
+from app.core.chunking import Chunker, chunking_settings, get_chunker
+from app.core.layout import assemble_pages, heading_key, page_blocks
+from app.core.limits import ParseLimits
+from app.services.ocr_batcher import ocr_document_pages
 
 # Heuristic patterns for section titles (academic papers)
+SECTION_HEADINGS = {
+    "abstract": r"abstract",
+    "introduction": r"1\.?\s*introduction",
+    "related_work": r"\d\.?\s*related\s+work",
+    "methods": r"\d\.?\s*methods",
+    "results": r"\d\.?\s*results",
+    "conclusion": r"\d\.?\s*conclusion",
+    "references": r"references"
+}
 SECTION_PATTERNS = {
-    "abstract": re.compile(r"^\s*abstract\s*$", re.IGNORECASE),
-    "introduction": re.compile(r"^\s*1\.?\s*introduction\s*$", re.IGNORECASE),
-    "related_work": re.compile(r"^\s*\d\.?\s*related\s+work\s*$", re.IGNORECASE),
-    "methods": re.compile(r"^\s*\d\.?\s*methods\s*$", re.IGNORECASE),
-    "results": re.compile(r"^\s*\d\.?\s*results\s*$", re.IGNORECASE),  # This is the corrected line
-    "conclusion": re.compile(r"^\s*\d\.?\s*conclusion\s*$", re.IGNORECASE),
-    "references": re.compile(r"^\s*references\s*$", re.IGNORECASE)
+    name: re.compile(rf"^\s*{heading}\s*$", re.IGNORECASE) for name, heading in SECTION_HEADINGS.items()
 }
+# All headings in one pass; the matching group name is the section type
+SECTION_HEADER_PATTERN = re.compile(
+    r"^\s*(?:" + "|".join(f"(?P<{name}>{heading})" for name, heading in SECTION_HEADINGS.items()) + r")\s*$",
+    re.IGNORECASE,
+)
+# Lines longer than this are never section headings, so the regex is skipped for them
+MAX_HEADING_LENGTH = 64
+
+PAGE_NUMBER_PATTERN = re.compile(r'\s*Page\s+\d+\s*|\s*\d+\s*/\s*\d+\s*', re.IGNORECASE)
+NEWLINES_PATTERN = re.compile(r'[\r\n]+')
+# Chunks of a multilingual document are language-detected in groups of this size
+CHUNK_LANGUAGE_BATCH = 32
+# Leading pages read by the metadata-only mode, and before lazy chunking starts
+METADATA_PAGES = 2
+PAGE_RANGE_PATTERN = re.compile(r'^(\d+)?\s*(-)?\s*(\d+)?$')
+
+# Bump whenever a change alters the records produced for the same PDF
+PARSER_VERSION = "8"
+
+def parse_page_spec(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    Parses a 1-based page range spec such as "1-3,7,10-" into (first, last) pairs,
+    where last is None for an open range. Raises ValueError on malformed specs.
+    """
+    ranges = []
+    for part in spec.split(","):
+        match = PAGE_RANGE_PATTERN.match(part.strip())
+        if not part.strip() or not match or not (match.group(1) or match.group(3)):
+            raise ValueError(f"Invalid page range: {part.strip()!r}")
+        first, dash, last = match.groups()
+        first = int(first) if first else 1
+        last = int(last) if last else (None if dash else first)
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: {part.strip()!r}")
+        ranges.append((first, last))
+    return ranges
+
+def parse_page_ranges(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    Turns a page range spec into sorted 0-based page indices; None selects every page.
+    Pages past the end of the document are ignored.
+    """
+    if spec is None or not spec.strip():
+        return list(range(page_count))
+    selected = set()
+    for first, last in parse_page_spec(spec):
+        selected.update(range(first - 1, min(last or page_count, page_count)))
+    if not selected:
+        raise ValueError(f"Page range {spec!r} selects no pages of a {page_count}-page document")
+    return sorted(selected)
+
+def parser_fingerprint(ocr_lang: str = OCR_DEFAULT_LANG, ocr_dpi: int = OCR_DPI,
+                       page_range: Optional[str] = None, layout: bool = PARSER_LAYOUT) -> str:
+    """Identifies the parser settings that influence the output, for cache keys."""
+    settings = {
+        "version": PARSER_VERSION,
+        "layout": {
+            "heading_size_ratio": config.LAYOUT_HEADING_SIZE_RATIO,
+            "margin_ratio": config.LAYOUT_MARGIN_RATIO,
+            "repeat_ratio": config.LAYOUT_REPEAT_RATIO,
+        } if layout else None,
+        "page_range": page_range.replace(" ", "") if page_range else None,
+        "ocr_lang": ocr_lang,
+        "ocr_dpi": ocr_dpi,
+        "ocr_preprocess": preprocess_settings(),
+        "language": language_settings(),
+        "chunking": chunking_settings(),
+        "ocr_min_page_chars": config.OCR_MIN_PAGE_CHARS,
+        "ocr_min_chars_per_sq_inch": config.OCR_MIN_CHARS_PER_SQ_INCH,
+        "ocr_min_image_coverage": config.OCR_MIN_IMAGE_COVERAGE,
+        "ocr_max_bad_glyph_ratio": config.OCR_MAX_BAD_GLYPH_RATIO,
+    }
+    encoded = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
 
 def clean_text(text: str) -> str:
     """Removes common PDF artifacts and cleans text."""
     # Remove headers, footers, and page numbers (simple heuristic)
-    text = re.sub(r'\s*Page\s+\d+\s*|\s*\d+\s*/\s*\d+\s*', '', text, flags=re.IGNORECASE)
+    text = PAGE_NUMBER_PATTERN.sub('', text)
     # Normalize multiple newlines to a single one
-    text = re.sub(r'[\r\n]+', '\n', text)
+    text = NEWLINES_PATTERN.sub('\n', text)
     # Remove leading/trailing whitespace
     text = text.strip()
     return text
 
+# A PDF given as a path on disk or as an in-memory / memory-mapped buffer
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap]
+# A chunk as the chunker yields it: (text, section, page number, start offset, end offset)
+ChunkRowTuple = Tuple[str, str, int, int, int]
+
 class PDFParser:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-        self.doc = fitz.open(self.file_path)
+    def __init__(self, source: PDFSource, ocr_lang: str = OCR_DEFAULT_LANG, workers: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None, ocr_dpi: int = OCR_DPI,
+                 page_range: Optional[str] = None, layout: Optional[bool] = None,
+                 chunker: Optional[Chunker] = None, limits: Optional[ParseLimits] = None):
+        # Per-stage timings and counters for this document
+        self.stats = ParseStats()
+        # Buffers are parsed in place; only worker processes need a file, written on demand
+        self._spill_path: Optional[str] = None
+        with self.stats.stage("open"):
+            if isinstance(source, (str, os.PathLike)):
+                self.file_path = os.fspath(source)
+                self.source_buffer = None
+                self.doc = fitz.open(self.file_path)
+                input_bytes = os.path.getsize(self.file_path)
+            else:
+                self.file_path = None
+                # fitz accepts bytes and memoryviews; a view over an mmap avoids copying the file
+                self._owns_view = isinstance(source, (mmap.mmap, bytearray))
+                self.source_buffer = memoryview(source) if self._owns_view else source
+                try:
+                    self.doc = fitz.open(stream=self.source_buffer, filetype="pdf")
+                except Exception:
+                    # No parser is returned to close, so let go of the view here
+                    if self._owns_view:
+                        self.source_buffer.release()
+                    raise
+                input_bytes = len(source)
+        # 0-based indices of the pages to parse, from a 1-based spec such as "1-3,7"
+        try:
+            self.page_indices = parse_page_ranges(page_range, len(self.doc))
+        except ValueError:
+            self.close()
+            raise
+        # Time, page and OCR pixel budgets; None parses the whole selection whatever it costs
+        self.limits = limits
+        # Set when a budget ran out: {"reason", "pages_total", "pages_processed"}
+        self.partial: Optional[Dict[str, Any]] = None
+        self.pages_data: List[Dict] = []
+        # Document-level metadata (DOI, language confidence, partial), filled in by the analysis
+        self.doc_metadata: Dict[str, Any] = {}
+        if limits is not None and limits.max_pages and len(self.page_indices) > limits.max_pages:
+            self._keep_pages(self.page_indices[:limits.max_pages], "page_limit")
+        self.stats.count("pages", len(self.page_indices))
+        self.stats.count("input_bytes", input_bytes)
         self.doc_id = str(uuid.uuid4())
         self.text_content = ""
-        self.pages_data: List[Dict] = []
-        # Initialize PaddleOCR once for the entire class instance
-        self.ocr_engine = PaddleOCR(use_angle_cls=True, lang="en")
+        self.language: Optional[str] = None
+        # Sampled detection result: language, confidence, per-language shares, multilingual flag
+        self.language_info: Dict[str, Any] = {}
+        # OCR engines are borrowed from the shared pool only when a page needs them
+        self.ocr_lang = ocr_lang
+        # Fixed OCR resolution; 0 picks one per page
+        self.ocr_dpi = ocr_dpi
+        # Read blocks and fonts (column order, running headers, font-size headings) instead of plain text
+        self.layout = PARSER_LAYOUT if layout is None else layout
+        # Tokenizer, token budgets and overlap of the chunks (the CHUNK_* settings by default)
+        self.chunker = chunker or get_chunker()
+        # Number of worker processes for page-parallel extraction (1 = always serial)
+        self.workers = PARSER_WORKERS if workers is None else max(1, workers)
+        # Called with (pages_done, pages_total) as pages get their final text
+        self.progress_callback = progress_callback
+        self.pages_done = 0
+
+    def _parallel_extraction(self) -> bool:
+        """Whether text/layout extraction is spread across worker processes."""
+        min_pages = PARALLEL_MIN_PAGES if self.file_path else max(PARALLEL_MIN_PAGES, PARALLEL_MIN_BUFFER_PAGES)
+        return self.workers > 1 and len(self.page_indices) >= min_pages
+
+    @property
+    def source_name(self) -> str:
+        return self.file_path or "<in-memory PDF>"
+
+    def _worker_file_path(self) -> str:
+        """
+        Returns a path worker processes can open, spilling an in-memory source to disk once.
+        A buffer is only spilled for parallel OCR or for text extraction from at least
+        PARALLEL_MIN_BUFFER_PAGES pages, where the copy costs little next to the parse.
+        """
+        if self.file_path:
+            return self.file_path
+        if self._spill_path is None:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                tmp.write(self.source_buffer)
+                self._spill_path = tmp.name
+        return self._spill_path
+
+    def close(self) -> None:
+        """Closes the document and removes any temporary copy made for worker processes."""
+        if self.doc:
+            self.doc.close()
+        # Release our view so the caller can close an mmap source
+        if self.source_buffer is not None and self._owns_view:
+            self.source_buffer.release()
+        if self._spill_path:
+            os.unlink(self._spill_path)
+            self._spill_path = None
+
+    def _out_of_time(self) -> bool:
+        return self.limits is not None and self.limits.expired()
+
+    def _keep_pages(self, page_indices: List[int], reason: str) -> None:
+        """Narrows the document to the pages processed before a budget ran out."""
+        if self.partial is None:
+            self.partial = {"reason": reason, "pages_total": len(self.page_indices)}
+        self.partial["reason"] = reason
+        kept = set(page_indices)
+        self.page_indices = list(page_indices)
+        self.pages_data = [page_data for page_data in self.pages_data if page_data["page_number"] - 1 in kept]
+        self.partial["pages_processed"] = len(self.page_indices)
+        print(f"Parsing {self.source_name} stopped early ({reason}): "
+              f"{len(self.page_indices)} of {self.partial['pages_total']} pages kept.")
+
+    def _report_pages_done(self, count: int) -> None:
+        self.pages_done += count
+        if self.progress_callback:
+            self.progress_callback(self.pages_done, len(self.page_indices))
 
     def _extract_text_with_pypdf(self) -> str:
         """Extracts text using PyMuPDF."""
+        if self.layout:
+            return self._extract_text_with_layout()
         full_text = ""
         self.pages_data = []
 
-        for page_num, page in enumerate(self.doc):
-            text = page.get_text("text")
+        serial = not self._parallel_extraction()
+        if serial:
+            page_texts = (self.doc[page_num].get_text("text") for page_num in self.page_indices)
+        else:
+            page_texts = extract_text_parallel(self._worker_file_path(), self.page_indices, self.workers,
+                                               limits=self.limits)
+
+        for page_num, text in zip(self.page_indices, page_texts):
+            # Pages the workers did not reach before the deadline
+            if text is None:
+                break
             full_text += text + "\n"
             
             # Store page data for later use
-            self.pages_data.append({"page_number": page_num + 1, "text": text})
+            self.pages_data.append({"page_number": page_num + 1, "text": text, "source": "text"})
+            if serial and self._out_of_time():
+                break
 
+        if len(self.pages_data) < len(self.page_indices):
+            self._keep_pages(self.page_indices[:len(self.pages_data)], "timeout")
         return full_text
 
-    def _extract_text_with_ocr(self) -> str:
-        """Applies OCR as a fallback using PaddleOCR."""
-        full_text = ""
-        self.pages_data = []
+    def _extract_text_with_layout(self) -> str:
+        """
+        Extracts text from PyMuPDF blocks: columns in reading order, running headers and
+        footers removed, and heading lines marked for the chunker.
+        """
+        if self._parallel_extraction():
+            layouts = extract_layout_parallel(self._worker_file_path(), self.page_indices, self.workers,
+                                              limits=self.limits)
+            if None in layouts:
+                layouts = layouts[:layouts.index(None)]
+                self._keep_pages(self.page_indices[:len(layouts)], "timeout")
+        else:
+            layouts = []
+            for page_num in self.page_indices:
+                layouts.append(page_blocks(self.doc[page_num]))
+                if self._out_of_time():
+                    break
+            if len(layouts) < len(self.page_indices):
+                self._keep_pages(self.page_indices[:len(layouts)], "timeout")
+        self.pages_data = assemble_pages([page_num + 1 for page_num in self.page_indices], layouts,
+                                         SECTION_HEADER_PATTERN, MAX_HEADING_LENGTH)
+        return "".join(page_data["text"] + "\n" for page_data in self.pages_data)
 
-        for page_num, page in enumerate(self.doc):
-            pix = page.get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # The result is a list of lists. We need to extract the text.
-            ocr_result = self.ocr_engine.ocr(img, cls=True)
-            
-            page_text = ""
-            if ocr_result and ocr_result[0] is not None:
-                # The first element is the text, the second is the confidence score
-                texts = [line[1][0] for line in ocr_result[0]]
-                page_text = " ".join(texts)
-                
-            full_text += page_text + "\n"
-            self.pages_data.append({"page_number": page_num + 1, "text": page_text})
+    def _select_pages_for_ocr(self) -> List[int]:
+        """Returns the (0-based) indices of pages whose text layer is missing or unusable."""
+        selected = []
+        for page_data in self.pages_data:
+            index = page_data["page_number"] - 1
+            analysis = analyze_page(self.doc[index], page_data["text"])
+            page_data["analysis"] = analysis
+            if analysis["needs_ocr"]:
+                selected.append(index)
+        return selected
 
-        return full_text
+    def _extract_text_with_ocr(self, page_indices: Optional[List[int]] = None) -> str:
+        """
+        Applies OCR using PaddleOCR to the given pages (all selected pages by default) and
+        merges the results back into `pages_data` in page order.
+        """
+        if page_indices is None:
+            page_indices = self.page_indices
+        if len(self.pages_data) != len(self.page_indices):
+            self.pages_data = [
+                {"page_number": page_num + 1, "text": "", "source": "text"}
+                for page_num in self.page_indices
+            ]
+        pages_by_index = {page_data["page_number"] - 1: page_data for page_data in self.pages_data}
 
-    def _parse_structure_and_chunk(self) -> List[DocumentChunk]:
-        """Identifies sections and chunks the text with metadata."""
-        chunks: List[DocumentChunk] = []
-        current_section = "unknown"
-        current_chunk_text = ""
-        chunk_id_counter = 0
+        page_indices = list(page_indices)
+        if self.workers > 1 and len(page_indices) >= PARALLEL_MIN_OCR_PAGES:
+            page_results = ocr_pages_parallel(self._worker_file_path(), page_indices, self.ocr_lang, self.workers,
+                                            self.ocr_dpi, on_pages_done=self._report_pages_done,
+                                            limits=self.limits)
+        else:
+            # Pages join batches shared with every other document being OCR'd in this process
+            page_results = ocr_document_pages(self.doc, page_indices, self.ocr_lang, self.ocr_dpi,
+                                            on_page_done=self._report_pages_done, limits=self.limits)
+
+        # Pages the OCR budget did not reach are dropped rather than kept without text
+        skipped = set()
+        for page_num, page_result in zip_longest(page_indices, page_results):
+            if page_result is None:
+                skipped.add(page_num)
+                continue
+            page_text, render_info = page_result
+            page_data = pages_by_index[page_num]
+            page_data["text"] = page_text
+            page_data["source"] = "ocr"
+            page_data.pop("headings", None)
+            # Resolution and pixel count, to weigh OCR accuracy against throughput
+            page_data["ocr"] = render_info
+            self.stats.count("ocr_pixels", render_info["pixels"])
+            if render_info.get("cached"):
+                self.stats.count("ocr_cache_hits")
+        if skipped:
+            reason = self.limits.ocr_stop_reason() if self.limits is not None else None
+            self._keep_pages([index for index in self.page_indices if index not in skipped], reason or "timeout")
 
-        # Heuristically parse document-level metadata
-        doc_title = "Untitled Document"
-        authors = ["Unknown Author"]
+        return "".join(page_data["text"] + "\n" for page_data in self.pages_data)
+
+    def _extract_header(self) -> None:
+        """Heuristically parses document-level metadata (title, authors) from the first page."""
+        self.doc_title = "Untitled Document"
+        self.authors = ["Unknown Author"]
+        if not self.pages_data:
+            return
         # Simple heuristic: try to get title/authors from first page
         first_page_text = self.pages_data[0]["text"]
         lines = first_page_text.split('\n')
         # A more robust solution would use a dedicated NLP model
         if lines:
-            doc_title = lines[0].strip() if lines[0].strip() else "Untitled Document"
+            self.doc_title = lines[0].strip() if lines[0].strip() else "Untitled Document"
             # Attempt to find common author patterns (not robust)
             for line in lines[1:]:
                 if '@' in line:
-                    authors = [line.strip()] # Simplistic, but a start
+                    self.authors = [line.strip()] # Simplistic, but a start
+
+    def _make_chunk(self, chunk_index: int, text: str, section: str, page_number: int,
+                    language: Optional[str] = None, start_offset: Optional[int] = None,
+                    end_offset: Optional[int] = None) -> DocumentChunk:
+        return trusted_chunk(f"{self.doc_id}_chunk{chunk_index}", text, self.doc_id, self.doc_title, self.authors,
+                             language or self.language, section, page_number, start_offset, end_offset)
+
+    def _iter_chunks(self, pages: Optional[Iterable[Dict]] = None) -> Iterator[DocumentChunk]:
+        """Identifies sections and yields chunks with metadata as soon as each one is complete."""
+        rows = self._with_chunk_languages(self._iter_chunk_rows(pages))
+        for chunk_index, row in enumerate(rows):
+            yield self._make_chunk(chunk_index, *row)
+
+    def _with_chunk_languages(self, rows: Iterator[ChunkRowTuple]) -> Iterator[Tuple]:
+        """
+        Inserts each chunk's language into its row, after the page number. Only documents that look multilingual
+        have their chunks detected, in batches; others get the document language.
+        """
+        if not self.language_info.get("multilingual"):
+            for text, section, page_number, start, end in rows:
+                yield text, section, page_number, self.language, start, end
+            return
+        detector = get_language_detector()
+        while True:
+            batch = list(islice(rows, CHUNK_LANGUAGE_BATCH))
+            if not batch:
+                return
+            detected = detector.detect_many([row[0] for row in batch])
+            for (text, section, page_number, start, end), (language, _) in zip(batch, detected):
+                yield text, section, page_number, language or self.language, start, end
+
+    def _iter_chunk_rows(self, pages: Optional[Iterable[Dict]] = None) -> Iterator[ChunkRowTuple]:
+        """
+        Identifies sections and yields (text, section, page number, start offset, end offset)
+        for each chunk as soon as it is complete. Offsets are character positions in the
+        document text (each page's text followed by a newline, as in `text_content`).
+        Pages are consumed lazily and each line is scanned once, so the cost is linear in
+        the document size; token budgets, overlap and sentence snapping are up to the chunker.
+        """
+        if pages is None:
+            pages = self.pages_data
+        current_section = "unknown"
+        builder = self.chunker.builder(current_section)
+        # Offset of the current page's text in the document
+        page_offset = 0
+
+        for page_data in pages:
+            page_number = page_data["page_number"]
+            page_text = page_data["text"]
+            # Layout pages come with their heading lines marked and running headers removed
+            headings = page_data.get("headings")
+            if headings is not None:
+                headings = set(headings)
+
+            line_offset = page_offset
+            for line_number, line in enumerate(page_text.split('\n')):
+                line_start = line_offset
+                line_offset += len(line) + 1
+                section = None
+                if headings is None:
+                    # Check for new section based on patterns
+                    match = SECTION_HEADER_PATTERN.match(line) if len(line) <= MAX_HEADING_LENGTH else None
+                    section = match.lastgroup if match else None
+                elif line_number in headings:
+                    match = SECTION_HEADER_PATTERN.match(line)
+                    section = match.lastgroup if match else heading_key(line)
+                if section:
+                    # Finalize the previous chunk before starting a new section
+                    for text, chunk_page, start, end in builder.start_section(section):
+                        yield text, current_section, chunk_page, start, end
+                    current_section = section
+
+                # Lines never contain newlines here, so only the page-number cleanup applies
+                cleaned_line = (PAGE_NUMBER_PATTERN.sub('', line) if headings is None else line).strip()
+                if not cleaned_line:
+                    continue
+                start = line_start + max(line.find(cleaned_line), 0)
+                for text, chunk_page, chunk_start, end in builder.add(cleaned_line, start, page_number):
+                    yield text, current_section, chunk_page, chunk_start, end
+            page_offset += len(page_text) + 1
 
-        # Process page by page, line by line
-        for page_data in self.pages_data:
-            text = page_data["text"]
-            lines = text.split('\n')
-            
-            for line_num, line in enumerate(lines):
-                # Check for new section based on patterns
-                for section_name, pattern in SECTION_PATTERNS.items():
-                    if pattern.search(line):
-                        current_section = section_name
-                        if current_chunk_text:
-                            # Finalize the previous chunk before starting a new section
-                            chunk_id = f"{self.doc_id}_chunk{chunk_id_counter}"
-                            metadata = DocumentChunkMetadata(
-                                document_id=self.doc_id,
-                                doc_title=doc_title,
-                                authors=authors,
-                                language=self.language,
-                                section_type=current_section,
-                                page_number=page_data["page_number"]
-                            )
-                            chunks.append(DocumentChunk(chunk_id=chunk_id, text=current_chunk_text, metadata=metadata))
-                            current_chunk_text = ""
-                            chunk_id_counter += 1
-                        break
-                
-                # Append line to current chunk
-                cleaned_line = clean_text(line)
-                if cleaned_line:
-                    current_chunk_text += " " + cleaned_line
-
-                # Chunking logic (simple token-based check)
-                if len(current_chunk_text.split()) >= 500:
-                    chunk_id = f"{self.doc_id}_chunk{chunk_id_counter}"
-                    metadata = DocumentChunkMetadata(
-                        document_id=self.doc_id,
-                        doc_title=doc_title,
-                        authors=authors,
-                        language=self.language,
-                        section_type=current_section,
-                        page_number=page_data["page_number"]
-                    )
-                    chunks.append(DocumentChunk(chunk_id=chunk_id, text=current_chunk_text, metadata=metadata))
-                    current_chunk_text = ""
-                    chunk_id_counter += 1
-        
         # Add the last remaining chunk
-        if current_chunk_text:
-            chunk_id = f"{self.doc_id}_chunk{chunk_id_counter}"
-            metadata = DocumentChunkMetadata(
-                document_id=self.doc_id,
-                doc_title=doc_title,
-                authors=authors,
-                language=self.language,
-                section_type=current_section,
-                page_number=self.pages_data[-1]["page_number"]
-            )
-            chunks.append(DocumentChunk(chunk_id=chunk_id, text=current_chunk_text, metadata=metadata))
-            
-        return chunks
+        for text, chunk_page, start, end in builder.flush():
+            yield text, current_section, chunk_page, start, end
 
-    def process(self) -> ParsedDocument:
-        """Main processing function to orchestrate the pipeline."""
-        try:
-            # First, try to extract text normally
+    def _parse_structure_and_chunk(self) -> List[DocumentChunk]:
+        """Identifies sections and chunks the text with metadata."""
+        return list(self._iter_chunks())
+
+    def _prepare(self) -> None:
+        """Runs every stage that needs the whole document: extraction, OCR, language, DOI and header."""
+        # First, try to extract text normally
+        with self.stats.stage("extract_text"):
             self.text_content = self._extract_text_with_pypdf()
-            
-            # Simple check if extraction failed, or if text is too short
-            if not self.text_content.strip() or len(self.text_content.strip()) < 100:
-                print("PyMuPDF extraction failed or returned too little text. Applying OCR fallback.")
-                self.text_content = self._extract_text_with_ocr()
+        
+        # Route only the pages without a usable text layer to OCR
+        with self.stats.stage("page_analysis"):
+            ocr_pages = self._select_pages_for_ocr()
+        self._report_pages_done(len(self.pages_data) - len(ocr_pages))
+        if ocr_pages:
+            print(f"Applying OCR to {len(ocr_pages)} of {len(self.pages_data)} pages.")
+            with self.stats.stage("ocr"):
+                self.text_content = self._extract_text_with_ocr(ocr_pages)
+        self.stats.count("ocr_pages", len(ocr_pages))
+        self._analyze_text()
 
-            self.language = detect_language(self.text_content)
-            
-            chunks = self._parse_structure_and_chunk()
+    def _analyze_text(self) -> None:
+        """Derives the document-level fields (language, DOI, title, authors) from `text_content`."""
+        # Sampled windows are enough for the document language; chunks follow only if it looks mixed
+        with self.stats.stage("detect_language"):
+            self.language_info = get_language_detector().detect_document(self.text_content)
+        self.language = self.language_info["language"]
 
-            # Placeholder for top-level metadata
-            doc_metadata = {"doi": None}
+        # Placeholder for top-level metadata
+        self.doc_metadata = {
+            "doi": None,
+            "language_confidence": self.language_info["confidence"],
+            "languages": self.language_info["languages"],
+        }
+        if self.partial:
+            self.doc_metadata["partial"] = self.partial
 
-            # A simplistic way to find DOI (not robust)
+        # A simplistic way to find DOI (not robust)
+        with self.stats.stage("doi"):
             doi_match = re.search(r'doi:\s*(\S+)', self.text_content, re.IGNORECASE)
-            if doi_match:
-                doc_metadata["doi"] = doi_match.group(1).rstrip('.')
-            
-            # Find the title and authors from the first chunk's metadata
-            if chunks:
-                doc_title = chunks[0].metadata.doc_title
-                authors = chunks[0].metadata.authors
+        if doi_match:
+            self.doc_metadata["doi"] = doi_match.group(1).rstrip('.')
+
+        with self.stats.stage("header"):
+            self._extract_header()
+
+    def _extract_page(self, page_num: int) -> Optional[Dict]:
+        """
+        Extracts a single page, OCR'ing it right away if its text layer is unusable.
+        Returns None when the OCR budget is spent before the page could be OCR'd.
+        """
+        page = self.doc[page_num]
+        with self.stats.stage("extract_text"):
+            if self.layout:
+                # Columns and headings per page; running headers need the whole document
+                [page_data] = assemble_pages([page_num + 1], [page_blocks(page)], SECTION_HEADER_PATTERN,
+                                             MAX_HEADING_LENGTH)
             else:
-                doc_title = "Untitled Document"
-                authors = ["Unknown Author"]
+                page_data = {"page_number": page_num + 1, "text": page.get_text("text"), "source": "text"}
+        with self.stats.stage("page_analysis"):
+            page_data["analysis"] = analyze_page(page, page_data["text"])
+        if page_data["analysis"]["needs_ocr"]:
+            with self.stats.stage("ocr"):
+                results = ocr_document_pages(self.doc, [page_num], self.ocr_lang, self.ocr_dpi, limits=self.limits)
+            if not results:
+                return None
+            [(text, render_info)] = results
+            page_data.update(text=text, source="ocr", ocr=render_info)
+            page_data.pop("headings", None)
+            self.stats.count("ocr_pages")
+            self.stats.count("ocr_pixels", render_info["pixels"])
+            if render_info.get("cached"):
+                self.stats.count("ocr_cache_hits")
+        self._report_pages_done(1)
+        return page_data
+
+    def iter_pages(self, page_indices: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+        """
+        Yields the selected pages one by one; each is extracted (and OCR'd if needed)
+        only when the consumer asks for it, so stopping early skips the rest of the file.
+        In layout mode each page is laid out on its own, so running headers are kept.
+        When a budget runs out, the pages yielded so far are kept, as in process().
+        """
+        for page_num in (self.page_indices if page_indices is None else page_indices):
+            page_data = None if self._out_of_time() else self._extract_page(page_num)
+            if page_data is None:
+                reason = self.limits.ocr_stop_reason() if self.limits is not None else None
+                self._keep_pages([index for index in self.page_indices if index < page_num], reason or "timeout")
+                self.doc_metadata["partial"] = self.partial
+                return
+            yield page_data
+
+    def _prepare_head(self) -> List[Dict]:
+        """Reads the first METADATA_PAGES selected pages and derives the document-level fields."""
+        head = list(self.iter_pages(self.page_indices[:METADATA_PAGES]))
+        self.pages_data = head
+        self.text_content = "".join(page_data["text"] + "\n" for page_data in head)
+        self._analyze_text()
+        return head
+
+    def parse_metadata(self) -> Dict[str, Any]:
+        """
+        Metadata-only fast mode: reads just the first pages of the selection and stops
+        after header extraction, for triage without parsing the whole file.
+        """
+        self._prepare_head()
+        return {
+            "document_id": self.doc_id,
+            "doc_title": self.doc_title,
+            "authors": self.authors,
+            "language": self.language,
+            "language_confidence": self.doc_metadata["language_confidence"],
+            "doi": self.doc_metadata["doi"],
+            "page_count": len(self.doc),
+            "pages_read": len(self.pages_data),
+        }
+
+    def iter_chunks(self) -> Iterator[DocumentChunk]:
+        """
+        Lazy parsing: the document-level fields come from the first pages, and later pages
+        are extracted only as chunks are pulled. Consumers can stop at any point.
+        """
+        head = self._prepare_head()
+        pages = chain(head, self.iter_pages(self.page_indices[METADATA_PAGES:]))
+        for chunk in self._iter_chunks(pages):
+            self.stats.count("chunks")
+            yield chunk
+
+    def iter_jsonl_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Streams JSONL-ready records, one per chunk, as the chunker produces them.
+        Unlike process(), errors propagate to the caller.
+        """
+        self._prepare()
+        doi = self.doc_metadata.get("doi")
+        rows = self._with_chunk_languages(self._iter_chunk_rows())
+        chunk_index = 0
+        while True:
+            # Time only the chunker and record building, not the consumer of the records
+            with self.stats.stage("chunking"):
+                row = next(rows, None)
+            if row is None:
+                break
+            text, section, page_number, language, start, end = row
+            with self.stats.stage("serialization"):
+                record = make_record(f"{self.doc_id}_chunk{chunk_index}", text, section, page_number,
+                                     self.doc_title, self.authors, language, doi,
+                                     start_offset=start, end_offset=end)
+            chunk_index += 1
+            self.stats.count("chunks")
+            yield record
+
+    def process_compact(self) -> CompactDocument:
+        """
+        Like process(), but returns the columnar CompactDocument, which stores the
+        document-level fields once. Meant for corpus-scale runs; errors propagate.
+        """
+        self._prepare()
+        compact = CompactDocument(self.doc_id, self.doc_title, self.authors, self.language, self.doc_metadata)
+        with self.stats.stage("chunking"):
+            for row in self._with_chunk_languages(self._iter_chunk_rows()):
+                compact.append(*row)
+        self.stats.count("chunks", len(compact))
+        return compact
+
+    def process(self) -> ParsedDocument:
+        """Main processing function to orchestrate the pipeline."""
+        try:
+            self._prepare()
+            with self.stats.stage("chunking"):
+                chunks = self._parse_structure_and_chunk()
+            self.stats.count("chunks", len(chunks))
             
             # Create the final ParsedDocument object
-            parsed_doc = ParsedDocument(
+            parsed_doc = ParsedDocument.trusted(
                 document_id=self.doc_id,
-                doc_title=doc_title,
-                authors=authors,
+                doc_title=self.doc_title,
+                authors=self.authors,
                 language=self.language,
                 chunks=chunks,
-                metadata=doc_metadata
+                metadata=self.doc_metadata
             )
             
             return parsed_doc
 
         except Exception as e:
-            print(f"Error processing document {self.file_path}: {e}")
-            return None
\ No newline at end of file
+            print(f"Error processing document {self.source_name}: {e}")
+            return None
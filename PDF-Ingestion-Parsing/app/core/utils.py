@@ -1,5 +1,5 @@
 import hashlib
-from langdetect import detect
+from app.core.language import get_language_detector
 from typing import Optional
 
 def get_file_hash(file_path: str) -> str:
@@ -10,9 +10,10 @@ def get_file_hash(file_path: str) -> str:
             hasher.update(chunk)
     return hasher.hexdigest()
 
+def get_bytes_hash(data) -> str:
+    """Generates a SHA256 hash for an in-memory buffer (bytes, memoryview or mmap)."""
+    return hashlib.sha256(data).hexdigest()
+
 def detect_language(text: str) -> Optional[str]:
-    """Detects the language of a given text."""
-    try:
-        return detect(text)
-    except:
-        return None
\ No newline at end of file
+    """Detects the language of a given text from a sample of it."""
+    return get_language_detector().detect_document(text)["language"]
\ No newline at end of file
@@ -1,11 +1,30 @@
 import os
-import shutil
+import logging
+import mmap
+import time
+import threading
+from typing import List, Optional
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import tempfile
-from typing import List, Dict, Any
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 
-from app.core.parser import PDFParser
+from app.core.config import OCR_WARMUP_LANGS, DEDUP_MODE, PARSE_ISOLATED, PARSE_MAX_FILE_MB, SEARCH_INDEX
+from app.core.limits import ParseLimits
+from app.core.metrics import get_metrics
+from app.core.models import dumps_jsonl
+from app.core.parser import PDFParser, parse_page_spec
+from app.services.batch import iter_batch_items, run_batch
+from app.services.dedup import get_dedup_index
+from app.services.file_storage import get_parse_cache, load_upload
+from app.services.jobs import DocumentTooLargeError, QueueFullError, get_job_manager
+from app.services.ocr_batcher import get_ocr_batcher
+from app.services.ocr_pool import get_ocr_pool
+from app.services.search import get_search_index
+
+logger = logging.getLogger(__name__)
+
+# How often a streaming result checks for newly produced chunks
+RESULT_POLL_SECONDS = 0.1
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -23,45 +42,264 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _warm_up_ocr():
+    """Loads the configured OCR engines so the first scanned upload doesn't pay for it."""
+    try:
+        get_ocr_pool().warm_up(OCR_WARMUP_LANGS)
+    except Exception as e:
+        logger.warning("OCR warm-up failed: %s", e)
+
+@app.on_event("startup")
+def start_background_services():
+    # Start the parse workers, then warm OCR in the background so the API serves immediately.
+    # Sandboxed workers warm OCR in their own processes, where the parsing happens
+    get_job_manager()
+    if OCR_WARMUP_LANGS and not PARSE_ISOLATED:
+        threading.Thread(target=_warm_up_ocr, name="ocr-warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_background_services():
+    # Sandbox processes are told to exit rather than terminated along with the API
+    get_job_manager().close_sandboxes()
+
 # Root endpoint for a simple health check
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the PDF Parser API! Use /docs to see the API endpoints."}
 
-@app.post("/api/docs/upload", response_model=List[Dict[str, Any]])
-async def upload_pdf(file: UploadFile = File(...)):
+@app.get("/api/ready")
+def readiness(ocr: bool = False):
+    """
+    Readiness probe. The API serves as soon as it answers; `ocr_warm` turns true once the
+    OCR_WARMUP_LANGS engines are loaded, before which the first scanned pages wait for
+    the model load. With ocr=true, answers 503 until then.
+    """
+    if PARSE_ISOLATED:
+        ocr_warm = get_job_manager().ocr_warm()
+    else:
+        pool = get_ocr_pool()
+        ocr_warm = all(pool.is_warm(lang) for lang in OCR_WARMUP_LANGS)
+    status = {"serving": True, "ocr_warm": ocr_warm, "ocr_languages": OCR_WARMUP_LANGS}
+    if ocr and not ocr_warm:
+        return JSONResponse(status, status_code=503)
+    return status
+
+@app.get("/api/ocr/pool")
+def ocr_pool_stats():
+    """
+    Reports OCR engine pool usage (hits, waits and model load time) and page batching.
+    """
+    stats = get_ocr_pool().stats()
+    stats["batching"] = get_ocr_batcher().stats()
+    return stats
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Exposes parser stage histograms and counters in the Prometheus text format.
+    """
+    pool = get_ocr_pool().stats()
+    batcher = get_ocr_batcher().stats()
+    cache = get_parse_cache().stats()
+    gauges = {
+        "pdf_job_queue_depth": get_job_manager().queue_depth(),
+        "pdf_ocr_pool_hits": pool["hits"],
+        "pdf_ocr_pool_loads": pool["loads"],
+        "pdf_ocr_pool_waits": pool["waits"],
+        "pdf_ocr_pool_wait_seconds": pool["wait_seconds"],
+        "pdf_ocr_pool_load_seconds": pool["load_seconds"],
+        "pdf_ocr_batches": batcher["batches"],
+        "pdf_ocr_batched_pages": batcher["pages"],
+        "pdf_ocr_batch_mean_size": batcher["mean_batch_size"],
+        "pdf_parse_cache_hits": cache["hits"],
+        "pdf_parse_cache_misses": cache["misses"],
+        "pdf_parse_cache_bytes": cache["bytes"],
+    }
+    if DEDUP_MODE != "off":
+        dedup = get_dedup_index().stats()
+        gauges.update({
+            "pdf_dedup_chunks": dedup["chunks"],
+            "pdf_dedup_duplicate_chunks": dedup["duplicate_chunks"],
+            "pdf_dedup_documents": dedup["documents"],
+            "pdf_dedup_duplicate_documents": dedup["duplicate_documents"],
+            "pdf_dedup_duplicate_char_ratio": dedup["duplicate_char_ratio"],
+        })
+    if SEARCH_INDEX:
+        search = get_search_index().stats()
+        gauges.update({
+            "pdf_search_chunks": search["chunks"],
+            "pdf_search_documents": search["documents"],
+        })
+    return get_metrics().render(gauges)
+
+@app.get("/api/cache/stats")
+def parse_cache_stats():
+    """
+    Reports parse cache hits, misses, evictions and size on disk.
+    """
+    return get_parse_cache().stats()
+
+@app.get("/api/dedup/stats")
+def dedup_stats():
+    """
+    Reports how many documents and chunks the dedup index has checked and how many were
+    duplicates, exact or near, across every run that used the index.
+    """
+    if DEDUP_MODE == "off":
+        return {"mode": DEDUP_MODE}
+    return {"mode": DEDUP_MODE, **get_dedup_index().stats()}
+
+@app.get("/api/chunks/search")
+def search_chunks(q: Optional[str] = None, section_type: Optional[str] = None, language: Optional[str] = None,
+                  page_number: Optional[int] = None, doc_title: Optional[str] = None, limit: int = 20,
+                  offset: int = 0, include_text: bool = False):
+    """
+    Searches the chunks ingested so far, best BM25 match first. `q` must match every word;
+    section_type, language and page_number filter exactly and doc_title by substring.
+    Without `q`, lists the chunks passing the filters. Needs SEARCH_INDEX=true.
+    """
+    if not SEARCH_INDEX:
+        raise HTTPException(status_code=404, detail="The search index is disabled; set SEARCH_INDEX=true.")
+    started = time.perf_counter()
+    results = get_search_index().search(q, limit=limit, offset=offset, include_text=include_text,
+                                        section_type=section_type, language=language,
+                                        page_number=page_number, doc_title=doc_title)
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+def _parse_metadata_now(source, filename: str, pages: Optional[str]) -> dict:
+    """
+    Runs the metadata-only mode inline; it reads only the first pages, so no job is
+    needed. The upload size and parse limits apply as they do to jobs.
+    """
+    parser = None
+    try:
+        if PARSE_MAX_FILE_MB and len(source) > PARSE_MAX_FILE_MB * 1024 * 1024:
+            get_metrics().record_limit("file_size")
+            raise HTTPException(status_code=413, detail=f"PDFs larger than {PARSE_MAX_FILE_MB} MB are not accepted.")
+        parser = PDFParser(source, page_range=pages, limits=ParseLimits())
+        metadata = parser.parse_metadata()
+        get_metrics().record_document(parser.stats)
+        if parser.partial:
+            get_metrics().record_limit(parser.partial["reason"])
+            metadata["partial"] = parser.partial
+        return {"filename": filename, "mode": "metadata", **metadata}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error reading metadata of %s", filename)
+        if parser:
+            get_metrics().record_document(parser.stats, "failed")
+        else:
+            get_metrics().record_unparsed()
+        raise HTTPException(status_code=500, detail=f"An error occurred during processing: {str(e)}")
+    finally:
+        # The parser's view of an mmap must be released before the mmap can be closed
+        if parser:
+            parser.close()
+        if isinstance(source, mmap.mmap):
+            source.close()
+
+@app.post("/api/docs/upload", status_code=202)
+def upload_pdf(file: UploadFile = File(...), pages: Optional[str] = None, mode: str = "full"):
     """
-    Handles PDF upload, parsing, and returns structured data.
+    Accepts a PDF upload and queues it for parsing.
+    Returns a job id; poll /api/jobs/{job_id} and fetch /api/jobs/{job_id}/result.
+    Previously parsed files are answered from the parse cache with an already completed job.
+
+    `pages` limits parsing to a 1-based page range such as "1-3,7,10-".
+    With mode=metadata, only the first pages are read and the title, authors, language
+    and DOI are returned directly.
     """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+    if mode not in ("full", "metadata"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'metadata'.")
+    if pages:
+        try:
+            parse_page_spec(pages)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    # Create a temporary file to store the uploaded PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        temp_file_path = tmp.name
-    
-    parser = None
+    # Hand the spooled upload straight to the parser: bytes for small files, an mmap for large ones
+    source = load_upload(file.file)
+
+    if mode == "metadata":
+        return JSONResponse(_parse_metadata_now(source, file.filename, pages))
+
     try:
-        # Process the PDF using our custom parser
-        parser = PDFParser(file_path=temp_file_path)
-        parsed_doc = parser.process()
-        
-        if parsed_doc:
-            # Convert the parsed data to the JSONL format
-            jsonl_records = parsed_doc.to_jsonl_records()
-            return jsonl_records
-        else:
-            raise HTTPException(status_code=500, detail="Failed to process the PDF document.")
+        job = get_job_manager().submit_document(source, file.filename, pages)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    except Exception as e:
-        # Catch any exceptions during processing and return a 500 error
-        raise HTTPException(status_code=500, detail=f"An error occurred during processing: {str(e)}")
+    return {"job_id": job.job_id, "status": job.status, "cached": job.cached}
 
-    finally:
-        # **CRITICAL FIX**: Explicitly close the fitz document object before unlinking the file
-        if parser and parser.doc:
-            parser.doc.close()
-        
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
\ No newline at end of file
+@app.post("/api/docs/batch")
+def batch_upload(files: List[UploadFile] = File(...), pages: Optional[str] = None):
+    """
+    Parses many PDFs, or zip/tar archives of PDFs, sent in one request. Documents are
+    parsed concurrently on the shared job workers and streamed back as NDJSON, one line
+    per document with its records, or with the error that stopped it.
+    """
+    if pages:
+        try:
+            parse_page_spec(pages)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    uploads = [(file.filename, file.file) for file in files]
+    return StreamingResponse(run_batch(iter_batch_items(uploads), pages), media_type="application/x-ndjson")
+
+def _get_job_or_404(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str, include_stats: bool = False):
+    """
+    Reports the state of a parsing job and its progress in pages.
+    With include_stats=true, finished jobs also report per-stage timings and counters.
+    """
+    return _get_job_or_404(job_id).to_dict(include_stats=include_stats)
+
+def _follow_result(job):
+    """
+    Yields the job's JSONL lines as the worker appends them, until the job finishes.
+    A failure after streaming has started is reported as a final {"error": ...} line.
+    """
+    with open(job.result_path, "rb") as f:
+        while True:
+            line = f.readline()
+            if line.endswith(b"\n"):
+                yield line
+                continue
+            # Rewind over any partially written line and wait for more output
+            f.seek(-len(line), os.SEEK_CUR)
+            if job.finished:
+                rest = f.read()
+                if rest:
+                    yield rest
+                break
+            time.sleep(RESULT_POLL_SECONDS)
+    if job.status == "failed":
+        yield dumps_jsonl({"error": job.error})
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Streams the parsed chunks of a job as NDJSON.
+    For queued or running jobs, lines are sent as soon as the chunks are produced.
+    """
+    job = _get_job_or_404(job_id)
+    if job.status == "failed" and not job.chunk_count:
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == "completed":
+        return FileResponse(job.result_path, media_type="application/x-ndjson")
+
+    return StreamingResponse(_follow_result(job), media_type="application/x-ndjson")
@@ -0,0 +1,147 @@
+# app/services/batch.py
+
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from collections import deque
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from app.core.config import BATCH_MAX_FILES, BATCH_IN_FLIGHT, PARSE_MAX_FILE_MB, UPLOAD_MEMORY_LIMIT_MB
+from app.core.models import dumps_jsonl
+from app.core.parser import PDFSource
+from app.services.file_storage import load_upload
+from app.services.jobs import Job, get_job_manager
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# A document to parse, or the reason it cannot be
+BatchItem = Tuple[str, Optional[PDFSource], Optional[str]]
+
+
+def _member_source(fileobj: BinaryIO, size: int) -> PDFSource:
+    """Reads a small archive member into memory; larger ones go to a temp file the job deletes."""
+    if size <= UPLOAD_MEMORY_LIMIT_MB * 1024 * 1024:
+        return fileobj.read()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        shutil.copyfileobj(fileobj, tmp)
+    return tmp.name
+
+
+def _too_large(size: int) -> bool:
+    return bool(PARSE_MAX_FILE_MB) and size > PARSE_MAX_FILE_MB * 1024 * 1024
+
+
+def _iter_archive(name: str, fileobj: BinaryIO) -> Iterator[BatchItem]:
+    """
+    Yields the PDFs inside a zip or tar archive, named archive/member. Members over
+    PARSE_MAX_FILE_MB are rejected by their declared size, before anything is extracted;
+    both readers stop at that size, so a member cannot unpack to more.
+    """
+    too_large = f"PDFs larger than {PARSE_MAX_FILE_MB} MB are not accepted."
+    if name.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    member_name = f"{name}/{info.filename}"
+                    if _too_large(info.file_size):
+                        yield member_name, None, too_large
+                        continue
+                    with archive.open(info) as member:
+                        yield member_name, _member_source(member, info.file_size), None
+        return
+    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+        for info in archive:
+            if info.isfile() and info.name.lower().endswith(".pdf"):
+                member_name = f"{name}/{info.name}"
+                if _too_large(info.size):
+                    yield member_name, None, too_large
+                    continue
+                yield member_name, _member_source(archive.extractfile(info), info.size), None
+
+
+def iter_batch_items(uploads: List[Tuple[str, BinaryIO]]) -> Iterator[BatchItem]:
+    """
+    Expands uploaded files into (name, source, error) items: PDFs as they are, archives
+    into their PDF members. Sources are loaded one at a time, as they are consumed.
+    """
+    count = 0
+    for name, fileobj in uploads:
+        lower = name.lower()
+        if not lower.endswith((".pdf",) + ARCHIVE_SUFFIXES):
+            yield name, None, "Only PDF files and zip/tar archives of PDFs are allowed."
+            continue
+        if count >= BATCH_MAX_FILES:
+            yield name, None, f"Batch limit of {BATCH_MAX_FILES} PDFs exceeded."
+            continue
+        if lower.endswith(".pdf"):
+            count += 1
+            yield name, load_upload(fileobj), None
+            continue
+        try:
+            for item in _iter_archive(name, fileobj):
+                if count >= BATCH_MAX_FILES:
+                    if isinstance(item[1], str):
+                        os.unlink(item[1])
+                    yield name, None, f"Batch limit of {BATCH_MAX_FILES} PDFs exceeded; remaining members skipped."
+                    break
+                # Rejected members do not count towards the limit
+                if item[1] is not None:
+                    count += 1
+                yield item
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+            yield name, None, f"Unreadable archive: {e}"
+
+
+def _document_line(name: str, job: Optional[Job] = None, error: Optional[str] = None) -> bytes:
+    """The NDJSON result line of one document: its records, or the reason it failed."""
+    result = {"filename": name}
+    if job is not None:
+        result.update(job_id=job.job_id, status=job.status, cached=job.cached)
+        error = error or job.error
+    if error:
+        result.update(status="failed", error=error)
+        return dumps_jsonl(result)
+    # The stored lines are JSON already; splice them in instead of decoding and re-encoding them
+    with open(job.result_path, "rb") as f:
+        records = b",".join(line.rstrip(b"\n") for line in f)
+    return dumps_jsonl(result)[:-2] + b',"records":[' + records + b"]}\n"
+
+
+def run_batch(items: Iterator[BatchItem], page_range: Optional[str] = None,
+              in_flight: int = BATCH_IN_FLIGHT) -> Iterator[bytes]:
+    """
+    Feeds batch items to the shared job manager, keeping at most `in_flight` of them
+    queued or running, and yields one NDJSON line per document in submission order.
+    """
+    manager = get_job_manager()
+    pending: deque = deque()
+
+    def finish_oldest() -> bytes:
+        name, job = pending.popleft()
+        job.done.wait()
+        try:
+            return _document_line(name, job)
+        finally:
+            manager.unpin(job)
+
+    try:
+        for name, source, error in items:
+            if error:
+                yield _document_line(name, error=error)
+                continue
+            while len(pending) >= max(1, in_flight):
+                yield finish_oldest()
+            try:
+                # Waits for room when other uploads have filled the queue instead of failing; the job
+                # is pinned so the history limit cannot delete its result before it is streamed
+                pending.append((name, manager.submit_document(source, name, page_range, block=True, pin=True)))
+            except Exception as e:
+                yield _document_line(name, error=f"An error occurred during processing: {str(e)}")
+        while pending:
+            yield finish_oldest()
+    finally:
+        # A client that disconnects leaves jobs behind; let the history limit drop them
+        for _, job in pending:
+            manager.unpin(job)
@@ -0,0 +1,295 @@
+# app/services/dedup.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import (
+    DEDUP_MODE,
+    DEDUP_INDEX_PATH,
+    DEDUP_THRESHOLD,
+    DEDUP_NUM_PERM,
+    DEDUP_BANDS,
+    DEDUP_SHINGLE_WORDS,
+)
+
+DEDUP_MODES = ("off", "flag", "drop")
+# A chunk's exact-match digest, MinHash signature (None when shorter than a shingle) and length
+Fingerprint = Tuple[bytes, Optional[np.ndarray], int]
+
+WORD_PATTERN = re.compile(r'\w+')
+MAX_HASH = np.uint64(0xFFFFFFFF)
+# MinHash uses multiply-shift hashing: the top 32 bits of (a * x + b) mod 2**64
+HASH_SHIFT = np.uint64(32)
+# Shingles permuted at once; bounds the temporary array for whole documents
+SHINGLE_BLOCK = 8192
+# Fixed seed, so signatures stay comparable across processes and runs
+PERMUTATION_SEED = 1
+STAT_NAMES = ("documents", "duplicate_documents", "chunks", "exact_duplicate_chunks", "near_duplicate_chunks",
+              "duplicate_document_chunks", "chars", "duplicate_chars")
+
+
+def _permutations(num_perm: int, seed: int = PERMUTATION_SEED) -> Tuple[np.ndarray, np.ndarray]:
+    """Random odd multipliers and offsets of the hash functions."""
+    generator = np.random.RandomState(seed)
+    a = generator.randint(0, 1 << 64, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = generator.randint(0, 1 << 64, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+_PERMUTATIONS = _permutations(DEDUP_NUM_PERM)
+# Multipliers combining the word hashes of a shingle into one hash
+_SHINGLE_WEIGHTS = _permutations(DEDUP_SHINGLE_WORDS, PERMUTATION_SEED + 1)[0]
+
+
+def minhash(words: List[str]) -> Optional[np.ndarray]:
+    """
+    MinHash signature (DEDUP_NUM_PERM uint32 values) of the word shingles of a text.
+    Returns None for texts shorter than one shingle.
+    """
+    count = len(words) - DEDUP_SHINGLE_WORDS + 1
+    if count < 1:
+        return None
+    a, b = _PERMUTATIONS
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64,
+                              count=len(words))
+    # Shingle hashes from the word hashes, vectorised; overflow wraps and is masked away
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset, weight in enumerate(_SHINGLE_WEIGHTS):
+        shingles += word_hashes[offset:offset + count] * weight
+    shingles &= MAX_HASH
+
+    signature = np.full(len(a), MAX_HASH, dtype=np.uint64)
+    for start in range(0, count, SHINGLE_BLOCK):
+        # In place: fresh temporaries cost more than the arithmetic at this size
+        hashes = np.multiply(shingles[start:start + SHINGLE_BLOCK, None], a)
+        hashes += b
+        hashes >>= HASH_SHIFT
+        np.minimum(signature, hashes.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def normalized_words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def fingerprint(text: str) -> Fingerprint:
+    """
+    What the index needs of a chunk: the exact-match digest (of the normalised words),
+    the MinHash signature and the length in characters. Small enough to be computed
+    in a worker process and sent to the one holding the index.
+    """
+    words = normalized_words(text)
+    digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).digest()
+    return digest, minhash(words), len(text)
+
+
+def document_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of a whole document's text."""
+    return minhash(normalized_words(text))
+
+
+class DedupIndex:
+    """
+    Persistent near-duplicate index of documents and chunks in SQLite. Chunks are
+    matched exactly by digest first, then by MinHash LSH: a signature is split into
+    bands, and only entries sharing a band are compared, so a lookup costs a few
+    indexed queries however large the corpus is. Duplicates are not indexed
+    themselves, which keeps boilerplate buckets small. Thread-safe.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, threshold: float = DEDUP_THRESHOLD):
+        if DEDUP_NUM_PERM % DEDUP_BANDS:
+            raise ValueError("DEDUP_NUM_PERM must be a multiple of DEDUP_BANDS")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = DEDUP_NUM_PERM
+        self.bands = DEDUP_BANDS
+        self._rows = DEDUP_NUM_PERM // DEDUP_BANDS
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._check_settings()
+        self._stats = dict.fromkeys(STAT_NAMES, 0)
+        self._stats.update(self._conn.execute("SELECT name, value FROM stats"))
+
+    def _create_tables(self) -> None:
+        statements = ["CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+                      "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+                      "CREATE TABLE IF NOT EXISTS chunk_digests (digest BLOB PRIMARY KEY, ref TEXT NOT NULL) "
+                      "WITHOUT ROWID"]
+        for kind in ("chunk", "document"):
+            statements.append(f"CREATE TABLE IF NOT EXISTS {kind}_signatures "
+                              "(id INTEGER PRIMARY KEY, ref TEXT NOT NULL, signature BLOB NOT NULL)")
+            statements.append(f"CREATE TABLE IF NOT EXISTS {kind}_bands "
+                              "(key INTEGER NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (key, id)) WITHOUT ROWID")
+        for statement in statements:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def _check_settings(self) -> None:
+        """Signatures are only comparable with the same permutations, bands and shingles."""
+        settings = {"num_perm": str(self.num_perm), "bands": str(self.bands),
+                    "shingle_words": str(DEDUP_SHINGLE_WORDS)}
+        stored = dict(self._conn.execute("SELECT name, value FROM settings"))
+        if not stored:
+            self._conn.executemany("INSERT INTO settings VALUES (?, ?)", settings.items())
+            self._conn.commit()
+        elif stored != settings:
+            raise ValueError(f"Dedup index {self.path} was built with {stored}, not {settings}")
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            data = band.to_bytes(2, "little") + signature[band * self._rows:(band + 1) * self._rows].tobytes()
+            keys.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True))
+        return keys
+
+    def _lookup(self, kind: str, signature: np.ndarray, keys: List[int]) -> Optional[str]:
+        """Returns the most similar indexed entry sharing a band, if it reaches the threshold."""
+        rows = self._conn.execute(
+            f"SELECT DISTINCT s.ref, s.signature FROM {kind}_bands b JOIN {kind}_signatures s ON s.id = b.id "
+            f"WHERE b.key IN ({','.join('?' * len(keys))})", keys)
+        best, best_similarity = None, self.threshold
+        for ref, blob in rows:
+            similarity = np.count_nonzero(np.frombuffer(blob, dtype=np.uint32) == signature) / self.num_perm
+            if similarity >= best_similarity:
+                best, best_similarity = ref, similarity
+        return best
+
+    def _insert(self, kind: str, ref: str, signature: np.ndarray, keys: List[int]) -> None:
+        row_id = self._conn.execute(f"INSERT INTO {kind}_signatures (ref, signature) VALUES (?, ?)",
+                                    (ref, signature.tobytes())).lastrowid
+        self._conn.executemany(f"INSERT OR IGNORE INTO {kind}_bands VALUES (?, ?)", [(key, row_id) for key in keys])
+
+    def check_document(self, document_id: str, signature: Optional[np.ndarray]) -> Optional[str]:
+        """Returns the id of an earlier near-duplicate document, or indexes this one and returns None."""
+        with self._lock:
+            self._stats["documents"] += 1
+            if signature is None:
+                return None
+            keys = self._band_keys(signature)
+            duplicate_of = self._lookup("document", signature, keys)
+            if duplicate_of:
+                self._stats["duplicate_documents"] += 1
+            else:
+                self._insert("document", document_id, signature, keys)
+            return duplicate_of
+
+    def check_chunk(self, chunk_id: str, chunk_fingerprint: Fingerprint) -> Optional[str]:
+        """
+        Returns the id of an earlier identical or near-duplicate chunk, or indexes this
+        one and returns None.
+        """
+        digest, signature, chars = chunk_fingerprint
+        with self._lock:
+            self._stats["chunks"] += 1
+            self._stats["chars"] += chars
+            row = self._conn.execute("SELECT ref FROM chunk_digests WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                self._stats["exact_duplicate_chunks"] += 1
+                self._stats["duplicate_chars"] += chars
+                return row[0]
+            if signature is not None:
+                keys = self._band_keys(signature)
+                duplicate_of = self._lookup("chunk", signature, keys)
+                if duplicate_of:
+                    self._stats["near_duplicate_chunks"] += 1
+                    self._stats["duplicate_chars"] += chars
+                    return duplicate_of
+                self._insert("chunk", chunk_id, signature, keys)
+            self._conn.execute("INSERT INTO chunk_digests VALUES (?, ?)", (digest, chunk_id))
+            return None
+
+    def count_duplicate_document_chunk(self, chars: int) -> None:
+        """Counts a chunk of a duplicate document; those are not looked up one by one."""
+        with self._lock:
+            self._stats["chunks"] += 1
+            self._stats["chars"] += chars
+            self._stats["duplicate_document_chunks"] += 1
+            self._stats["duplicate_chars"] += chars
+
+    def commit(self) -> None:
+        """Makes the entries and counters added so far durable; call once per document."""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO stats VALUES (?, ?)", self._stats.items())
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Corpus-wide totals of checked and duplicate documents, chunks and characters."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        duplicate_chunks = (stats["exact_duplicate_chunks"] + stats["near_duplicate_chunks"]
+                            + stats["duplicate_document_chunks"])
+        stats["duplicate_chunks"] = duplicate_chunks
+        stats["duplicate_chunk_ratio"] = round(duplicate_chunks / stats["chunks"], 4) if stats["chunks"] else 0.0
+        stats["duplicate_char_ratio"] = round(stats["duplicate_chars"] / stats["chars"], 4) if stats["chars"] else 0.0
+        stats.update(threshold=self.threshold, path=self.path)
+        return stats
+
+    def close(self) -> None:
+        self.commit()
+        with self._lock:
+            self._conn.close()
+
+
+def dedup_records(records: Iterable[Dict[str, Any]], document_id: str,
+                  signature: Callable[[], Optional[np.ndarray]], index: "DedupIndex",
+                  mode: str = DEDUP_MODE) -> Iterator[Dict[str, Any]]:
+    """
+    Filters a document's JSONL records through the index. With "flag" duplicates get
+    `metadata.duplicate_of` (the earlier chunk, or the earlier document when the whole
+    document is a near-duplicate); with "drop" they are left out. `signature` returns the
+    document_signature of the whole text and is called once the first record has
+    arrived, i.e. after the parser prepared the text.
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode: {mode}")
+    if mode == "off":
+        yield from records
+        return
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+
+    duplicate_document = index.check_document(document_id, signature())
+    try:
+        for record in chain([first], records):
+            if duplicate_document:
+                index.count_duplicate_document_chunk(len(record["text"]))
+                duplicate_of = duplicate_document
+            else:
+                duplicate_of = index.check_chunk(record["id"], fingerprint(record["text"]))
+            if duplicate_of:
+                if mode == "drop":
+                    continue
+                record["metadata"]["duplicate_of"] = duplicate_of
+            yield record
+    finally:
+        index.commit()
+
+
+_index: Optional[DedupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> DedupIndex:
+    """Returns the process-wide dedup index, opening it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DedupIndex()
+    return _index
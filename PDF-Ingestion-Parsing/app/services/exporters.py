@@ -0,0 +1,141 @@
+# app/services/exporters.py
+
+from typing import Dict, List, Optional
+
+from app.core.models import CompactDocument
+
+# Columnar formats and the file suffix of each
+COLUMNAR_SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow"}
+# Rows buffered before a Parquet row group / Arrow record batch is written
+DEFAULT_ROW_GROUP_SIZE = 50_000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet/Arrow export requires the 'pyarrow' package") from None
+    return pyarrow
+
+
+def chunk_schema():
+    """
+    Arrow schema of the exported chunk table. Columns repeated for every chunk of a
+    document are dictionary-encoded, so each distinct value is stored once per batch.
+    """
+    pa = _require_pyarrow()
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("id", pa.string()),
+        ("document_id", dictionary),
+        ("chunk_index", pa.int32()),
+        ("text", pa.large_string()),
+        ("section_type", dictionary),
+        ("page_number", pa.int32()),
+        ("doc_title", dictionary),
+        ("authors", pa.list_(pa.string())),
+        ("doi", dictionary),
+        ("language", dictionary),
+        ("start_offset", pa.int64()),
+        ("end_offset", pa.int64()),
+        ("duplicate_of", pa.string()),
+    ])
+
+
+class ArrowChunkWriter:
+    """
+    Writes CompactDocuments as one flat chunk table to a Parquet or Arrow IPC file.
+    Columns are filled straight from the compact document; no per-chunk dicts are built.
+    """
+
+    def __init__(self, path: str, file_format: str = "parquet", compression: Optional[str] = "zstd",
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        if file_format not in COLUMNAR_SUFFIXES:
+            raise ValueError(f"Unknown columnar format: {file_format}")
+        self.pa = _require_pyarrow()
+        self.path = path
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.schema = chunk_schema()
+        self.rows = 0
+        self._columns: Dict[str, List] = {name: [] for name in self.schema.names}
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression or "none")
+        else:
+            import pyarrow.ipc as ipc
+
+            options = ipc.IpcWriteOptions(compression=compression) if compression else None
+            self._writer = ipc.new_file(path, self.schema, options=options)
+
+    def write_document(self, document: CompactDocument, drop_duplicates: bool = False) -> None:
+        """
+        Appends the chunks of a document. With `drop_duplicates` the chunks listed in
+        `document.duplicates` are left out; otherwise they carry `duplicate_of`.
+        """
+        if drop_duplicates and document.duplicates:
+            self._write_rows(document, [index for index in range(len(document)) if index not in document.duplicates])
+            return
+        columns = self._columns
+        count = len(document)
+        doi = document.metadata.get("doi")
+        columns["id"].extend(document.chunk_id(index) for index in range(count))
+        columns["document_id"].extend([document.document_id] * count)
+        columns["chunk_index"].extend(range(count))
+        columns["text"].extend(document.texts)
+        columns["section_type"].extend(document.section_types)
+        columns["page_number"].extend(document.page_numbers)
+        columns["doc_title"].extend([document.doc_title] * count)
+        columns["authors"].extend([document.authors] * count)
+        columns["doi"].extend([doi] * count)
+        columns["language"].extend(document.languages)
+        columns["start_offset"].extend(offset if offset >= 0 else None for offset in document.start_offsets)
+        columns["end_offset"].extend(offset if offset >= 0 else None for offset in document.end_offsets)
+        columns["duplicate_of"].extend(document.duplicates.get(index) for index in range(count))
+        self._added(count)
+
+    def _write_rows(self, document: CompactDocument, indices: List[int]) -> None:
+        """Appends the given chunks of a document, row by row."""
+        columns = self._columns
+        doi = document.metadata.get("doi")
+        for index in indices:
+            row = document[index]
+            columns["id"].append(document.chunk_id(index))
+            columns["document_id"].append(document.document_id)
+            columns["chunk_index"].append(index)
+            columns["text"].append(row.text)
+            columns["section_type"].append(row.section_type)
+            columns["page_number"].append(row.page_number)
+            columns["doc_title"].append(document.doc_title)
+            columns["authors"].append(document.authors)
+            columns["doi"].append(doi)
+            columns["language"].append(row.language)
+            columns["start_offset"].append(row.start_offset)
+            columns["end_offset"].append(row.end_offset)
+            columns["duplicate_of"].append(None)
+        self._added(len(indices))
+
+    def _added(self, count: int) -> None:
+        self.rows += count
+        if len(self._columns["id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._columns["id"]:
+            return
+        batch = self.pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._writer.write(batch)
+        self._columns = {name: [] for name in self.schema.names}
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self) -> "ArrowChunkWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,233 @@
+# app/services/file_storage.py
+
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from app.core.config import (
+    OCR_CACHE_DIR, OCR_CACHE_MAX_MB, PARSE_CACHE_DIR, PARSE_CACHE_MAX_MB, UPLOAD_MEMORY_LIMIT_MB,
+)
+
+
+def load_upload(fileobj: BinaryIO, memory_limit: int = UPLOAD_MEMORY_LIMIT_MB * 1024 * 1024) -> Union[bytes, mmap.mmap]:
+    """
+    Returns the contents of an uploaded file as a buffer the parser can open directly.
+    Small uploads are read into memory; larger ones are memory-mapped from the spooled
+    upload file, so the PDF is never copied into RAM or to another file.
+    """
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    if size <= memory_limit:
+        return fileobj.read()
+
+    try:
+        # SpooledTemporaryFile rolls its in-memory buffer over to disk when asked for a fileno
+        fileno = fileobj.fileno()
+    except (OSError, io.UnsupportedOperation):
+        spill = tempfile.TemporaryFile()
+        shutil.copyfileobj(fileobj, spill)
+        spill.flush()
+        fileno = spill.fileno()
+    # The mapping stays valid after the upload file is closed
+    return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+
+class DiskLRUCache:
+    """
+    A size-bounded directory of files addressed by key, evicting the least recently
+    used entries first. Recency survives restarts through the files' mtimes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load_index(self) -> None:
+        """Rebuilds the in-memory LRU order from the files already on disk."""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix) or name.startswith("."):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            found.append((stat.st_mtime, name[:len(name) - len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._stats["evictions"] += 1
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _open(self, key: str):
+        """Opens the entry for `key` and marks it as recently used, or returns None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                try:
+                    # Written by another process sharing the directory since the index was loaded
+                    size = os.path.getsize(self._path(key))
+                except OSError:
+                    self._stats["misses"] += 1
+                    return None
+                self._entries[key] = size
+                self._size += size
+            self._entries.move_to_end(key)
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            # Evicted meanwhile, or removed by another process sharing the directory
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            # Removed after it was opened; the open file is still complete
+            pass
+        return f
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached bytes for `key`, or None on a miss."""
+        f = self._open(key)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def copy_to(self, key: str, dest_path: str) -> bool:
+        """Copies the entry for `key` to `dest_path` without loading it into memory."""
+        f = self._open(key)
+        if f is None:
+            return False
+        with f, open(dest_path, "wb") as dest:
+            shutil.copyfileobj(f, dest)
+        return True
+
+    def _commit(self, key: str, tmp_path: str, size: int) -> None:
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._size += size
+            self._stats["writes"] += 1
+            self._evict()
+
+    def put(self, key: str, data: bytes) -> None:
+        """Stores `data` under `key`, evicting old entries to stay under the size limit."""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self._commit(key, tmp_path, len(data))
+
+    def put_file(self, key: str, src_path: str) -> None:
+        """Stores a copy of the file at `src_path` under `key`."""
+        size = os.path.getsize(src_path)
+        if not self.enabled or size > self.max_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f, open(src_path, "rb") as src:
+            shutil.copyfileobj(src, f)
+        self._commit(key, tmp_path, size)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["bytes"] = self._size
+            snapshot["max_bytes"] = self.max_bytes
+        return snapshot
+
+
+class ParseCache(DiskLRUCache):
+    """
+    Parsed JSONL keyed by the SHA-256 of the PDF plus the parser configuration,
+    so re-uploads of the same file skip parsing entirely.
+    """
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(directory, max_bytes, suffix=".jsonl")
+
+    @staticmethod
+    def make_key(file_hash: str, config_fingerprint: str) -> str:
+        return f"{file_hash}-{config_fingerprint}"
+
+
+class OCRPageCache(DiskLRUCache):
+    """
+    OCR text of single rendered pages keyed by a hash of the page image plus the OCR
+    settings, so pages that recur across documents (cover sheets, licence pages,
+    re-uploaded scans) cost a lookup instead of a model inference.
+    """
+
+    def __init__(self, directory: str = OCR_CACHE_DIR, max_bytes: int = OCR_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(directory, max_bytes, suffix=".txt")
+
+    def get_text(self, key: str) -> Optional[str]:
+        data = self.get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_text(self, key: str, text: str) -> None:
+        self.put(key, text.encode("utf-8"))
+
+
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    """Returns the process-wide parse cache."""
+    global _parse_cache
+    if _parse_cache is None:
+        with _parse_cache_lock:
+            if _parse_cache is None:
+                _parse_cache = ParseCache()
+    return _parse_cache
+
+
+_ocr_page_cache: Optional[OCRPageCache] = None
+_ocr_page_cache_lock = threading.Lock()
+
+
+def get_ocr_page_cache() -> OCRPageCache:
+    """Returns the process-wide OCR page cache."""
+    global _ocr_page_cache
+    if _ocr_page_cache is None:
+        with _ocr_page_cache_lock:
+            if _ocr_page_cache is None:
+                _ocr_page_cache = OCRPageCache()
+    return _ocr_page_cache
@@ -0,0 +1,344 @@
+# app/services/jobs.py
+
+import os
+import json
+import mmap
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.metrics import get_metrics
+from app.core.config import (
+    JOB_WORKERS, JOB_QUEUE_SIZE, JOB_HISTORY, JOB_RESULTS_DIR, DEDUP_MODE, PARSE_ISOLATED, PARSE_MAX_FILE_MB,
+    SEARCH_INDEX,
+)
+from app.core.limits import ParseLimits
+from app.core.models import dumps_jsonl
+from app.core.parser import PDFParser, PDFSource, parser_fingerprint
+from app.core.utils import get_bytes_hash, get_file_hash
+from app.services.dedup import dedup_records, document_signature, get_dedup_index
+from app.services.file_storage import ParseCache, get_parse_cache
+from app.services.sandbox import SandboxError, SandboxWorker
+from app.services.search import get_search_index, index_records
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another upload."""
+
+
+class DocumentTooLargeError(Exception):
+    """Raised when an upload exceeds PARSE_MAX_FILE_MB."""
+
+
+class Job:
+    """
+    A single upload being parsed in the background.
+    """
+
+    def __init__(self, source: Optional[PDFSource], filename: str, cache_key: Optional[str] = None,
+                 page_range: Optional[str] = None):
+        self.job_id = str(uuid.uuid4())
+        # The uploaded PDF as a path, bytes or mmap; released once the job has run
+        self.source = source
+        self.filename = filename
+        self.cache_key = cache_key
+        # 1-based page range spec such as "1-3,7"; None parses every page
+        self.page_range = page_range
+        self.cached = False
+        self.status = "queued"
+        self.pages_done = 0
+        self.pages_total: Optional[int] = None
+        self.error: Optional[str] = None
+        # Set when a parsing limit cut the document short: {"reason", ...}
+        self.partial: Optional[Dict[str, Any]] = None
+        # The parsed chunks are appended to this JSONL file as they are produced
+        os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+        self.result_path = os.path.join(JOB_RESULTS_DIR, f"{self.job_id}.jsonl")
+        open(self.result_path, "wb").close()
+        self.chunk_count = 0
+        self.stats: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Set once the job has completed or failed
+        self.done = threading.Event()
+        # Pinned jobs outlive the history limit until their owner has read the result
+        self.pinned = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self, include_stats: bool = False) -> Dict[str, Any]:
+        status = {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "page_range": self.page_range,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "chunks": self.chunk_count,
+            "cached": self.cached,
+            "error": self.error,
+            "partial": self.partial,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_stats:
+            status["stats"] = self.stats
+        return status
+
+
+class JobManager:
+    """
+    Runs PDF parsing on a fixed set of worker threads fed by a bounded queue,
+    so the API event loop never blocks on a parse and overload is rejected early.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE,
+                 history: int = JOB_HISTORY):
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max(1, max_queue))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._history = history
+        # Each worker thread parses in its own sandbox process
+        self._local = threading.local()
+        self._sandboxes: List[SandboxWorker] = []
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"parse-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _register(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+
+    def submit(self, source: PDFSource, filename: str, cache_key: Optional[str] = None,
+               page_range: Optional[str] = None, block: bool = False, pin: bool = False) -> Job:
+        """
+        Queues a PDF for parsing. The job takes ownership of `source`: a path is deleted
+        and an mmap closed once it has been parsed.
+        When `cache_key` is given, the result is stored in the parse cache under it.
+        With `block`, waits for room in the queue instead of raising QueueFullError.
+        With `pin`, the job is kept until unpin() is called.
+        """
+        job = Job(source, filename, cache_key, page_range)
+        job.pinned = pin
+        self._register(job)
+        try:
+            self._queue.put(job, block=block)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.job_id]
+            os.unlink(job.result_path)
+            self._release_source(job.source)
+            job.source = None
+            raise QueueFullError("Too many documents are waiting to be parsed.")
+        return job
+
+    def add_cached(self, filename: str, cache_key: str, page_range: Optional[str] = None,
+                   pin: bool = False) -> Optional[Job]:
+        """
+        Records an already completed job whose JSONL comes from the parse cache.
+        Returns None on a cache miss.
+        """
+        job = Job(None, filename, page_range=page_range)
+        if not get_parse_cache().copy_to(cache_key, job.result_path):
+            os.unlink(job.result_path)
+            return None
+        with open(job.result_path, "rb") as f:
+            lines = f.readlines() if SEARCH_INDEX else None
+            job.chunk_count = len(lines) if lines is not None else sum(1 for _ in f)
+        if lines:
+            # The document may predate the index; chunks already in it are skipped
+            try:
+                get_search_index().add_records(json.loads(line) for line in lines)
+                get_search_index().commit()
+            except sqlite3.Error as e:
+                print(f"Could not index the cached result of {filename}: {e}")
+        job.cached = True
+        job.status = "completed"
+        job.started_at = job.finished_at = job.created_at
+        job.pinned = pin
+        job.done.set()
+        self._register(job)
+        return job
+
+    def submit_document(self, source: PDFSource, filename: str, page_range: Optional[str] = None,
+                        block: bool = False, pin: bool = False) -> Job:
+        """
+        Answers a PDF from the parse cache when it was parsed before with the same
+        settings, and queues it otherwise. Takes ownership of `source` either way.
+        Raises QueueFullError when it has to be queued and there is no room, and
+        DocumentTooLargeError when it exceeds PARSE_MAX_FILE_MB.
+        """
+        size = os.path.getsize(source) if isinstance(source, str) else len(source)
+        if PARSE_MAX_FILE_MB and size > PARSE_MAX_FILE_MB * 1024 * 1024:
+            self._release_source(source)
+            get_metrics().record_limit("file_size")
+            raise DocumentTooLargeError(f"PDFs larger than {PARSE_MAX_FILE_MB} MB are not accepted.")
+        cache_key = None
+        if get_parse_cache().enabled:
+            file_hash = get_file_hash(source) if isinstance(source, str) else get_bytes_hash(source)
+            fingerprint = parser_fingerprint(page_range=page_range)
+            # Flagged or dropped duplicates are part of the stored result
+            if DEDUP_MODE != "off":
+                fingerprint += f"-dedup-{DEDUP_MODE}"
+            cache_key = ParseCache.make_key(file_hash, fingerprint)
+            job = self.add_cached(filename, cache_key, page_range, pin)
+            if job is not None:
+                self._release_source(source)
+                return job
+        return self.submit(source, filename, cache_key, page_range, block, pin)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def unpin(self, job: Job) -> None:
+        """Lets a pinned job be dropped with the rest of the history."""
+        with self._lock:
+            job.pinned = False
+            self._prune()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _prune(self) -> None:
+        """Drops the oldest finished jobs beyond the history limit; pinned jobs are kept."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished and not job.pinned]
+        for job_id in finished[:max(0, len(finished) - self._history)]:
+            job = self._jobs.pop(job_id)
+            try:
+                os.unlink(job.result_path)
+            except FileNotFoundError:
+                pass
+
+    def _worker(self) -> None:
+        # Sandboxes start with the workers, so they warm up before the first upload
+        if PARSE_ISOLATED:
+            self._sandbox().start()
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _release_source(source: Optional[PDFSource]) -> None:
+        if isinstance(source, str):
+            os.unlink(source)
+        elif isinstance(source, mmap.mmap):
+            source.close()
+
+    def _sandbox(self) -> SandboxWorker:
+        sandbox = getattr(self._local, "sandbox", None)
+        if sandbox is None:
+            sandbox = self._local.sandbox = SandboxWorker()
+            with self._lock:
+                self._sandboxes.append(sandbox)
+        return sandbox
+
+    def ocr_warm(self) -> bool:
+        """Whether every sandbox has loaded the OCR_WARMUP_LANGS engines."""
+        with self._lock:
+            sandboxes = list(self._sandboxes)
+        return len(sandboxes) == len(self._workers) and all(sandbox.warm for sandbox in sandboxes)
+
+    def close_sandboxes(self) -> None:
+        """Lets the sandbox processes exit; workers start new ones if more jobs arrive."""
+        with self._lock:
+            sandboxes = list(self._sandboxes)
+        for sandbox in sandboxes:
+            sandbox.close()
+
+    def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        def on_progress(pages_done: int, pages_total: int) -> None:
+            job.pages_done = pages_done
+            job.pages_total = pages_total
+
+        parser = None
+        try:
+            if PARSE_ISOLATED:
+                parser = self._sandbox().open(job.source, on_progress, job.page_range,
+                                              with_signature=DEDUP_MODE != "off")
+                signature = parser.document_signature
+            else:
+                parser = PDFParser(job.source, progress_callback=on_progress, page_range=job.page_range,
+                                   limits=ParseLimits())
+                signature = lambda: document_signature(parser.text_content)  # noqa: E731
+            job.pages_total = len(parser.page_indices)
+            records = parser.iter_jsonl_records()
+            if DEDUP_MODE != "off":
+                records = dedup_records(records, parser.doc_id, signature, get_dedup_index())
+            if SEARCH_INDEX:
+                records = index_records(records, get_search_index())
+            # Append each record as soon as it is produced so results can be streamed
+            with open(job.result_path, "ab") as out:
+                for record in records:
+                    with parser.stats.stage("serialization"):
+                        line = dumps_jsonl(record)
+                    out.write(line)
+                    out.flush()
+                    job.chunk_count += 1
+                    parser.stats.count("output_bytes", len(line))
+            job.status = "completed"
+            job.partial = parser.partial
+            # A cut-short result depends on timing, so it is never served from the cache
+            if job.cache_key and not job.partial:
+                get_parse_cache().put_file(job.cache_key, job.result_path)
+        except SandboxError as e:
+            print(f"Parsing {job.filename} was stopped ({e.reason}): {e}")
+            job.partial = {"reason": e.reason}
+            # The chunks streamed before the sandbox was stopped are kept
+            if job.chunk_count:
+                job.status = "completed"
+            else:
+                job.error = str(e)
+                job.status = "failed"
+        except Exception as e:
+            print(f"Error processing document {job.filename}: {e}")
+            job.error = f"An error occurred during processing: {str(e)}"
+            job.status = "failed"
+        finally:
+            # Explicitly close the fitz document object before unlinking the file
+            if parser:
+                job.stats = parser.stats.to_dict()
+                get_metrics().record_document(parser.stats, job.status)
+                parser.close()
+            else:
+                get_metrics().record_unparsed(job.status)
+            if job.partial:
+                get_metrics().record_limit(job.partial["reason"])
+            self._release_source(job.source)
+            job.source = None
+            job.finished_at = time.time()
+            job.done.set()
+            with self._lock:
+                self._prune()
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Returns the process-wide job manager, starting its workers on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
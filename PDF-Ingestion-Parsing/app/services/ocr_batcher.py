@@ -0,0 +1,179 @@
+# app/services/ocr_batcher.py
+
+import hashlib
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from functools import lru_cache
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.core.config import OCR_DEFAULT_LANG, OCR_DPI, OCR_PAGE_BATCH_SIZE, OCR_BATCH_MAX_WAIT_MS
+from app.core.limits import ParseLimits
+from app.core.ocr_preprocess import prepare_page
+from app.services.file_storage import get_ocr_page_cache
+from app.services.ocr_pool import get_ocr_pool
+
+# Bump when app.core.ocr changes how text is read off a page image, to retire cached pages
+OCR_CACHE_VERSION = "1"
+
+
+class OCRBatcher:
+    """
+    Collects page images submitted by any document in the process and OCRs them in
+    fixed-size batches, one background thread per language. A partial batch waits
+    briefly for pages from other documents before it runs.
+    """
+
+    def __init__(self, batch_size: int = OCR_PAGE_BATCH_SIZE, max_wait_ms: int = OCR_BATCH_MAX_WAIT_MS):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queues: Dict[str, "queue.Queue"] = {}
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "pages": 0, "errors": 0, "ocr_seconds": 0.0}
+
+    def submit(self, image: np.ndarray, lang: Optional[str] = None) -> Future:
+        """Queues one page image and returns a future resolving to its text."""
+        lang = lang or OCR_DEFAULT_LANG
+        future: Future = Future()
+        self._queue_for(lang).put((image, future))
+        return future
+
+    def _queue_for(self, lang: str) -> "queue.Queue":
+        with self._lock:
+            if lang not in self._queues:
+                self._queues[lang] = queue.Queue()
+                threading.Thread(target=self._loop, args=(lang, self._queues[lang]),
+                                 name=f"ocr-batcher-{lang}", daemon=True).start()
+            return self._queues[lang]
+
+    def _next_batch(self, pending: "queue.Queue") -> List:
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(pending.get(timeout=timeout) if timeout > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self, lang: str, pending: "queue.Queue") -> None:
+        # Imported here so the OpenCV based recogniser loads with the first OCR batch
+        from app.core.ocr import ocr_images
+
+        while True:
+            batch = self._next_batch(pending)
+            started = time.perf_counter()
+            try:
+                with get_ocr_pool().acquire(lang) as ocr_engine:
+                    texts = ocr_images(ocr_engine, [image for image, _ in batch])
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["pages"] += len(batch)
+                self._stats["ocr_seconds"] += time.perf_counter() - started
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["batch_size"] = self.batch_size
+        snapshot["mean_batch_size"] = round(snapshot["pages"] / snapshot["batches"], 2) if snapshot["batches"] else 0.0
+        snapshot["pages_per_second"] = (
+            round(snapshot["pages"] / snapshot["ocr_seconds"], 2) if snapshot["ocr_seconds"] else 0.0
+        )
+        return snapshot
+
+
+_batcher: Optional[OCRBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_ocr_batcher() -> OCRBatcher:
+    """Returns the process-wide OCR batcher."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = OCRBatcher()
+    return _batcher
+
+
+@lru_cache(maxsize=None)
+def _engine_version() -> str:
+    try:
+        return metadata.version("paddleocr")
+    except metadata.PackageNotFoundError:
+        return "none"
+
+
+def page_cache_key(image: np.ndarray, lang: str) -> str:
+    """
+    Key of a rendered page in the OCR page cache: the hash of the exact pixels handed to
+    OCR, so rendering and preprocessing settings are covered, plus the language and engine.
+    """
+    digest = hashlib.sha256(f"{image.shape}-{image.dtype}".encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return f"{digest.hexdigest()}-{lang}-{_engine_version()}-v{OCR_CACHE_VERSION}"
+
+
+def ocr_document_pages(doc: fitz.Document, page_indices: List[int], lang: str, dpi: int = OCR_DPI,
+                       on_page_done: Optional[Callable[[int], None]] = None,
+                       limits: Optional[ParseLimits] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    OCRs pages of one document through the shared batcher and returns (text, render info)
+    pairs in page order. Only a couple of batches worth of rendered pages are kept in
+    flight to bound memory; blank pages never reach the OCR engine, nor do pages found
+    in the OCR page cache (their info has "cached": True). With `limits`, no page is
+    rendered once the time or pixel budget is spent, so fewer pairs come back.
+    """
+    batcher = get_ocr_batcher()
+    cache = get_ocr_page_cache()
+    max_in_flight = 2 * batcher.batch_size
+    # (future or cached text, render info, cache key of a page being OCR'd)
+    in_flight: deque = deque()
+    results: List[Tuple[str, Dict[str, Any]]] = []
+
+    def collect_one():
+        pending, info, key = in_flight.popleft()
+        text = pending.result() if isinstance(pending, Future) else pending
+        if key is not None:
+            cache.put_text(key, text)
+        results.append((text, info))
+        if on_page_done:
+            on_page_done(1)
+
+    for page_num in page_indices:
+        if limits is not None and limits.ocr_stop_reason():
+            break
+        image, info = prepare_page(doc[page_num], dpi)
+        if limits is not None:
+            limits.add_ocr_pixels(info["pixels"])
+        key = text = None
+        if image is not None and cache.enabled:
+            key = page_cache_key(image, lang or OCR_DEFAULT_LANG)
+            text = cache.get_text(key)
+        if image is None:
+            in_flight.append(("", info, None))
+        elif text is not None:
+            info["cached"] = True
+            in_flight.append((text, info, None))
+        else:
+            in_flight.append((batcher.submit(image, lang), info, key))
+        if len(in_flight) >= max_in_flight:
+            collect_one()
+    while in_flight:
+        collect_one()
+    return results
@@ -0,0 +1,129 @@
+# app/services/ocr_pool.py
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+from app.core.config import OCR_DEFAULT_LANG, OCR_POOL_SIZE, OCR_REC_BATCH_SIZE
+
+
+class OCREnginePool:
+    """
+    A bounded, lazily populated pool of PaddleOCR engines shared by the whole process.
+
+    Engines are keyed by language and only created the first time a parser actually
+    needs OCR, so documents with a usable text layer never pay the model load.
+    """
+
+    def __init__(self, max_size: int = OCR_POOL_SIZE):
+        self.max_size = max(1, max_size)
+        self._lock = threading.Condition()
+        self._idle: Dict[str, List[Any]] = {}
+        self._created: Dict[str, int] = {}
+        self._ready = set()
+        self._stats = {
+            "hits": 0,
+            "loads": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "load_seconds": 0.0,
+            "load_errors": 0,
+        }
+
+    def _load_engine(self, lang: str):
+        """Builds a new PaddleOCR engine for the given language."""
+        # Paddle and OpenCV take seconds and hundreds of MB to import; only OCR pays for them
+        try:
+            from paddleocr import PaddleOCR
+        except ImportError:
+            raise ImportError("OCR requires the 'paddleocr' package") from None
+        return PaddleOCR(use_angle_cls=True, lang=lang, rec_batch_num=OCR_REC_BATCH_SIZE, show_log=False)
+
+    def _checkout(self, lang: str):
+        """Returns an idle engine, or None if the caller is allowed to load a new one."""
+        with self._lock:
+            waited = None
+            while True:
+                idle = self._idle.setdefault(lang, [])
+                if idle:
+                    self._stats["hits"] += 1
+                    engine = idle.pop()
+                    break
+                if self._created.get(lang, 0) < self.max_size:
+                    # Reserve the slot before releasing the lock for the slow load
+                    self._created[lang] = self._created.get(lang, 0) + 1
+                    engine = None
+                    break
+                if waited is None:
+                    waited = time.perf_counter()
+                    self._stats["waits"] += 1
+                self._lock.wait()
+
+            if waited is not None:
+                self._stats["wait_seconds"] += time.perf_counter() - waited
+            return engine
+
+    def _checkin(self, lang: str, engine) -> None:
+        with self._lock:
+            self._idle.setdefault(lang, []).append(engine)
+            self._lock.notify()
+
+    @contextmanager
+    def acquire(self, lang: Optional[str] = None):
+        """Borrows an engine for `lang` for the duration of the `with` block."""
+        lang = lang or OCR_DEFAULT_LANG
+        engine = self._checkout(lang)
+
+        if engine is None:
+            started = time.perf_counter()
+            try:
+                engine = self._load_engine(lang)
+            except Exception:
+                with self._lock:
+                    self._created[lang] -= 1
+                    self._stats["load_errors"] += 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._stats["loads"] += 1
+                self._ready.add(lang)
+                self._stats["load_seconds"] += time.perf_counter() - started
+
+        try:
+            yield engine
+        finally:
+            self._checkin(lang, engine)
+
+    def warm_up(self, langs: List[str]) -> None:
+        """Loads one engine per language ahead of the first OCR request."""
+        for lang in langs:
+            with self.acquire(lang):
+                pass
+
+    def is_warm(self, lang: Optional[str] = None) -> bool:
+        with self._lock:
+            return (lang or OCR_DEFAULT_LANG) in self._ready
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of pool usage counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["max_size"] = self.max_size
+            snapshot["engines"] = dict(self._created)
+            snapshot["idle"] = {lang: len(engines) for lang, engines in self._idle.items()}
+        return snapshot
+
+
+_pool: Optional[OCREnginePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OCREnginePool:
+    """Returns the process-wide OCR engine pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCREnginePool()
+    return _pool
@@ -0,0 +1,263 @@
+# app/services/sandbox.py
+
+import mmap
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.config import OCR_WARMUP_LANGS, PARSE_KILL_GRACE_SECONDS, PARSE_MAX_MEMORY_MB, PARSE_TIMEOUT_SECONDS
+from app.core.metrics import ParseStats
+from app.core.parser import PDFSource
+
+# How often the parent checks a sandbox's clock and memory while it works
+POLL_SECONDS = 0.2
+
+
+class SandboxError(Exception):
+    """Raised when a sandbox process had to be killed or died; `reason` says why."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _serve(conn, warm_langs: List[str], warm) -> None:
+    """
+    Sandbox process main loop: loads the OCR engines for `warm_langs` (setting the
+    `warm` event once they are loaded), then parses one document per request until
+    the pipe closes.
+    """
+    import resource
+
+    from app.core.limits import ParseLimits
+    from app.core.parser import PDFParser
+    from app.services.dedup import document_signature
+    from app.services.ocr_pool import get_ocr_pool
+
+    # A crashing native library must not leave core dumps of untrusted documents behind
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    # Ctrl+C is for the API process, which stops the sandboxes itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        get_ocr_pool().warm_up(warm_langs)
+        warm.set()
+    except Exception as e:
+        print(f"OCR warm-up failed: {e}")
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        source, page_range, with_signature = request
+        parser = None
+        try:
+            # A daemonic process cannot start the page workers, so pages are parsed serially
+            parser = PDFParser(source, workers=1, page_range=page_range, limits=ParseLimits(),
+                               progress_callback=lambda done, total: conn.send(("progress", done, total)))
+            conn.send(("opened", parser.doc_id, parser.page_indices))
+            first = True
+            for record in parser.iter_jsonl_records():
+                if first and with_signature:
+                    conn.send(("signature", document_signature(parser.text_content)))
+                first = False
+                conn.send(("record", record))
+            conn.send(("done", parser.stats.to_dict(), parser.partial))
+        except Exception as e:
+            conn.send(("error", str(e), parser.stats.to_dict() if parser else None))
+        finally:
+            if parser:
+                parser.close()
+
+
+def _resident_bytes(pid: int) -> int:
+    """Resident memory of a process, from /proc; 0 where that is not available."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+class SandboxParse:
+    """
+    One document being parsed in a sandbox, with the parts of the PDFParser interface
+    the job workers use. `stats` and `partial` are complete once the records are consumed.
+    """
+
+    def __init__(self, sandbox: "SandboxWorker", progress_callback: Optional[Callable[[int, int], None]],
+                 spill_path: Optional[str]):
+        self._sandbox = sandbox
+        self._progress_callback = progress_callback
+        self._spill_path = spill_path
+        self._signature = None
+        # Whether the sandbox has finished with this document and is ready for the next one
+        self._finished = False
+        self.stats = ParseStats()
+        self.partial: Optional[Dict[str, Any]] = None
+        message = self._receive()
+        if message[0] != "opened":
+            raise RuntimeError(f"Unexpected sandbox message: {message[0]}")
+        _, self.doc_id, self.page_indices = message
+
+    def _receive(self):
+        """Returns the next message that is not a progress report; raises on errors."""
+        while True:
+            message = self._sandbox.receive()
+            kind = message[0]
+            if kind == "progress":
+                if self._progress_callback:
+                    self._progress_callback(message[1], message[2])
+            elif kind == "error":
+                self._finished = True
+                if message[2]:
+                    self.stats.merge(message[2])
+                raise RuntimeError(message[1])
+            else:
+                return message
+
+    def document_signature(self):
+        """The MinHash signature of the whole text; sent before the first record."""
+        return self._signature
+
+    def iter_jsonl_records(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            message = self._receive()
+            kind = message[0]
+            if kind == "record":
+                yield message[1]
+            elif kind == "signature":
+                self._signature = message[1]
+            elif kind == "done":
+                self._finished = True
+                self.stats.merge(message[1])
+                self.partial = message[2]
+                return
+
+    def close(self) -> None:
+        # Messages of an abandoned document would be read as the next one's
+        if not self._finished:
+            self._sandbox.kill()
+        if self._spill_path:
+            os.unlink(self._spill_path)
+            self._spill_path = None
+
+
+class SandboxWorker:
+    """
+    A long-lived spawned process that parses documents one at a time on behalf of a
+    job worker thread, so a pathological PDF can hang or exhaust only its sandbox.
+    The parent kills the process when it runs PARSE_KILL_GRACE_SECONDS past the
+    document's timeout or its resident memory exceeds PARSE_MAX_MEMORY_MB, and starts
+    a fresh one for the next document. Each process loads the OCR engines for
+    `warm_langs` when it starts, so OCR is warm where the parsing happens.
+    """
+
+    def __init__(self, timeout: float = PARSE_TIMEOUT_SECONDS, grace: float = PARSE_KILL_GRACE_SECONDS,
+                 max_memory_mb: int = PARSE_MAX_MEMORY_MB, warm_langs: Optional[List[str]] = None):
+        self.timeout = timeout
+        self.grace = grace
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.warm_langs = OCR_WARMUP_LANGS if warm_langs is None else warm_langs
+        self._process = None
+        self._conn = None
+        self._warm = None
+        self._deadline: Optional[float] = None
+        self._checked = 0.0
+
+    def start(self) -> None:
+        """Starts the sandbox process unless it is running; `open` does this on demand."""
+        if self._process is not None and self._process.is_alive():
+            return
+        if self._conn is not None:
+            self._conn.close()
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._warm = context.Event()
+        self._process = context.Process(target=_serve, args=(child_conn, self.warm_langs, self._warm),
+                                        name="parse-sandbox", daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    @property
+    def warm(self) -> bool:
+        """Whether the sandbox process is running and has loaded its OCR engines."""
+        process = self._process
+        return process is not None and process.is_alive() and self._warm.is_set()
+
+    def open(self, source: PDFSource, progress_callback: Optional[Callable[[int, int], None]] = None,
+             page_range: Optional[str] = None, with_signature: bool = False) -> SandboxParse:
+        """
+        Starts parsing a document. Raises SandboxError if the sandbox is killed or dies,
+        and RuntimeError with the parser's message if parsing fails.
+        """
+        self.start()
+        spill_path = None
+        if isinstance(source, mmap.mmap):
+            # A mapping cannot be sent to another process; hand over a file instead
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                tmp.write(source)
+                spill_path = tmp.name
+            source = spill_path
+        elif isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        elif isinstance(source, (bytearray, memoryview)):
+            source = bytes(source)
+        self._deadline = time.time() + self.timeout + self.grace if self.timeout > 0 else None
+        self._checked = 0.0
+        self._conn.send((source, page_range, with_signature))
+        parse = None
+        try:
+            parse = SandboxParse(self, progress_callback, spill_path)
+            return parse
+        finally:
+            if parse is None and spill_path:
+                os.unlink(spill_path)
+
+    def receive(self):
+        """Waits for the next message from the sandbox, enforcing its deadline and memory cap."""
+        while True:
+            if time.monotonic() - self._checked >= POLL_SECONDS:
+                self._check()
+            if self._conn.poll(POLL_SECONDS):
+                try:
+                    return self._conn.recv()
+                except EOFError:
+                    self._process.join()
+                    self._fail("crashed", f"Parser process exited with code {self._process.exitcode}.")
+            elif not self._process.is_alive():
+                self._fail("crashed", f"Parser process exited with code {self._process.exitcode}.")
+
+    def _check(self) -> None:
+        self._checked = time.monotonic()
+        if self._deadline is not None and time.time() >= self._deadline:
+            self.kill()
+            self._fail("timeout", f"Parsing was stopped after {self.timeout + self.grace:g} seconds.")
+        if self.max_memory and _resident_bytes(self._process.pid) > self.max_memory:
+            self.kill()
+            self._fail("memory_limit", f"Parsing was stopped above {self.max_memory // (1024 * 1024)} MB of memory.")
+
+    def _fail(self, reason: str, message: str) -> None:
+        self._conn.close()
+        self._process = None
+        raise SandboxError(reason, message)
+
+    def kill(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+
+    def close(self) -> None:
+        """Stops the sandbox process."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            self._process.join(timeout=5)
+            self.kill()
+            self._process = None
@@ -0,0 +1,205 @@
+# app/services/search.py
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.core.config import SEARCH_INDEX_PATH, SEARCH_MMAP_MB
+
+# Filters accepted by SearchIndex.search, with the column each one applies to
+FILTERS = ("section_type", "language", "page_number", "doc_title")
+MAX_LIMIT = 200
+# Tokens of a free-text query; everything else (FTS5 operators included) is ignored
+QUERY_TOKEN_PATTERN = re.compile(r'\w+')
+SNIPPET_TOKENS = 24
+# Characters with a meaning in LIKE patterns, escaped in the doc_title filter
+LIKE_SPECIAL = re.compile(r"[\\%_]")
+
+
+def fts_query(text: str) -> str:
+    """Turns free text into an FTS5 query matching chunks that contain every word."""
+    return " ".join(f'"{token}"' for token in QUERY_TOKEN_PATTERN.findall(text))
+
+
+class SearchIndex:
+    """
+    Full-text index of ingested chunks in SQLite: an FTS5 inverted index of the chunk
+    text ranked with BM25, next to a table of the chunk fields that can be filtered on.
+    Documents are added incrementally as they are ingested. Reads use their own
+    connections, one per thread, with the database file memory-mapped, so searches run
+    concurrently with ingestion. Thread-safe.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH, mmap_mb: int = SEARCH_MMAP_MB):
+        self.path = path
+        self.mmap_bytes = mmap_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        statements = [
+            "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, "
+            "document_id TEXT NOT NULL, doc_title TEXT, section_type TEXT, language TEXT, page_number INTEGER, "
+            "start_offset INTEGER, end_offset INTEGER, duplicate_of TEXT)",
+            "CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id)",
+            "CREATE INDEX IF NOT EXISTS chunks_section ON chunks (section_type)",
+            "CREATE INDEX IF NOT EXISTS chunks_language ON chunks (language)",
+            "CREATE INDEX IF NOT EXISTS chunks_page ON chunks (page_number)",
+            # Row ids match chunks.id; diacritics are folded so "naive" finds "naïve"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text, tokenize='unicode61 remove_diacritics 2')",
+        ]
+        for statement in statements:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Indexes JSONL records (as produced by the parser); chunks already in the index
+        are skipped. Returns how many were added. Call commit() to make them visible.
+        """
+        added = 0
+        with self._lock:
+            for record in records:
+                metadata = record["metadata"]
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO chunks (chunk_id, document_id, doc_title, section_type, language, "
+                    "page_number, start_offset, end_offset, duplicate_of) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record["id"], record["id"].rsplit("_chunk", 1)[0], metadata.get("doc_title"),
+                     metadata.get("section_type"), metadata.get("language"), metadata.get("page_number"),
+                     metadata.get("start_offset"), metadata.get("end_offset"), metadata.get("duplicate_of")),
+                )
+                # An ignored insert leaves lastrowid at the previous row, so check the row count
+                if cursor.rowcount == 1:
+                    self._conn.execute("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)",
+                                       (cursor.lastrowid, record["text"]))
+                    added += 1
+        return added
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def optimize(self) -> None:
+        """Merges the index segments written by many small commits; worth it after bulk loads."""
+        with self._lock:
+            self._conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+            self._conn.commit()
+
+    def search(self, query: Optional[str] = None, limit: int = 20, offset: int = 0, include_text: bool = False,
+               **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Returns the chunks matching every word of `query`, best BM25 score first, with a
+        highlighted snippet. Filters on section_type, language and page_number match
+        exactly; doc_title matches a case-insensitive substring. Without a query, the
+        chunks passing the filters are listed in ingestion order.
+        """
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown search filters: {', '.join(sorted(unknown))}")
+        conditions, params = [], []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name == "doc_title":
+                conditions.append("c.doc_title LIKE ? ESCAPE '\\'")
+                params.append("%" + LIKE_SPECIAL.sub(r"\\\g<0>", value) + "%")
+            else:
+                conditions.append(f"c.{name} = ?")
+                params.append(value)
+
+        columns = ("c.chunk_id, c.document_id, c.doc_title, c.section_type, c.language, c.page_number, "
+                   "c.start_offset, c.end_offset, c.duplicate_of")
+        if query:
+            match = fts_query(query)
+            if not match:
+                return []
+            sql = (f"SELECT {columns}, -bm25(chunks_fts), "
+                   f"snippet(chunks_fts, 0, '[', ']', '…', {SNIPPET_TOKENS}), chunks_fts.text "
+                   "FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid WHERE chunks_fts MATCH ?")
+            params.insert(0, match)
+            order = "ORDER BY bm25(chunks_fts)"
+        else:
+            sql = (f"SELECT {columns}, NULL, NULL, chunks_fts.text "
+                   "FROM chunks c JOIN chunks_fts ON chunks_fts.rowid = c.id WHERE 1")
+            order = "ORDER BY c.id"
+        for condition in conditions:
+            sql += f" AND {condition}"
+        sql += f" {order} LIMIT ? OFFSET ?"
+        params += [max(1, min(limit, MAX_LIMIT)), max(0, offset)]
+
+        results = []
+        for row in self._reader().execute(sql, params):
+            result = {
+                "id": row[0], "document_id": row[1], "doc_title": row[2], "section_type": row[3],
+                "language": row[4], "page_number": row[5], "start_offset": row[6], "end_offset": row[7],
+                "duplicate_of": row[8], "score": round(row[9], 4) if row[9] is not None else None,
+                "snippet": row[10] if row[10] is not None else row[11][:200],
+            }
+            if include_text:
+                result["text"] = row[11]
+            results.append(result)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        chunks, documents = self._reader().execute(
+            "SELECT COUNT(*), COUNT(DISTINCT document_id) FROM chunks").fetchone()
+        return {"chunks": chunks, "documents": documents, "path": self.path}
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+            self._conn.commit()
+            self._conn.close()
+
+
+def index_records(records: Iterable[Dict[str, Any]], index: SearchIndex) -> Iterator[Dict[str, Any]]:
+    """
+    Passes a document's records through and indexes them once the last one is through,
+    so a document whose parse fails or is abandoned is left out of the index.
+    """
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        yield record
+    if batch:
+        # The records are already out; a broken index must not fail the document
+        try:
+            index.add_records(batch)
+            index.commit()
+        except sqlite3.Error as e:
+            print(f"Could not index {batch[0]['id'].rsplit('_chunk', 1)[0]}: {e}")
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Returns the process-wide search index, opening it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex()
+    return _index
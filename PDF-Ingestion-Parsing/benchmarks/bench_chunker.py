@@ -0,0 +1,135 @@
+# benchmarks/bench_chunker.py
+"""
+Micro-benchmark for PDFParser._iter_chunks on synthetic page text.
+
+Runs the chunker over 100 to 10,000 generated pages and prints the time per page,
+which should stay flat as the document grows. The pre-rewrite chunker is included
+as a reference for the smaller sizes.
+
+Usage:
+    python -m benchmarks.bench_chunker [--sizes 100,1000,10000] [--legacy-max 1000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.parser import PDFParser, SECTION_PATTERNS, clean_text  # noqa: E402
+
+WORDS = ("model data training corpus results method analysis paper table figure "
+         "section learning network baseline evaluation metric sample").split()
+HEADINGS = ["Abstract", "1. Introduction", "2. Related Work", "3. Methods",
+            "4. Results", "5. Conclusion", "References"]
+
+
+def synthetic_pages(page_count: int, lines_per_page: int = 40, seed: int = 0):
+    """Generates page dicts shaped like PDFParser.pages_data, with occasional headings."""
+    rng = random.Random(seed)
+    pages = []
+    for page_num in range(1, page_count + 1):
+        lines = [" ".join(rng.choices(WORDS, k=12)) for _ in range(lines_per_page)]
+        if page_num % 5 == 1:
+            lines.insert(rng.randrange(lines_per_page), rng.choice(HEADINGS))
+        lines.append(f"Page {page_num}")
+        pages.append({"page_number": page_num, "text": "\n".join(lines), "source": "text"})
+    return pages
+
+
+def legacy_chunk_texts(pages):
+    """The original chunking loop: string concatenation and a full re-split per line."""
+    texts = []
+    current_chunk_text = ""
+    for page_data in pages:
+        for line in page_data["text"].split('\n'):
+            for section_name, pattern in SECTION_PATTERNS.items():
+                if pattern.search(line):
+                    if current_chunk_text:
+                        texts.append(current_chunk_text)
+                        current_chunk_text = ""
+                    break
+            cleaned_line = clean_text(line)
+            if cleaned_line:
+                current_chunk_text += " " + cleaned_line
+            if len(current_chunk_text.split()) >= 500:
+                texts.append(current_chunk_text)
+                current_chunk_text = ""
+    if current_chunk_text:
+        texts.append(current_chunk_text)
+    return texts
+
+
+def make_parser() -> PDFParser:
+    """Builds a parser around a throwaway one-page PDF; the benchmark supplies the pages."""
+    path = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(path)
+    doc.close()
+    parser = PDFParser(path, workers=1)
+    parser.language = "en"
+    parser.doc_title = "Synthetic Document"
+    parser.authors = ["Benchmark"]
+    return parser
+
+
+def time_call(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated page counts.")
+    arg_parser.add_argument("--legacy-max", type=int, default=1000,
+                            help="Largest page count to run the legacy chunker on.")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--json", help="Write results to this file.")
+    args = arg_parser.parse_args()
+
+    parser = make_parser()
+    results = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        pages = synthetic_pages(size)
+        chunks = []
+
+        def run_chunker():
+            chunks[:] = parser._iter_chunks(pages)
+
+        seconds = time_call(run_chunker, args.repeat)
+        row = {
+            "pages": size,
+            "chunks": len(chunks),
+            "seconds": round(seconds, 4),
+            "us_per_page": round(seconds / size * 1e6, 1),
+        }
+        if size <= args.legacy_max:
+            legacy_seconds = time_call(lambda: legacy_chunk_texts(pages), args.repeat)
+            row["legacy_seconds"] = round(legacy_seconds, 4)
+            row["speedup"] = round(legacy_seconds / seconds, 1)
+        results.append(row)
+        print(json.dumps(row))
+
+    # Linear scaling means the per-page cost of the largest run stays close to the smallest
+    if len(results) > 1:
+        ratio = results[-1]["us_per_page"] / results[0]["us_per_page"]
+        print(f"per-page cost ratio (largest/smallest): {ratio:.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
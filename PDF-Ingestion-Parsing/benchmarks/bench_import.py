@@ -0,0 +1,97 @@
+# benchmarks/bench_import.py
+"""
+Cold-start guard for the API and the parser.
+
+Imports each module in fresh interpreters and reports the median wall time and the
+resident memory afterwards, plus any heavy OCR/vision packages that got loaded. Those
+belong behind the first real OCR call; the run fails when one of them is imported or
+a median exceeds its budget, so it can run in CI.
+
+Usage:
+    python -m benchmarks.bench_import [--runs 5] [--max-seconds app.main=1.5,app.core.parser=1.0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ("app.main", "app.core.parser")
+# Packages that must not be loaded by importing the modules above
+HEAVY_MODULES = ("paddle", "paddleocr", "cv2", "PIL", "torch", "skimage")
+# Default budgets in seconds; generous enough for slow CI machines
+DEFAULT_BUDGETS = {"app.main": 2.0, "app.core.parser": 1.5}
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": seconds, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "modules": len(sys.modules), "heavy": heavy}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Imports `module` in a new interpreter and returns its timing and footprint."""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONWARNINGS="ignore")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def parse_budgets(spec: str) -> dict:
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in filter(None, spec.split(",")):
+        module, _, seconds = item.partition("=")
+        budgets[module.strip()] = float(seconds)
+    return budgets
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module.")
+    arg_parser.add_argument("--max-seconds", default="",
+                            help="Import budgets as module=seconds pairs, e.g. app.main=1.5.")
+    arg_parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = arg_parser.parse_args()
+    budgets = parse_budgets(args.max_seconds)
+
+    results, failures = {}, []
+    for module in MODULES:
+        # The first run also fills the bytecode cache, so it is not timed
+        measure(module)
+        runs = [measure(module) for _ in range(max(1, args.runs))]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        result = {
+            "median_seconds": round(seconds, 4),
+            "min_seconds": round(min(run["seconds"] for run in runs), 4),
+            "max_rss_mb": round(max(run["max_rss_mb"] for run in runs), 1),
+            "modules": runs[-1]["modules"],
+            "heavy": runs[-1]["heavy"],
+            "budget_seconds": budgets.get(module),
+        }
+        results[module] = result
+        print(f"{module:<20} {result['median_seconds'] * 1000:8.1f} ms median  "
+              f"{result['max_rss_mb']:7.1f} MB RSS  {result['modules']:5d} modules")
+        if result["heavy"]:
+            failures.append(f"{module} imports {', '.join(result['heavy'])}")
+        if result["budget_seconds"] and seconds > result["budget_seconds"]:
+            failures.append(f"{module} took {seconds:.2f}s (budget {result['budget_seconds']:g}s)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
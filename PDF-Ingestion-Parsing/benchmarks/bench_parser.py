@@ -0,0 +1,184 @@
+# benchmarks/bench_parser.py
+"""
+Parser throughput and memory benchmark over a synthetic PDF corpus.
+
+Every case (document kind x page count) runs in a fresh process so peak RSS is
+measured per case. For each case the benchmark records:
+
+    end_to_end     PDFParser.process(), with its per-stage breakdown
+    extract_text   PDFParser._extract_text_with_pypdf()
+    ocr            PDFParser._extract_text_with_ocr() on the pages routed to OCR
+    chunking       PDFParser._parse_structure_and_chunk()
+    to_jsonl       ParsedDocument.to_jsonl_records()
+
+Results are written as JSON together with the git commit, so runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_parser --output bench-results.json
+    python -m benchmarks.bench_parser --quick --skip-ocr
+    python -m benchmarks.bench_parser --cases text:2000,multicolumn:100
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import corpus_path  # noqa: E402
+
+DEFAULT_CASES = ("text:1,text:10,text:100,text:1000,text:2000,multicolumn:10,multicolumn:100,"
+                 "mixed:10,mixed:100,scanned:1,scanned:10")
+QUICK_CASES = "text:1,text:10,text:100,multicolumn:10,mixed:10,scanned:1"
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _timed(func):
+    started = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - started
+
+
+def run_case(path: str, pages: int, workers: int, skip_ocr: bool) -> dict:
+    """Benchmarks one PDF. Runs inside a dedicated child process."""
+    from app.core.models import ParsedDocument
+    from app.core.parser import PDFParser
+
+    result = {"baseline_rss_mb": round(_peak_rss_mb(), 1), "methods": {}}
+    methods = result["methods"]
+
+    # End to end, through the public entry point
+    parser = PDFParser(path, workers=workers)
+    if skip_ocr:
+        parser._select_pages_for_ocr = lambda: []
+    parsed_doc, seconds = _timed(parser.process)
+    parser.close()
+    if parsed_doc is None:
+        result["error"] = "process() returned None"
+        return result
+    result["end_to_end"] = {
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 1),
+        "chunks": len(parsed_doc.chunks),
+        "stages": parser.stats.to_dict()["stages"],
+    }
+
+    # Individual methods, on a fresh parser
+    parser = PDFParser(path, workers=workers)
+    _, seconds = _timed(parser._extract_text_with_pypdf)
+    methods["extract_text"] = {"seconds": round(seconds, 4), "pages_per_second": round(pages / seconds, 1)}
+
+    ocr_pages = [] if skip_ocr else parser._select_pages_for_ocr()
+    if ocr_pages:
+        try:
+            _, seconds = _timed(lambda: parser._extract_text_with_ocr(ocr_pages))
+            pixels = sum(parser.pages_data[index]["ocr"]["pixels"] for index in ocr_pages)
+            methods["ocr"] = {"seconds": round(seconds, 4), "pages": len(ocr_pages),
+                              "pages_per_second": round(len(ocr_pages) / seconds, 2),
+                              "megapixels_per_page": round(pixels / len(ocr_pages) / 1e6, 2)}
+        except Exception as e:
+            methods["ocr"] = {"error": f"{type(e).__name__}: {e}"}
+
+    parser.text_content = "".join(page["text"] + "\n" for page in parser.pages_data)
+    parser.language = "en"
+    parser.doc_metadata = {"doi": None}
+    parser._extract_header()
+    chunks, seconds = _timed(parser._parse_structure_and_chunk)
+    methods["chunking"] = {"seconds": round(seconds, 4), "chunks": len(chunks),
+                           "pages_per_second": round(pages / seconds, 1)}
+
+    parsed_doc = ParsedDocument.trusted(parser.doc_id, parser.doc_title, parser.authors, parser.language, chunks,
+                                        parser.doc_metadata)
+    records, seconds = _timed(parsed_doc.to_jsonl_records)
+    methods["to_jsonl"] = {"seconds": round(seconds, 4), "records": len(records)}
+    parser.close()
+
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return result
+
+
+def _child(path, pages, workers, skip_ocr, conn):
+    try:
+        conn.send(run_case(path, pages, workers, skip_ocr))
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_isolated(path: str, pages: int, workers: int, skip_ocr: bool) -> dict:
+    """Runs one case in a spawned process so its memory peak isn't shared with other cases."""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(path, pages, workers, skip_ocr, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": "benchmark process died"}
+    process.join()
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--cases", default=DEFAULT_CASES, help="Comma-separated kind:pages pairs.")
+    arg_parser.add_argument("--quick", action="store_true", help=f"Use the small case set ({QUICK_CASES}).")
+    arg_parser.add_argument("--corpus-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".corpus"),
+                            help="Where generated PDFs are cached between runs.")
+    arg_parser.add_argument("--workers", type=int, default=1, help="PDFParser worker processes.")
+    arg_parser.add_argument("--skip-ocr", action="store_true", help="Never run OCR (e.g. without OCR models).")
+    arg_parser.add_argument("--output", default="bench-results.json", help="Where to write the JSON results.")
+    args = arg_parser.parse_args()
+
+    cases = QUICK_CASES if args.quick else args.cases
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": args.workers,
+        "skip_ocr": args.skip_ocr,
+        "cases": [],
+    }
+
+    for case in cases.split(","):
+        kind, pages = case.split(":")
+        pages = int(pages)
+        path = corpus_path(args.corpus_dir, kind, pages)
+        row = {"kind": kind, "pages": pages, "file_bytes": os.path.getsize(path)}
+        row.update(run_isolated(path, pages, args.workers, args.skip_ocr))
+        results["cases"].append(row)
+
+        summary = row.get("end_to_end", {})
+        print(f"{kind:>12} {pages:>5} pages: {summary.get('seconds', '-')}s, "
+              f"{summary.get('pages_per_second', '-')} pages/s, peak {row.get('peak_rss_mb', '-')} MB"
+              + (f" [{row['error']}]" if "error" in row else ""), flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
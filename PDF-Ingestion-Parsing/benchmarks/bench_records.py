@@ -0,0 +1,145 @@
+# benchmarks/bench_records.py
+"""
+Record construction and serialisation benchmark on a synthetic 10k-chunk document.
+
+Compares the ways chunks become JSONL bytes:
+
+    validated   DocumentChunk/DocumentChunkMetadata built with validation, the whole
+                ParsedDocument validated again, records encoded with json.dumps
+                (the path before the trusted constructors)
+    trusted     the same models built with the trusted constructors, encoded with dumps_jsonl
+    records     plain records from make_record, encoded with dumps_jsonl (what the
+                job workers and the export CLI stream)
+    compact     CompactDocument.to_jsonl_bytes()
+
+and checks that every path produces the same records.
+
+Usage:
+    python -m benchmarks.bench_records [--chunks 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import models  # noqa: E402
+from app.core.models import (  # noqa: E402
+    CompactDocument, DocumentChunk, DocumentChunkMetadata, ParsedDocument, dumps_jsonl, dumps_jsonl_records,
+    make_record, trusted_chunk,
+)
+
+WORDS = ("model data training corpus results method analysis paper table figure "
+         "section learning network baseline evaluation metric sample naïve über").split()
+SECTIONS = ["abstract", "introduction", "methods", "results", "conclusion", "references"]
+DOCUMENT_ID = "0b6f7a6e-5c1d-4a55-9a3e-bench"
+TITLE = "Synthetic Document"
+AUTHORS = ["Benchmark Author"]
+
+
+def synthetic_chunks(count: int, words: int = 350, seed: int = 0):
+    """(text, section, page, start, end) rows shaped like the parser's chunk rows."""
+    rng = random.Random(seed)
+    rows, offset = [], 0
+    for index in range(count):
+        text = " ".join(rng.choices(WORDS, k=words))
+        rows.append((text, SECTIONS[index * len(SECTIONS) // count], index // 4 + 1, offset, offset + len(text)))
+        offset += len(text) + 1
+    return rows
+
+
+def validated_path(rows) -> bytes:
+    chunks = [
+        DocumentChunk(chunk_id=f"{DOCUMENT_ID}_chunk{index}", text=text, metadata=DocumentChunkMetadata(
+            document_id=DOCUMENT_ID, doc_title=TITLE, authors=AUTHORS, language="en", section_type=section,
+            page_number=page, start_offset=start, end_offset=end))
+        for index, (text, section, page, start, end) in enumerate(rows)
+    ]
+    document = ParsedDocument(document_id=DOCUMENT_ID, doc_title=TITLE, authors=AUTHORS, language="en",
+                              chunks=chunks, metadata={"doi": None})
+    return b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in document.to_jsonl_records())
+
+
+def trusted_path(rows) -> bytes:
+    chunks = [
+        trusted_chunk(f"{DOCUMENT_ID}_chunk{index}", text, DOCUMENT_ID, TITLE, AUTHORS, "en", section, page,
+                      start, end)
+        for index, (text, section, page, start, end) in enumerate(rows)
+    ]
+    return ParsedDocument.trusted(DOCUMENT_ID, TITLE, AUTHORS, "en", chunks, {"doi": None}).to_jsonl_bytes()
+
+
+def records_path(rows) -> bytes:
+    return dumps_jsonl_records(
+        make_record(f"{DOCUMENT_ID}_chunk{index}", text, section, page, TITLE, AUTHORS, "en", None,
+                    start_offset=start, end_offset=end)
+        for index, (text, section, page, start, end) in enumerate(rows)
+    )
+
+
+def compact_path(rows) -> bytes:
+    document = CompactDocument(DOCUMENT_ID, TITLE, AUTHORS, "en", {"doi": None})
+    for text, section, page, start, end in rows:
+        document.append(text, section, page, start_offset=start, end_offset=end)
+    return document.to_jsonl_bytes()
+
+
+def best_of(func, rows, repeat: int):
+    best, output = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func(rows)
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--chunks", type=int, default=10_000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--json", help="Write results to this file.")
+    args = arg_parser.parse_args()
+
+    rows = synthetic_chunks(args.chunks)
+    print(f"{args.chunks} chunks, encoder: {'orjson' if models.orjson is not None else 'json'}")
+    results, baseline, expected = [], None, None
+    for name, func in (("validated", validated_path), ("trusted", trusted_path),
+                       ("records", records_path), ("compact", compact_path)):
+        seconds, output = best_of(func, rows, args.repeat)
+        records = [json.loads(line) for line in output.splitlines()]
+        if expected is None:
+            expected = records
+        elif records != expected:
+            raise SystemExit(f"{name} produced different records than the validated path")
+        baseline = baseline or seconds
+        row = {
+            "path": name,
+            "seconds": round(seconds, 4),
+            "us_per_chunk": round(seconds / args.chunks * 1e6, 2),
+            "mb": round(len(output) / 1e6, 2),
+            "speedup": round(baseline / seconds, 2),
+        }
+        results.append(row)
+        print(json.dumps(row))
+
+    # The standard library fallback must write the same JSON as orjson, if not the same bytes
+    if models.orjson is not None:
+        record = json.loads(records_path(rows[:1]))
+        encoded = dumps_jsonl(record)
+        models.orjson, saved = None, models.orjson
+        try:
+            assert json.loads(dumps_jsonl(record)) == json.loads(encoded), "json fallback differs from orjson"
+        finally:
+            models.orjson = saved
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
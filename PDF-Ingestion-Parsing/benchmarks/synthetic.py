@@ -0,0 +1,96 @@
+# benchmarks/synthetic.py
+"""
+Generates synthetic PDFs with PyMuPDF for benchmarking the parser.
+
+Kinds:
+    text         single-column pages with a text layer
+    multicolumn  two-column pages with a text layer
+    scanned      image-only pages (rendered text, no text layer)
+    mixed        text pages with every fourth page scanned
+"""
+
+import os
+import random
+
+import fitz  # PyMuPDF
+
+KINDS = ("text", "multicolumn", "scanned", "mixed")
+
+WORDS = ("model data training corpus results method analysis paper table figure section "
+         "learning network baseline evaluation metric sample language document parsing").split()
+HEADINGS = ["Abstract", "1. Introduction", "2. Related Work", "3. Methods",
+            "4. Results", "5. Conclusion", "References"]
+# Resolution of the page images in scanned pages
+SCAN_DPI = 150
+
+
+def _paragraphs(rng: random.Random, count: int):
+    return [" ".join(rng.choices(WORDS, k=rng.randint(40, 90))) + "." for _ in range(count)]
+
+
+def _write_text_page(doc: fitz.Document, rng: random.Random, page_num: int, columns: int) -> fitz.Page:
+    page = doc.new_page()
+    margin = 54
+    width = (page.rect.width - 2 * margin - (columns - 1) * 18) / columns
+    y_top = margin
+    if page_num == 1:
+        page.insert_text((margin, margin + 10), "A Synthetic Study of Document Parsing", fontsize=16)
+        page.insert_text((margin, margin + 30), "author@example.org", fontsize=10)
+        page.insert_text((margin, margin + 45), "doi: 10.5555/synthetic.0001", fontsize=9)
+        y_top = margin + 60
+    for column in range(columns):
+        x0 = margin + column * (width + 18)
+        rect = fitz.Rect(x0, y_top, x0 + width, page.rect.height - margin - 20)
+        heading = ""
+        if page_num % 4 == 1 and column == 0:
+            heading = HEADINGS[(page_num // 4) % len(HEADINGS)] + "\n"
+        paragraphs = _paragraphs(rng, 6)
+        # insert_textbox writes nothing when the text overflows, so drop paragraphs until it fits
+        while paragraphs and page.insert_textbox(rect, heading + "\n".join(paragraphs), fontsize=9) < 0:
+            paragraphs.pop()
+    page.insert_text((page.rect.width / 2 - 15, page.rect.height - margin + 10), f"Page {page_num}", fontsize=8)
+    return page
+
+
+def _scan_image(seed: int) -> bytes:
+    """Renders one text page to PNG; scanned pages reuse it so generation stays fast."""
+    source = fitz.open()
+    _write_text_page(source, random.Random(seed), 2, 1)
+    png = source[0].get_pixmap(dpi=SCAN_DPI).tobytes("png")
+    source.close()
+    return png
+
+
+def generate(kind: str, pages: int, path: str, seed: int = 0) -> str:
+    """Writes a synthetic PDF of the given kind and page count to `path`."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind {kind!r}; expected one of {KINDS}")
+    rng = random.Random(seed)
+    doc = fitz.open()
+    scan_png = _scan_image(seed) if kind in ("scanned", "mixed") else None
+    scan_xref = 0
+
+    for page_num in range(1, pages + 1):
+        scanned = kind == "scanned" or (kind == "mixed" and page_num % 4 == 0)
+        if scanned:
+            page = doc.new_page()
+            # Reusing the image xref keeps large scanned documents small on disk
+            if scan_xref:
+                page.insert_image(page.rect, xref=scan_xref)
+            else:
+                scan_xref = page.insert_image(page.rect, stream=scan_png)
+        else:
+            _write_text_page(doc, rng, page_num, 2 if kind == "multicolumn" else 1)
+
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return path
+
+
+def corpus_path(directory: str, kind: str, pages: int) -> str:
+    """Returns the path of a cached synthetic PDF, generating it if needed."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}-{pages}.pdf")
+    if not os.path.exists(path):
+        generate(kind, pages, path)
+    return path
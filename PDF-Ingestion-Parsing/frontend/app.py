@@ -122,9 +122,26 @@
 import streamlit as st
 import requests
 import json
+import time
 
 # -------------------- CONFIG --------------------
 BACKEND_URL = "http://127.0.0.1:8000/api/docs/upload"
+POLL_INTERVAL_SECONDS = 1.0
+
+
+def wait_for_job(upload_url, job_id, progress_bar):
+    """Polls the job status endpoint until parsing finishes, updating the progress bar."""
+    jobs_url = f"{upload_url.split('/api/')[0]}/api/jobs/{job_id}"
+    while True:
+        job = requests.get(jobs_url).json()
+        if job["pages_total"]:
+            progress_bar.progress(
+                job["pages_done"] / job["pages_total"],
+                text=f"{job['pages_done']} / {job['pages_total']} pages",
+            )
+        if job["status"] in ("completed", "failed"):
+            return jobs_url, job
+        time.sleep(POLL_INTERVAL_SECONDS)
 
 st.set_page_config(
     page_title="DeepScan AI",
@@ -239,10 +256,25 @@ with tab1:
                     }
                     response = requests.post(backend_url, files=files)
 
-                    if response.status_code == 200:
-                        st.session_state["parsed_data"] = response.json()
-                        st.balloons()
-                        st.success("🎉 Processing complete! Switch to the Results tab.")
+                    if response.status_code == 202:
+                        progress_bar = st.progress(0.0)
+                        jobs_url, job = wait_for_job(backend_url, response.json()["job_id"], progress_bar)
+                        result = requests.get(f"{jobs_url}/result", stream=True)
+
+                        if result.status_code == 200:
+                            # The result is NDJSON: keep the raw lines for download, parse them for preview
+                            lines = [line for line in result.iter_lines() if line]
+                            records = [json.loads(line) for line in lines]
+                            # A job that fails after streaming started ends with an {"error": ...} line
+                            if records and set(records[-1]) == {"error"}:
+                                st.error(f"❌ Parsing failed: {records[-1]['error']}")
+                            else:
+                                st.session_state["jsonl_output"] = b"\n".join(lines)
+                                st.session_state["parsed_data"] = records
+                                st.balloons()
+                                st.success("🎉 Processing complete! Switch to the Results tab.")
+                        else:
+                            st.error(f"❌ Backend error {result.status_code}: {result.text}")
                     else:
                         st.error(f"❌ Backend error {response.status_code}: {response.text}")
 
@@ -256,7 +288,7 @@ with tab2:
     st.subheader("📊 Parsed Results")
     if "parsed_data" in st.session_state:
         parsed_data = st.session_state["parsed_data"]
-        jsonl_output = "\n".join(json.dumps(record) for record in parsed_data)
+        jsonl_output = st.session_state["jsonl_output"]
 
         with st.expander("🔍 View Structured JSONL Data"):
             st.json(parsed_data)
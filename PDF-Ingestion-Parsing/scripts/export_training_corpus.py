@@ -0,0 +1,485 @@
+# scripts/export_training_corpus.py
+"""
+Converts a directory tree (or a manifest) of PDFs into a sharded JSONL training corpus.
+
+Documents are parsed in parallel worker processes and written to size-capped shards,
+optionally gzip- or zstd-compressed. Progress is checkpointed by file hash, so an
+interrupted run can be restarted with the same arguments and skips finished files.
+
+With --format parquet or arrow, shards are columnar chunk tables instead (requires
+pyarrow); --compression then selects the codec inside the file.
+
+With --dedup flag or drop, documents and chunks are checked against a persistent
+near-duplicate index (MinHash LSH in SQLite) shared by every run; duplicates get
+`duplicate_of` or are left out. Signatures are computed in the workers.
+
+With --index, the exported chunks are also added to a full-text search index (the one
+the API serves with SEARCH_INDEX=true); --search queries it without exporting anything.
+
+Usage:
+    python scripts/export_training_corpus.py papers/ --output-dir corpus/ --compression gzip
+    python scripts/export_training_corpus.py --manifest files.txt --output-dir corpus/
+    python scripts/export_training_corpus.py papers/ --output-dir corpus/ --format parquet --compression zstd
+    python scripts/export_training_corpus.py papers/ --output-dir corpus/ --dedup drop
+    python scripts/export_training_corpus.py papers/ --output-dir corpus/ --index corpus/search.sqlite
+    python scripts/export_training_corpus.py --index corpus/search.sqlite --search "contrastive loss" --section-type methods
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import DEDUP_INDEX_PATH, DEDUP_MODE, PARSE_MAX_FILE_MB  # noqa: E402
+from app.core.limits import ParseLimits  # noqa: E402
+from app.core.models import dumps_jsonl  # noqa: E402
+from app.core.parser import PDFParser  # noqa: E402
+from app.core.utils import get_file_hash  # noqa: E402
+from app.services.dedup import DEDUP_MODES, DedupIndex, document_signature, fingerprint  # noqa: E402
+from app.services.exporters import COLUMNAR_SUFFIXES, ArrowChunkWriter  # noqa: E402
+from app.services.search import SearchIndex  # noqa: E402
+
+SHARD_SUFFIXES = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+CHECKPOINT_NAME = "checkpoint.jsonl"
+
+
+def iter_input_files(paths: List[str], manifest: Optional[str]) -> Iterator[str]:
+    """Yields PDF paths from the given files/directories and the optional manifest."""
+    if manifest:
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """
+    Returns the hashes of documents already written to a closed shard. Failures that
+    older runs checkpointed are left out, so they are retried.
+    """
+    done = set()
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if not entry.get("error"):
+                        done.add(entry["sha256"])
+                except (ValueError, KeyError):
+                    # A torn final line from an interrupted run
+                    continue
+    return done
+
+
+class ShardWriter:
+    """
+    Writes JSONL records into size-capped shards. A shard is written under a temporary
+    name and only renamed (and its documents checkpointed) once it is complete, so a
+    crash never leaves a checkpointed document in a truncated shard.
+    """
+
+    def __init__(self, output_dir: str, max_bytes: int, compression: str, checkpoint_path: str,
+                 dedup_index: Optional[DedupIndex] = None, search_index: Optional[SearchIndex] = None):
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.suffix = SHARD_SUFFIXES[compression]
+        self.checkpoint_path = checkpoint_path
+        self.shard_index = self._next_shard_index()
+        self._file = None
+        self._shard_bytes = 0
+        self._pending: List[dict] = []
+        # Committed together with the checkpoint, so a crashed run never leaves chunks in
+        # the index whose shard was lost (they would be dropped as duplicates on restart)
+        self.dedup_index = dedup_index
+        # Likewise, so a restarted run does not index the re-exported chunks a second time
+        self.search_index = search_index
+
+    def _next_shard_index(self) -> int:
+        """Continues numbering after existing shards and removes leftovers of a crashed run."""
+        index = 0
+        for name in os.listdir(self.output_dir):
+            if name.startswith("part-") and name.endswith(".tmp"):
+                os.unlink(os.path.join(self.output_dir, name))
+            elif name.startswith("part-"):
+                index = max(index, int(name[5:10]) + 1)
+        return index
+
+    def _shard_path(self) -> str:
+        return os.path.join(self.output_dir, f"part-{self.shard_index:05d}{self.suffix}")
+
+    def _open(self):
+        tmp_path = self._shard_path() + ".tmp"
+        if self.compression == "gzip":
+            return gzip.open(tmp_path, "wb")
+        if self.compression == "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor().stream_writer(open(tmp_path, "wb"), closefd=True)
+        return open(tmp_path, "wb")
+
+    def write_document(self, data: bytes, entry: dict) -> None:
+        """Writes one document's JSONL lines; a document never spans two shards."""
+        if self._file is None:
+            self._file = self._open()
+        self._file.write(data)
+        self._shard_bytes += len(data)
+        self._pending.append(entry)
+        if self._shard_bytes >= self.max_bytes:
+            self.close_shard()
+
+    def record_skip(self, entry: dict) -> None:
+        """Checkpoints a document that produced no output (empty, or all of it dropped as duplicates)."""
+        self._pending.append(entry)
+        if self._file is None:
+            self._flush_checkpoint()
+
+    def _flush_checkpoint(self) -> None:
+        with open(self.checkpoint_path, "a") as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+        if self.dedup_index is not None:
+            self.dedup_index.commit()
+        if self.search_index is not None:
+            self.search_index.commit()
+
+    def close_shard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            os.replace(self._shard_path() + ".tmp", self._shard_path())
+            self._file = None
+            self._shard_bytes = 0
+            self.shard_index += 1
+        if self._pending:
+            self._flush_checkpoint()
+
+
+class ColumnarShardWriter(ShardWriter):
+    """
+    ShardWriter for Parquet/Arrow shards. Takes CompactDocuments instead of JSONL bytes;
+    shards are capped by the text size written to them.
+    """
+
+    def __init__(self, output_dir: str, max_bytes: int, compression: str, checkpoint_path: str,
+                 file_format: str, dedup_index: Optional[DedupIndex] = None, drop_duplicates: bool = False,
+                 search_index: Optional[SearchIndex] = None):
+        super().__init__(output_dir, max_bytes, compression, checkpoint_path, dedup_index, search_index)
+        self.file_format = file_format
+        self.suffix = COLUMNAR_SUFFIXES[file_format]
+        self.drop_duplicates = drop_duplicates
+
+    def _open(self):
+        codec = None if self.compression == "none" else self.compression
+        return ArrowChunkWriter(self._shard_path() + ".tmp", self.file_format, codec)
+
+    def write_document(self, document, entry: dict) -> None:
+        if self._file is None:
+            self._file = self._open()
+        self._file.write_document(document, self.drop_duplicates)
+        self._shard_bytes += sum(len(text) for text in document.texts)
+        self._pending.append(entry)
+        if self._shard_bytes >= self.max_bytes:
+            self.close_shard()
+
+
+_completed_hashes: Set[str] = set()
+_output_format = "jsonl"
+
+
+def _init_worker(completed_hashes: Set[str], output_format: str = "jsonl", dedup: bool = False) -> None:
+    global _completed_hashes, _output_format, _dedup
+    _completed_hashes = completed_hashes
+    _output_format = output_format
+    _dedup = dedup
+
+
+def parse_document(path: str) -> dict:
+    """
+    Parses one PDF in a worker process and returns its serialised JSONL lines, or its
+    CompactDocument for columnar output. With dedup on, also the document signature
+    and the (chunk id, fingerprint) of every chunk.
+    """
+    result = {"path": path, "sha256": None, "lines": [], "document": None, "pages": 0, "chunks": 0,
+              "bytes": 0, "error": None, "skipped": False, "document_id": None, "document_signature": None,
+              "fingerprints": None, "partial": None}
+    parser = None
+    try:
+        result["bytes"] = os.path.getsize(path)
+        result["sha256"] = get_file_hash(path)
+        if result["sha256"] in _completed_hashes:
+            result["skipped"] = True
+            return result
+        if PARSE_MAX_FILE_MB and result["bytes"] > PARSE_MAX_FILE_MB * 1024 * 1024:
+            raise ValueError(f"larger than PARSE_MAX_FILE_MB ({PARSE_MAX_FILE_MB} MB)")
+
+        # Documents are already spread across processes, so each one is parsed serially;
+        # the PARSE_* budgets cut pathological ones short instead of stalling a worker
+        parser = PDFParser(path, workers=1, limits=ParseLimits())
+        result["pages"] = len(parser.doc)
+        if _output_format == "jsonl":
+            records = list(parser.iter_jsonl_records())
+            result["lines"] = [dumps_jsonl(record) for record in records]
+            result["chunks"] = len(records)
+            chunks = [(record["id"], record["text"]) for record in records]
+        else:
+            document = parser.process_compact()
+            result["chunks"] = len(document)
+            if len(document):
+                result["document"] = document
+            chunks = [(document.chunk_id(index), text) for index, text in enumerate(document.texts)]
+        result["partial"] = parser.partial
+        if _dedup and chunks:
+            result["document_id"] = parser.doc_id
+            result["document_signature"] = document_signature(parser.text_content)
+            result["fingerprints"] = [(chunk_id, fingerprint(text)) for chunk_id, text in chunks]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if parser:
+            parser.close()
+    return result
+
+
+def apply_dedup(result: dict, index: DedupIndex, mode: str) -> int:
+    """
+    Checks a parsed document against the index, then flags or drops its duplicate
+    chunks in the result. Returns the number of duplicate chunks.
+    """
+    duplicate_document = index.check_document(result["document_id"], result["document_signature"])
+    duplicates = {}
+    for chunk_index, (chunk_id, chunk_fingerprint) in enumerate(result["fingerprints"]):
+        if duplicate_document:
+            index.count_duplicate_document_chunk(chunk_fingerprint[2])
+            duplicates[chunk_index] = duplicate_document
+        else:
+            duplicate_of = index.check_chunk(chunk_id, chunk_fingerprint)
+            if duplicate_of:
+                duplicates[chunk_index] = duplicate_of
+    if result["document"] is not None:
+        # The columnar writer flags or drops them
+        result["document"].duplicates = duplicates
+    elif mode == "drop":
+        result["lines"] = [line for index, line in enumerate(result["lines"]) if index not in duplicates]
+    else:
+        for chunk_index, duplicate_of in duplicates.items():
+            record = json.loads(result["lines"][chunk_index])
+            record["metadata"]["duplicate_of"] = duplicate_of
+            result["lines"][chunk_index] = dumps_jsonl(record)
+    return len(duplicates)
+
+
+class Throughput:
+    """Tracks and periodically prints documents, pages and input megabytes per second."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.docs = self.pages = self.bytes = self.chunks = self.duplicates = 0
+        self.skipped = self.failed = self.partial = 0
+
+    def add(self, result: dict) -> None:
+        if result["skipped"]:
+            self.skipped += 1
+            return
+        if result["error"]:
+            self.failed += 1
+        if result["partial"]:
+            self.partial += 1
+        self.docs += 1
+        self.pages += result["pages"]
+        self.chunks += result["chunks"]
+        self.bytes += result["bytes"]
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(
+            f"{'done' if final else 'progress'}: {self.docs} docs "
+            f"({self.failed} failed, {self.partial} cut short, {self.skipped} skipped), "
+            f"{self.pages} pages, {self.chunks} chunks ({self.duplicates} duplicates) | "
+            f"{self.docs / elapsed:.2f} docs/s, {self.pages / elapsed:.1f} pages/s, "
+            f"{self.bytes / elapsed / 1e6:.2f} MB/s",
+            flush=True,
+        )
+
+
+def index_result(result: dict, search_index: SearchIndex, drop_duplicates: bool) -> None:
+    """Adds the chunks of a parsed document, as they are exported, to the search index."""
+    if result["document"]:
+        document = result["document"]
+        records = (record for record in document.iter_jsonl_records()
+                   if not (drop_duplicates and "duplicate_of" in record["metadata"]))
+    else:
+        records = (json.loads(line) for line in result["lines"])
+    search_index.add_records(records)
+
+
+def run_search(args) -> None:
+    """Prints the best matches in the search index as JSON lines."""
+    search_index = SearchIndex(args.index)
+    try:
+        for result in search_index.search(args.search, limit=args.limit, section_type=args.section_type,
+                                          language=args.language, page_number=args.page,
+                                          doc_title=args.doc_title):
+            print(json.dumps(result, ensure_ascii=False))
+    finally:
+        search_index.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("inputs", nargs="*", help="PDF files or directories to walk.")
+    arg_parser.add_argument("--manifest", help="Text file with one PDF path per line.")
+    arg_parser.add_argument("--output-dir", help="Directory for shards and the checkpoint.")
+    arg_parser.add_argument("--shard-size-mb", type=float, default=256,
+                            help="Uncompressed size at which a new shard is started.")
+    arg_parser.add_argument("--format", choices=["jsonl"] + sorted(COLUMNAR_SUFFIXES), default="jsonl",
+                            help="Shard format; parquet and arrow need pyarrow.")
+    arg_parser.add_argument("--compression", choices=sorted(SHARD_SUFFIXES), default="none")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Documents parsed in parallel.")
+    arg_parser.add_argument("--progress-interval", type=float, default=10.0,
+                            help="Seconds between throughput reports.")
+    arg_parser.add_argument("--dedup", choices=DEDUP_MODES, default=DEDUP_MODE if DEDUP_MODE in DEDUP_MODES else "off",
+                            help="Flag or drop near-duplicate documents and chunks.")
+    arg_parser.add_argument("--dedup-index", default=DEDUP_INDEX_PATH,
+                            help="SQLite near-duplicate index, shared across runs.")
+    arg_parser.add_argument("--index", help="Full-text search index to add the exported chunks to.")
+    search_args = arg_parser.add_argument_group("searching", "Query the --index instead of exporting.")
+    search_args.add_argument("--search", metavar="QUERY", help="Words every matching chunk must contain.")
+    search_args.add_argument("--section-type")
+    search_args.add_argument("--language")
+    search_args.add_argument("--page", type=int, help="Page number of the chunks.")
+    search_args.add_argument("--doc-title", help="Part of the document title.")
+    search_args.add_argument("--limit", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    if args.search is not None:
+        if not args.index:
+            arg_parser.error("--search requires --index")
+        run_search(args)
+        return
+    if not args.output_dir:
+        arg_parser.error("--output-dir is required")
+    if not args.inputs and not args.manifest:
+        arg_parser.error("give at least one input path or --manifest")
+    if args.compression == "zstd" and args.format == "jsonl":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            arg_parser.error("--compression zstd requires the 'zstandard' package")
+    if args.format != "jsonl":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            arg_parser.error(f"--format {args.format} requires the 'pyarrow' package")
+        if args.format == "arrow" and args.compression == "gzip":
+            arg_parser.error("Arrow files support only --compression zstd or none")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, CHECKPOINT_NAME)
+    completed = load_checkpoint(checkpoint_path)
+    if completed:
+        print(f"Resuming: {len(completed)} documents already exported.")
+
+    dedup_index = DedupIndex(args.dedup_index) if args.dedup != "off" else None
+    dedup_before = dedup_index.stats() if dedup_index else None
+    search_index = SearchIndex(args.index) if args.index else None
+
+    max_bytes = int(args.shard_size_mb * 1024 * 1024)
+    if args.format == "jsonl":
+        writer = ShardWriter(args.output_dir, max_bytes, args.compression, checkpoint_path, dedup_index,
+                             search_index)
+    else:
+        writer = ColumnarShardWriter(args.output_dir, max_bytes, args.compression, checkpoint_path, args.format,
+                                     dedup_index, drop_duplicates=args.dedup == "drop", search_index=search_index)
+    throughput = Throughput(args.progress_interval)
+    # Hashes seen in this run too, so identical files in different places are exported once
+    seen = set(completed)
+
+    pool = multiprocessing.Pool(args.workers, initializer=_init_worker,
+                                initargs=(completed, args.format, dedup_index is not None), maxtasksperchild=200)
+    try:
+        results = pool.imap_unordered(parse_document, iter_input_files(args.inputs, args.manifest))
+        for result in results:
+            if result["sha256"] in seen:
+                result["skipped"] = True
+            throughput.add(result)
+            if result["skipped"]:
+                continue
+            entry = {"sha256": result["sha256"], "path": result["path"],
+                     "chunks": result["chunks"], "error": result["error"]}
+            if result["partial"]:
+                entry["partial"] = result["partial"]
+                print(f"Parsing {result['path']} stopped early: {result['partial']}", file=sys.stderr)
+            if result["error"]:
+                # Failures are not checkpointed, so the next run retries them
+                print(f"Failed to parse {result['path']}: {result['error']}", file=sys.stderr)
+                continue
+            seen.add(result["sha256"])
+            if dedup_index is not None and result["fingerprints"]:
+                throughput.duplicates += apply_dedup(result, dedup_index, args.dedup)
+            if search_index is not None:
+                index_result(result, search_index, args.dedup == "drop")
+            if result["document"]:
+                writer.write_document(result["document"], entry)
+            elif result["lines"]:
+                writer.write_document(b"".join(result["lines"]), entry)
+            else:
+                writer.record_skip(entry)
+        # Let workers exit on their own; terminating them upsets the OCR runtime
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    writer.close_shard()
+    throughput.report(final=True)
+    if search_index is not None:
+        search_index.optimize()
+        stats = search_index.stats()
+        search_index.close()
+        print(f"search index: {stats['chunks']} chunks of {stats['documents']} documents in {stats['path']}",
+              flush=True)
+    if dedup_index is not None:
+        after = dedup_index.stats()
+        dedup_index.close()
+        chunks = after["chunks"] - dedup_before["chunks"]
+        chars = after["chars"] - dedup_before["chars"]
+        removed = after["duplicate_chars"] - dedup_before["duplicate_chars"]
+        print(
+            f"dedup ({args.dedup}): {after['duplicate_documents'] - dedup_before['duplicate_documents']} duplicate "
+            f"documents, {after['duplicate_chunks'] - dedup_before['duplicate_chunks']} of {chunks} chunks "
+            f"({after['exact_duplicate_chunks'] - dedup_before['exact_duplicate_chunks']} exact), "
+            f"{removed / chars if chars else 0:.1%} of the text",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
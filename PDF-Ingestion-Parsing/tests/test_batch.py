@@ -0,0 +1,33 @@
+import io
+import os
+import zipfile
+
+from app.services import batch, jobs
+from app.services.jobs import Job, JobManager
+
+
+def test_oversized_archive_members_are_rejected_before_extraction(monkeypatch):
+    monkeypatch.setattr(batch, "PARSE_MAX_FILE_MB", 1)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("big.pdf", b"\0" * (2 * 1024 * 1024))
+        archive.writestr("small.pdf", b"%PDF-1.7")
+    extracted = []
+    monkeypatch.setattr(batch, "_member_source", lambda fileobj, size: extracted.append(size) or b"pdf")
+    buffer.seek(0)
+    items = list(batch.iter_batch_items([("docs.zip", buffer)]))
+    assert [(name, error is None) for name, _, error in items] == [("docs.zip/big.pdf", False),
+                                                                  ("docs.zip/small.pdf", True)]
+    assert extracted == [8]
+
+
+def test_pinned_jobs_outlive_the_history_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RESULTS_DIR", str(tmp_path))
+    manager = JobManager(workers=1, history=0)
+    job = Job(None, "done.pdf")
+    job.status = "completed"
+    job.pinned = True
+    manager._register(job)
+    assert manager.get(job.job_id) is job and os.path.exists(job.result_path)
+    manager.unpin(job)
+    assert manager.get(job.job_id) is None and not os.path.exists(job.result_path)
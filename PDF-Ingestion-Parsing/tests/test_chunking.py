@@ -0,0 +1,82 @@
+import base64
+import random
+
+import pytest
+
+from app.core.chunking import Chunker, RegexTokenizer, WordTokenizer
+
+
+def _chunk(chunker, lines, section="unknown"):
+    """Feeds `lines` (one per page) through a builder and returns every chunk span."""
+    builder = chunker.builder(section)
+    spans, offset = [], 0
+    for page, line in enumerate(lines, start=1):
+        spans.extend(builder.add(line, offset, page))
+        offset += len(line) + 1
+    spans.extend(builder.flush())
+    return spans
+
+
+@pytest.mark.parametrize("max_tokens", [512, 50, 3, 1])
+def test_over_long_words_are_cut_to_the_budget(max_tokens):
+    blob = base64.b64encode(random.Random(0).randbytes(3000)).decode()
+    url = "https://example.org/" + "a1b2c3d4" * 40
+    text = f"See {url} and the attached key {blob} for details. " + "." * 600
+    chunker = Chunker(RegexTokenizer(), max_tokens=max_tokens)
+    spans = _chunk(chunker, [text])
+    assert spans
+    for chunk_text, page, start, end in spans:
+        assert chunker.tokenizer.count(chunk_text) <= max_tokens
+        assert page == 1
+    # Nothing is lost: the pieces cover every non-space character, in order
+    assert "".join("".join(span[0].split()) for span in spans) == "".join(text.split())
+
+
+def _sentences(count, words=12):
+    rng = random.Random(1)
+    return [" ".join(rng.choice(["alpha", "beta", "gamma", "delta"]) for _ in range(words)) + "."
+            for _ in range(count)]
+
+
+def test_chunks_stay_within_the_budget_and_cover_the_text():
+    lines = [" ".join(_sentences(5)) for _ in range(6)]
+    chunker = Chunker(WordTokenizer(), max_tokens=40)
+    spans = _chunk(chunker, lines)
+    assert len(spans) > 1
+    assert all(chunker.tokenizer.count(span[0]) <= 40 for span in spans)
+    assert " ".join(span[0] for span in spans).split() == " ".join(lines).split()
+    # Cuts fall on sentence ends when that keeps the chunk at least half full
+    assert all(span[0].endswith(".") for span in spans)
+    assert [span[1] for span in spans] == sorted(span[1] for span in spans)
+
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    lines = [" ".join(_sentences(20, words=5))]
+    chunker = Chunker(WordTokenizer(), max_tokens=30, overlap_tokens=10)
+    spans = _chunk(chunker, lines)
+    assert len(spans) > 2
+    for previous, current in zip(spans, spans[1:]):
+        assert chunker.tokenizer.count(current[0]) <= 30
+        # The repeated text is whole sentences from the end of the previous chunk
+        assert current[2] < previous[3]
+        repeated = lines[0][current[2]:previous[3]]
+        assert previous[0].endswith(repeated) and current[0].startswith(repeated)
+        assert len(repeated.split()) <= 10
+
+
+def test_section_budgets_and_no_overlap_across_sections():
+    chunker = Chunker(WordTokenizer(), max_tokens=40, overlap_tokens=5, section_max_tokens={"abstract": 12})
+    builder = chunker.builder("abstract")
+    text = " ".join(_sentences(3, words=6))
+    spans = list(builder.add(text, 0, 1))
+    spans += list(builder.start_section("methods"))
+    methods = list(builder.add(text, len(text) + 1, 2)) + list(builder.flush())
+    assert all(len(span[0].split()) <= 12 for span in spans)
+    assert len(methods) == 1 and methods[0][0] == text and methods[0][1] == 2
+
+
+def test_invalid_budgets_are_rejected():
+    with pytest.raises(ValueError):
+        Chunker(WordTokenizer(), max_tokens=0)
+    with pytest.raises(ValueError):
+        Chunker(WordTokenizer(), max_tokens=10, overlap_tokens=10)
@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.synthetic import generate
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts",
+                      "export_training_corpus.py")
+
+
+def _export(inputs, output_dir):
+    return subprocess.run([sys.executable, SCRIPT, inputs, "--output-dir", output_dir, "--workers", "1"],
+                          capture_output=True, text=True, timeout=300)
+
+
+def test_failed_documents_are_retried_on_resume(tmp_path):
+    inputs = tmp_path / "pdfs"
+    inputs.mkdir()
+    generate("text", 2, str(inputs / "good.pdf"))
+    (inputs / "corrupt.pdf").write_bytes(b"%PDF-1.7\n" + b"\0" * 1024)
+    output_dir = str(tmp_path / "corpus")
+    first = _export(str(inputs), output_dir)
+    assert first.returncode == 0, first.stderr
+    assert "corrupt.pdf" in first.stderr
+    with open(os.path.join(output_dir, "checkpoint.jsonl")) as f:
+        entries = [json.loads(line) for line in f]
+    assert [os.path.basename(entry["path"]) for entry in entries] == ["good.pdf"]
+    second = _export(str(inputs), output_dir)
+    assert second.returncode == 0, second.stderr
+    assert "Failed to parse" in second.stderr and "corrupt.pdf" in second.stderr
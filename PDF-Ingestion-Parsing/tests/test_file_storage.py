@@ -0,0 +1,45 @@
+import os
+
+from app.services.file_storage import DiskLRUCache
+
+
+def test_hit_miss_and_eviction(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10, suffix=".bin")
+    assert cache.get("a") is None
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    # "b" is now the least recently used entry and makes room for "c"
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("c") == b"cccc"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["evictions"]) == (2, 2, 3, 1)
+    assert (stats["entries"], stats["bytes"]) == (2, 8)
+    assert sorted(os.listdir(tmp_path)) == ["a.bin", "c.bin"]
+
+
+def test_entries_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=4)
+    cache.put("big", b"12345")
+    assert cache.get("big") is None
+    assert cache.stats()["writes"] == 0
+
+
+def test_removed_entry_counts_as_a_miss(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    cache.put("a", b"data")
+    os.unlink(tmp_path / "a")
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (0, 1, 0, 0)
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    DiskLRUCache(str(tmp_path), max_bytes=100).put("a", b"data")
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    assert cache.stats()["entries"] == 1
+    assert cache.get("a") == b"data"
+    dest = tmp_path / "copy"
+    assert cache.copy_to("a", str(dest))
+    assert dest.read_bytes() == b"data"
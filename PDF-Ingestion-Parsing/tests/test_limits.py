@@ -0,0 +1,113 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core import parallel, parser as parser_module
+from app.core.limits import ParseLimits
+from app.core.parser import PDFParser
+from benchmarks.synthetic import generate
+
+PAGE_PIXELS = 1000
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """Runs the page parts on threads, so the part functions can be replaced."""
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(parallel, "get_page_executor", lambda workers: executor)
+    yield
+    executor.shutdown()
+
+
+def _fake_ocr_part(file_path, page_indices, lang, dpi, limits):
+    """Spends PAGE_PIXELS per page until its budget runs out, like ocr_document_pages."""
+    results = []
+    for index in page_indices:
+        if limits is not None and limits.ocr_stop_reason():
+            break
+        if limits is not None:
+            limits.add_ocr_pixels(PAGE_PIXELS)
+        results.append((index, (f"page {index}", {"pixels": PAGE_PIXELS})))
+    return results
+
+
+def test_ocr_stop_reason():
+    limits = ParseLimits(timeout=60, max_ocr_megapixels=0.001)
+    assert limits.ocr_stop_reason() is None
+    limits.add_ocr_pixels(1000)
+    assert limits.ocr_stop_reason() == "pixel_limit"
+    limits.deadline = time.time() - 1
+    assert limits.ocr_stop_reason() == "timeout"
+
+
+def test_ocr_budget_copy_shares_the_deadline():
+    limits = ParseLimits(timeout=60, max_ocr_megapixels=1)
+    limits.add_ocr_pixels(10)
+    part = limits.with_ocr_budget(500)
+    assert (part.deadline, part.max_ocr_pixels, part.ocr_pixels) == (limits.deadline, 500, 0)
+    assert (limits.max_ocr_pixels, limits.ocr_pixels) == (1_000_000, 10)
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_parallel_ocr_holds_the_document_pixel_budget(thread_pool, monkeypatch, workers):
+    monkeypatch.setattr(parallel, "_ocr_part", _fake_ocr_part)
+    limits = ParseLimits(timeout=60, max_ocr_megapixels=10 * PAGE_PIXELS / 1_000_000)
+    results = parallel.ocr_pages_parallel("unused.pdf", list(range(100)), "en", workers, limits=limits)
+    done = [result for result in results if result is not None]
+    # A part may finish the page it started, as the serial path does
+    assert 10 <= len(done) <= 10 + workers
+    assert limits.ocr_pixels == len(done) * PAGE_PIXELS
+    assert limits.ocr_stop_reason() == "pixel_limit"
+
+
+def test_parallel_ocr_without_limits_does_every_page(thread_pool, monkeypatch):
+    monkeypatch.setattr(parallel, "_ocr_part", _fake_ocr_part)
+    results = parallel.ocr_pages_parallel("unused.pdf", list(range(30)), "en", 3)
+    assert [text for text, _ in results] == [f"page {index}" for index in range(30)]
+
+
+def test_parallel_extraction_starts_no_part_after_the_deadline(thread_pool, monkeypatch):
+    monkeypatch.setattr(parallel, "_extract_text_part",
+                        lambda file_path, page_indices: [(index, "text") for index in page_indices])
+    limits = ParseLimits(timeout=60)
+    assert parallel.extract_text_parallel("unused.pdf", list(range(20)), 2, limits=limits) == ["text"] * 20
+    limits.deadline = time.time() - 1
+    assert parallel.extract_text_parallel("unused.pdf", list(range(20)), 2, limits=limits) == [None] * 20
+
+
+def test_deadline_keeps_the_pages_processed_so_far(tmp_path):
+    path = generate("text", 4, str(tmp_path / "text.pdf"))
+    limits = ParseLimits(timeout=60)
+    limits.deadline = time.time() - 1
+    parser = PDFParser(path, workers=1, limits=limits)
+    try:
+        records = list(parser.iter_jsonl_records())
+    finally:
+        parser.close()
+    assert parser.partial["reason"] == "timeout"
+    assert (parser.partial["pages_processed"], parser.partial["pages_total"]) == (1, 4)
+    assert {record["metadata"]["page_number"] for record in records} == {1}
+
+
+def test_page_limit(tmp_path):
+    path = generate("text", 4, str(tmp_path / "text.pdf"))
+    parser = PDFParser(path, workers=1, limits=ParseLimits(timeout=60, max_pages=2))
+    try:
+        assert parser.page_indices == [0, 1]
+        assert parser.partial["reason"] == "page_limit"
+    finally:
+        parser.close()
+
+
+def test_ocr_stopping_early_without_limits(tmp_path, monkeypatch):
+    path = generate("text", 3, str(tmp_path / "text.pdf"))
+    monkeypatch.setattr(parser_module, "ocr_document_pages",
+                        lambda doc, page_indices, *args, **kwargs: [("ocr text", {"pixels": 1})])
+    parser = PDFParser(path, workers=1)
+    try:
+        parser._extract_text_with_ocr([0, 1, 2])
+        assert parser.page_indices == [0]
+        assert parser.partial["reason"] == "timeout"
+    finally:
+        parser.close()
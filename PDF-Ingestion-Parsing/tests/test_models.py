@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from app.core import models
+from app.core.models import CompactDocument, ParsedDocument, dumps_jsonl, trusted_chunk
+
+
+def _document():
+    chunks = [
+        trusted_chunk(f"doc_chunk{index}", f"text {index}", "doc", "Title", ["Author"], language, "unknown", index + 1)
+        for index, language in enumerate(["en", "de", None])
+    ]
+    return ParsedDocument.trusted("doc", "Title", ["Author"], "en", chunks, {"doi": None})
+
+
+def test_records_keep_each_chunks_language():
+    document = _document()
+    languages = [record["metadata"]["language"] for record in document.to_jsonl_records()]
+    # A chunk without a language of its own falls back to the document's
+    assert languages == ["en", "de", "en"]
+    lines = document.to_jsonl_bytes().splitlines()
+    assert [json.loads(line)["metadata"]["language"] for line in lines] == languages
+
+
+def test_compact_document_matches_parsed_document():
+    compact = CompactDocument("doc", "Title", ["Author"], "en", {"doi": None})
+    for index, language in enumerate(["en", "de", None]):
+        compact.append(f"text {index}", "unknown", index + 1, language=language)
+    assert compact.to_jsonl_bytes() == _document().to_jsonl_bytes()
+
+
+def test_json_fallback_writes_the_same_json(monkeypatch):
+    pytest.importorskip("orjson")
+    record = {"id": "a", "text": "Übersicht — 概要 \"quoted\"\n", "score": 0.1 + 0.2, "pages": [1, 2], "doi": None}
+    encoded = dumps_jsonl(record)
+    monkeypatch.setattr(models, "orjson", None)
+    fallback = dumps_jsonl(record)
+    assert encoded.endswith(b"\n") and fallback.endswith(b"\n")
+    assert json.loads(fallback) == json.loads(encoded) == record
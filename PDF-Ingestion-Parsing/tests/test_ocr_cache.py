@@ -0,0 +1,60 @@
+from concurrent.futures import Future
+
+import fitz
+import numpy as np
+
+from app.services import ocr_batcher
+from app.services.file_storage import OCRPageCache
+from app.services.ocr_batcher import ocr_document_pages, page_cache_key
+from benchmarks.synthetic import generate
+
+
+class _FakeBatcher:
+    """Answers every page at once, counting how many reached the OCR engine."""
+
+    batch_size = 2
+
+    def __init__(self):
+        self.pages = 0
+
+    def submit(self, image, lang=None):
+        self.pages += 1
+        future = Future()
+        future.set_result(f"text {self.pages}")
+        return future
+
+
+def test_page_cache_key_covers_pixels_shape_and_language():
+    image = np.zeros((4, 6), dtype=np.uint8)
+    key = page_cache_key(image, "en")
+    assert page_cache_key(image.copy(), "en") == key
+    assert page_cache_key(image, "fr") != key
+    assert page_cache_key(image.reshape(6, 4), "en") != key
+    changed = image.copy()
+    changed[0, 0] = 1
+    assert page_cache_key(changed, "en") != key
+
+
+def test_text_round_trip(tmp_path):
+    cache = OCRPageCache(str(tmp_path), max_bytes=1024)
+    assert cache.get_text("page") is None
+    cache.put_text("page", "Übersicht — 概要")
+    assert cache.get_text("page") == "Übersicht — 概要"
+
+
+def test_repeated_pages_are_answered_from_the_cache(tmp_path, monkeypatch):
+    path = generate("scanned", 1, str(tmp_path / "scanned.pdf"))
+    cache = OCRPageCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+    batcher = _FakeBatcher()
+    monkeypatch.setattr(ocr_batcher, "get_ocr_page_cache", lambda: cache)
+    monkeypatch.setattr(ocr_batcher, "get_ocr_batcher", lambda: batcher)
+    doc = fitz.open(path)
+    try:
+        first = ocr_document_pages(doc, [0], "en")
+        second = ocr_document_pages(doc, [0], "en")
+        other_language = ocr_document_pages(doc, [0], "fr")
+    finally:
+        doc.close()
+    assert batcher.pages == 2
+    assert [text for text, _ in first + second + other_language] == ["text 1", "text 1", "text 2"]
+    assert [info.get("cached", False) for _, info in first + second + other_language] == [False, True, False]
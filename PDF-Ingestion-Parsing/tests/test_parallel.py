@@ -0,0 +1,48 @@
+import os
+
+from app.core import parser as parser_module
+from app.core.parallel import get_page_executor, partition, shutdown_page_executor
+from app.core.parser import PDFParser
+from benchmarks.synthetic import generate
+
+
+def test_partition_keeps_order_and_covers_every_page():
+    indices = list(range(10))
+    parts = partition(indices, 2)
+    assert len(parts) == 8
+    assert [index for part in parts for index in part] == indices
+    assert max(map(len, parts)) - min(map(len, parts)) <= 1
+    assert partition([3], 4) == [[3]]
+
+
+def test_pools_of_other_sizes_stay_usable():
+    try:
+        small = get_page_executor(1)
+        pending = small.submit(os.getpid)
+        assert get_page_executor(1) is small
+        # Asking for another size must not shut down the pool other jobs are using
+        other = get_page_executor(2)
+        assert other is not small
+        assert pending.result(timeout=60) != os.getpid()
+        assert small.submit(os.getpid).result(timeout=60)
+    finally:
+        shutdown_page_executor()
+
+
+def test_buffers_are_extracted_serially_below_their_threshold(tmp_path, monkeypatch):
+    path = generate("text", 8, str(tmp_path / "text.pdf"))
+    monkeypatch.setattr(parser_module, "PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(parser_module, "PARALLEL_MIN_BUFFER_PAGES", 16)
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        for source, parallel in ((path, True), (data, False)):
+            parser = PDFParser(source, workers=2)
+            try:
+                assert parser._parallel_extraction() is parallel
+                parser._extract_text_with_pypdf()
+                assert parser._spill_path is None
+            finally:
+                parser.close()
+    finally:
+        shutdown_page_executor()
@@ -0,0 +1,81 @@
+import mmap
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.limits import ParseLimits
+from app.core.parser import PDFParser, parse_page_ranges, parse_page_spec
+from app.main import _parse_metadata_now
+from benchmarks.synthetic import generate
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("1", [(1, 1)]),
+    ("1-3,7", [(1, 3), (7, 7)]),
+    (" 2 - 4 , 10- ", [(2, 4), (10, None)]),
+    ("-5", [(1, 5)]),
+])
+def test_parse_page_spec(spec, expected):
+    assert parse_page_spec(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["", "0", "3-1", "a", "1,,2", "-", "1-2-3"])
+def test_parse_page_spec_rejects_malformed_specs(spec):
+    with pytest.raises(ValueError):
+        parse_page_spec(spec)
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges(None, 3) == [0, 1, 2]
+    assert parse_page_ranges("2-,1", 4) == [0, 1, 2, 3]
+    assert parse_page_ranges("2-3,9", 5) == [1, 2]
+    with pytest.raises(ValueError):
+        parse_page_ranges("9-", 5)
+
+
+def test_parses_a_page_range_of_a_text_pdf(tmp_path):
+    path = generate("text", 5, str(tmp_path / "text.pdf"))
+    parser = PDFParser(path, workers=1, page_range="2-3")
+    try:
+        records = list(parser.iter_jsonl_records())
+    finally:
+        parser.close()
+    assert records
+    assert {record["metadata"]["page_number"] for record in records} <= {2, 3}
+    assert all(record["text"].strip() for record in records)
+    assert len({record["id"] for record in records}) == len(records)
+
+
+def test_iter_pages_stops_at_the_deadline(tmp_path):
+    path = generate("text", 4, str(tmp_path / "text.pdf"))
+    limits = ParseLimits(timeout=60)
+    parser = PDFParser(path, workers=1, layout=True, limits=limits)
+    try:
+        pages = parser.iter_pages()
+        assert next(pages)["page_number"] == 1
+        limits.deadline = time.time() - 1
+        assert list(pages) == []
+    finally:
+        parser.close()
+    assert parser.partial["reason"] == "timeout"
+    assert parser.page_indices == [0]
+
+
+def test_metadata_of_a_corrupt_mmap_upload_fails_cleanly(tmp_path):
+    path = tmp_path / "corrupt.pdf"
+    path.write_bytes(b"%PDF-1.7\n" + b"\0" * 4096)
+    with open(path, "r+b") as handle:
+        source = mmap.mmap(handle.fileno(), 0)
+    with pytest.raises(HTTPException) as error:
+        _parse_metadata_now(source, "corrupt.pdf", None)
+    assert error.value.status_code == 500
+    assert source.closed
+
+
+def test_metadata_mode(tmp_path):
+    path = generate("text", 3, str(tmp_path / "text.pdf"))
+    with open(path, "rb") as handle:
+        result = _parse_metadata_now(handle.read(), "text.pdf", None)
+    assert (result["mode"], result["page_count"]) == ("metadata", 3)
+    assert "partial" not in result
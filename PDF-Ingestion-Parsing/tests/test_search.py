@@ -0,0 +1,56 @@
+from app.core.models import make_record
+from app.services.search import SearchIndex, fts_query
+
+
+def _records(document_id, title="A Study of Things"):
+    texts = ["contrastive loss for retrieval", "results on the benchmark", "related work on retrieval"]
+    return [
+        make_record(f"{document_id}_chunk{index}", text, "methods" if index == 0 else "results", index + 1,
+                    title, ["Author"], "en", None)
+        for index, text in enumerate(texts)
+    ]
+
+
+def _index(tmp_path):
+    return SearchIndex(str(tmp_path / "search.sqlite"), mmap_mb=1)
+
+
+def test_re_adding_records_skips_existing_chunks(tmp_path):
+    index = _index(tmp_path)
+    assert index.add_records(_records("doc")) == 3
+    assert index.add_records(_records("doc")) == 0
+    index.commit()
+    assert index.add_records(_records("doc") + _records("other")) == 3
+    index.commit()
+    assert index.stats()["chunks"] == 6
+    assert len(index.search("retrieval", limit=10)) == 4
+    index.close()
+
+
+def test_search_ranks_and_filters(tmp_path):
+    index = _index(tmp_path)
+    index.add_records(_records("doc"))
+    index.commit()
+    results = index.search("contrastive retrieval")
+    assert [result["id"] for result in results] == ["doc_chunk0"]
+    assert "[contrastive]" in results[0]["snippet"]
+    assert [result["id"] for result in index.search("retrieval", section_type="results")] == ["doc_chunk2"]
+    assert [result["id"] for result in index.search(page_number=2)] == ["doc_chunk1"]
+    index.close()
+
+
+def test_doc_title_filter_treats_wildcards_literally(tmp_path):
+    index = _index(tmp_path)
+    index.add_records(_records("plain", title="Accuracy of things"))
+    index.add_records(_records("percent", title="100% accuracy_study"))
+    index.commit()
+    assert {result["document_id"] for result in index.search(doc_title="ACCURACY", limit=10)} == {"plain", "percent"}
+    assert {result["document_id"] for result in index.search(doc_title="0%", limit=10)} == {"percent"}
+    assert index.search(doc_title="y_s") == index.search(doc_title="accuracy_study")
+    assert index.search(doc_title="%") and not index.search(doc_title="of_things")
+    index.close()
+
+
+def test_query_operators_are_ignored():
+    assert fts_query('NEAR(a "b") OR c*') == '"NEAR" "a" "b" "OR" "c"'
+    assert fts_query("-- !!") == ""